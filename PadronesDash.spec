@@ -4,11 +4,9 @@ block_cipher = None
 
 from PyInstaller.utils.hooks import collect_submodules
 dash_submods = collect_submodules("dash")
-dext_submods = collect_submodules("dash_extensions")
 
 extra_hidden = (
     dash_submods +
-    dext_submods +
     ["dash.long_callback", "dash.development.base_component"]
 )
 # ---------------------------------------------------------------------python -m pip install "dash[diskcache]==2.14.2" "dash-extensions==1.0.9"
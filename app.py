@@ -3,13 +3,14 @@
 # -*- coding: utf-8 -*-
 """
 app.py – Punto de ensamblado de la aplicación Dash.
-Crea la instancia, carga el layout y registra los callbacks.
+Crea la instancia, carga el layout y registra los callbacks y la ruta de descarga.
 """
 
 from dash import Dash
 from app.config import APP_TITLE, LONGCALLBACK_MANAGER
 from app.layout import layout
 from app.callbacks import register_callbacks
+from app import descarga
 
 # Crear la app y asignar layout + callbacks
 app = Dash(
@@ -20,3 +21,4 @@ app = Dash(
 app.layout = layout
 
 register_callbacks(app)
+descarga.registrar(app.server)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+batch.py – Motor de análisis sin navegador y CLI.
+Corre la unificación y el análisis de los callbacks fuera de Dash, con los
+mismos CSV y ZIP de resultados, para programar corridas (p. ej. la nocturna
+de los padrones del mes). Los análisis independientes se encolan en una
+Cola que los reparte en un pool de procesos; un trabajo idéntico a uno que
+sigue corriendo se rechaza, también si lo corre otro proceso (p. ej. una
+corrida manual que se superpone con la programada): la clave del trabajo
+se reserva en la diskcache compartida (ver sesiones.reservar).
+
+    python -m app.batch analyze --tipo OSN padrones/*.txt
+    python -m app.batch analyze --tipo EMP --juntos a.txt b.txt
+    python -m app.batch unify --tipo OSN --formato arrow a.txt b.txt
+"""
+
+import sys
+import time
+import argparse
+import datetime
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.config import PARSE_WORKERS
+from app.data_utils import thousand
+from app.engine import analizar, columnas
+from app.unify import unificar, salida, FORMATOS
+from app.medicion import Medidor
+from app import descarga, resultados, sesiones
+
+SALIDA = Path("resultados")
+
+class TrabajoDuplicado(RuntimeError):
+    """El mismo análisis ya está en curso en la cola o en otro proceso."""
+
+# ─────────── Motor ───────────
+def correr_analisis(fuentes: List[Path | str], tp: str, destino: Path | str) -> Dict:
+    """
+    Analiza fuentes (tipo EMP u OSN) dejando en destino los CSV de
+    resultados y el ZIP que arma la descarga. Devuelve el resumen de
+    analizar con la ruta del ZIP en "zip".
+    """
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    summary = analizar([Path(f) for f in fuentes], tp, destino, Medidor())
+    summary["zip"] = str(descarga.empaquetar(summary, destino))
+    return summary
+
+def correr_unificacion(fuentes: List[Path | str], tp: str, destino: Path | str, formato: str = "txt") -> Tuple[Path, int]:
+    """Unifica fuentes en destino/unif_<fecha> con formato; devuelve ruta y filas."""
+    Path(destino).mkdir(parents=True, exist_ok=True)
+    outp = salida(Path(destino), f"unif_{datetime.datetime.now():%Y%m%d_%H%M%S}", formato)
+    return outp, unificar([Path(f) for f in fuentes], columnas(tp), outp)
+
+# ─────────── Cola de trabajos ───────────
+def _iniciar(parse_workers: int) -> None:
+    # los procesos de parseo se reparten entre los análisis simultáneos
+    from app import engine
+    engine.PARSE_WORKERS = parse_workers
+
+class Cola:
+    """
+    Análisis independientes en un pool de workers procesos. Cada trabajo
+    se identifica por tipo y fuentes; enviar uno que sigue en curso, en esta
+    cola o en la de otro proceso vivo, lanza TrabajoDuplicado.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = max(1, workers)
+        self._pool = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_iniciar,
+            initargs=(max(1, PARSE_WORKERS // self.workers),),
+        )
+        self._activos: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clave(fuentes: List[Path | str], tp: str) -> Tuple:
+        return (tp, *(str(Path(f).resolve()) for f in fuentes))
+
+    @staticmethod
+    def _reserva(fuentes: List[Path | str], tp: str) -> str:
+        # misma clave que el resultado: mismos contenidos, tipo y catálogos
+        return f"lote:{resultados.clave(fuentes, tp)}"
+
+    def enviar(self, fuentes: List[Path | str], tp: str, destino: Path | str) -> Future:
+        """Encola el análisis de fuentes en destino; el Future da el resumen."""
+        k = self.clave(fuentes, tp)
+        reserva = self._reserva(fuentes, tp)
+        with self._lock:
+            # la reserva es de este proceso mientras el trabajo siga en la cola
+            if k in self._activos or not sesiones.reservar(reserva):
+                raise TrabajoDuplicado(f"ya está en curso: {tp} {', '.join(map(str, fuentes))}")
+            try:
+                fut = self._pool.submit(correr_analisis, [str(f) for f in fuentes], tp, str(destino))
+            except BaseException:
+                sesiones.liberar(reserva)
+                raise
+            self._activos[k] = fut
+        fut.add_done_callback(lambda _f: self._liberar(k, reserva, _f))
+        return fut
+
+    def _liberar(self, k: Tuple, reserva: str, fut: Future) -> None:
+        with self._lock:
+            if self._activos.get(k) is fut:
+                del self._activos[k]
+        sesiones.liberar(reserva)
+
+    def activos(self) -> List[Tuple]:
+        with self._lock:
+            return list(self._activos)
+
+    def esperar(self) -> None:
+        with self._lock:
+            pendientes = list(self._activos.values())
+        wait(pendientes)
+
+    def cerrar(self, cancelar: bool = False) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=cancelar)
+
+    def __enter__(self) -> "Cola":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar(cancelar=exc[0] is not None)
+
+# ─────────── CLI ───────────
+def _linea(summary: Dict) -> str:
+    if summary["tipo"] == "EMP":
+        n = f"{thousand(summary['tot_emp'])} filas, {thousand(summary['pp_emp'])} plan parcial"
+    else:
+        n = (f"{thousand(summary['tot_pami'] + summary['tot_osn'])} filas, "
+             f"{thousand(summary['m_pami'])} multi-CUIT PAMI, {thousand(summary['m_osn'])} pluriempleo")
+    dup = sum(summary[k] for k in ("dup_emp", "dup_pami", "dup_osn") if k in summary)
+    err = sum(summary[k] for k in ("err_emp", "err_pami", "err_osn") if k in summary)
+    return f"{n}, {thousand(dup)} duplicados, {thousand(err)} errores → {summary['zip']}"
+
+def analyze(args: argparse.Namespace) -> int:
+    fuentes = [Path(f) for f in args.archivos]
+    faltan = [f for f in fuentes if not f.is_file()]
+    if faltan:
+        print(f"No existen: {', '.join(map(str, faltan))}", file=sys.stderr)
+        return 2
+    ts = f"{datetime.datetime.now():%Y%m%d_%H%M%S}"
+    grupos = [fuentes] if args.juntos else [[f] for f in fuentes]
+
+    errores = 0
+    with Cola(min(args.workers, len(grupos))) as cola:
+        trabajos = []
+        for g in grupos:
+            nombre = "unificado" if len(g) > 1 else g[0].stem
+            destino = Path(args.salida) / f"{args.tipo}_{nombre}_{ts}"
+            try:
+                trabajos.append((g, cola.enviar(g, args.tipo, destino), time.perf_counter()))
+            except TrabajoDuplicado as e:
+                print(f"✗ {e}", file=sys.stderr)
+                errores += 1
+        for g, fut, t0 in trabajos:
+            etiqueta = ", ".join(f.name for f in g)
+            try:
+                s = fut.result()
+            except Exception as e:
+                print(f"✗ {etiqueta}: {e}", file=sys.stderr)
+                errores += 1
+                continue
+            print(f"✓ {etiqueta} ({time.perf_counter() - t0:.1f}s): {_linea(s)}", flush=True)
+    return 1 if errores else 0
+
+def unify(args: argparse.Namespace) -> int:
+    outp, total = correr_unificacion(args.archivos, args.tipo, args.salida, args.formato)
+    print(f"Unificación → {thousand(total)} filas en {outp}")
+    return 0
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.batch", description=__doc__.strip().splitlines()[1])
+    sub = ap.add_subparsers(dest="comando", required=True)
+
+    a = sub.add_parser("analyze", aliases=["analizar"], help="analiza padrones y deja CSV y ZIP por trabajo")
+    a.add_argument("archivos", nargs="+")
+    a.add_argument("--tipo", required=True, choices=("EMP", "OSN"))
+    a.add_argument("--salida", default=str(SALIDA), help="carpeta donde se crea una subcarpeta por trabajo")
+    a.add_argument("--workers", type=int, default=2, help="análisis simultáneos")
+    a.add_argument("--juntos", action="store_true", help="un solo análisis de todos los archivos (como unificados)")
+    a.set_defaults(func=analyze)
+
+    u = sub.add_parser("unify", aliases=["unificar"], help="unifica padrones en un archivo")
+    u.add_argument("archivos", nargs="+")
+    u.add_argument("--tipo", required=True, choices=("EMP", "OSN"))
+    u.add_argument("--formato", default="txt", choices=tuple(FORMATOS))
+    u.add_argument("--salida", default=str(SALIDA))
+    u.set_defaults(func=unify)
+
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
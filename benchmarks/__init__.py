@@ -0,0 +1,6 @@
+"""
+benchmarks – Suite reproducible de rendimiento.
+sintetico genera padrones EMP y OSN con semilla; suite mide por separado
+leer_chunks, load_references, unificación, análisis y descarga. Se corre con
+python -m app.benchmarks (ver --help).
+"""
@@ -0,0 +1,3 @@
+from app.benchmarks.suite import main
+
+main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sintetico.py – Generador de padrones sintéticos con semilla.
+Arma padrones EMP (COLS_EMP) u OSN (campos del catálogo) válidos según el
+plan de validación y les agrega, con tasas configurables, los casos que
+pesan en el análisis: filas duplicadas, pluriempleo (mismo cuil y obra
+social con otro empleador), filas de PAMI, valores fuera del catálogo y
+registros partidos en dos líneas por comillas. Cada bloque usa su propia
+semilla derivada, así que el archivo es idéntico byte a byte para una
+misma (semilla, tipo, filas, tasas).
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_pc
+except ImportError:
+    # Sin pyarrow las líneas se arman con str.cat de pandas
+    pa = None
+
+from app.config import REF_DIR
+from app.engine import PAMI, columnas
+from app import validacion
+
+# Fracción de filas de cada caso
+TASAS = {
+    "duplicados":  0.02,    # copias exactas de otra fila
+    "pluriempleo": 0.03,    # mismo (cuil, codigo_os) con otro cuit_empleador
+    "pami":        0.15,    # codigo_os == PAMI (solo OSN)
+    "invalidos":   0.01,    # un campo con un valor fuera del catálogo
+    "multilinea":  0.001,   # registro partido en dos líneas con "'\n'"
+    "plan_parcial": 0.3,    # tipo_plan == "P" (solo EMP)
+}
+
+# Tamaños de la suite (filas)
+TAMANOS = {"100k": 100_000, "1M": 1_000_000, "10M": 10_000_000, "50M": 50_000_000}
+
+BLOQUE = 500_000
+
+_NOMBRES = np.array([
+    "PEREZ JUAN", "GOMEZ ANA", "LOPEZ MARIA", "DIAZ CARLOS", "MARTINEZ LUCIA",
+    "FERNANDEZ JOSE", "GARCIA SOFIA", "RODRIGUEZ PABLO", "SOSA MARTA", "ROMERO LUIS",
+])
+_LETRAS = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+
+def _codigos_os() -> np.ndarray:
+    """Códigos RNOS de obra social distintos de PAMI."""
+    rnos = pd.read_csv(Path(REF_DIR, "rnos.csv"), sep=";", dtype=str, encoding="utf-8-sig")["rnos"]
+    cod = rnos.str.strip().str.zfill(6).to_numpy(dtype=object)
+    return cod[cod != PAMI]
+
+# ─────────── Valores ───────────
+def _digitos(rng: np.random.Generator, n: int, largo: int) -> pd.Series:
+    # largo dígitos ASCII por fila, vistos como una cadena de ancho fijo
+    codigos = rng.integers(48, 58, (n, largo), dtype=np.uint8)
+    return pd.Series(codigos.view(f"S{largo}").ravel().astype(f"U{largo}"), dtype=object)
+
+@lru_cache(maxsize=None)
+def _tabla_fechas(formato: str) -> np.ndarray:
+    dias = pd.date_range("1940-01-01", periods=30_000, freq="D")
+    return np.asarray(dias.strftime(formato), dtype=object)
+
+def _fechas(rng: np.random.Generator, n: int, formato: str) -> pd.Series:
+    return pd.Series(_tabla_fechas(formato)[rng.integers(0, 30_000, n)])
+
+def _validos(r: validacion.Regla | None, n: int, rng: np.random.Generator) -> pd.Series:
+    """Valores que cumplen la regla r (texto libre si no hay regla)."""
+    if r is None:
+        return pd.Series(rng.choice(_NOMBRES, n))
+    if r.valores:
+        return pd.Series(rng.choice(np.array([v for v in r.valores if v]), n))
+    largo = r.maximo or 10
+    if r.patron and r.patron.startswith(r"^[\d/"):
+        return _fechas(rng, n, "%d/%m/%Y")
+    if r.patron:
+        # decimal p.s
+        return pd.Series(rng.integers(0, 100_000, n)).astype(str) + "." + _digitos(rng, n, 2)
+    if r.clase == "N":
+        return _digitos(rng, n, largo)
+    if r.clase == "A" and largo == 1:
+        return pd.Series(rng.choice(_LETRAS, n))
+    if r.clase == "A":
+        return pd.Series(rng.choice(_NOMBRES, n)).str.replace(" ", "").str[:largo]
+    return pd.Series(rng.choice(_NOMBRES, n)).str[:largo]
+
+def _bloque(tp: str, cols: List[str], plan: Dict[str, validacion.Regla], n: int,
+            rng: np.random.Generator, tasas: Dict[str, float], codigos: np.ndarray) -> pd.DataFrame:
+    """n filas sintéticas de tp con los casos de tasas."""
+    df = pd.DataFrame({c: _validos(plan.get(c), n, rng) for c in cols})
+    cuil = pd.Series(rng.integers(20_000_000_000, 27_999_999_999, n)).astype(str)
+    df["cuil_beneficiario"] = cuil
+    df["cuil_titular"] = cuil
+    df["numero_documento"] = cuil.str[2:10]
+    df["cuit_empleador"] = pd.Series(rng.integers(30_000_000_000, 30_000_005_000, n)).astype(str)
+    if tp == "EMP":
+        df["codigo_emp"] = pd.Series(rng.integers(100_000, 100_200, n)).astype(str)
+        df["tipo_plan"] = np.where(rng.random(n) < tasas["plan_parcial"], "P", "T")
+        df["fecha_nacimiento"] = _fechas(rng, n, "%d/%m/%Y")
+    else:
+        df["codigo_os"] = np.where(rng.random(n) < tasas["pami"], PAMI, rng.choice(codigos, n))
+        df["fecha_nacimiento"] = _fechas(rng, n, "%d%m%Y")
+
+    # pluriempleo: cuil y obra social de otra fila, empleador propio
+    pl = np.flatnonzero(rng.random(n) < tasas["pluriempleo"])
+    if len(pl):
+        origen = rng.integers(0, n, len(pl))
+        for c in ("cuil_beneficiario", "cuil_titular", "numero_documento", "codigo_os" if tp != "EMP" else "codigo_emp"):
+            df.loc[pl, c] = df[c].to_numpy()[origen]
+
+    # valores fuera del catálogo en un campo enumerado o de clase N/A
+    campos = [c for c in cols if c in plan and (plan[c].valores or plan[c].clase)]
+    inv = np.flatnonzero(rng.random(n) < tasas["invalidos"])
+    for c, filas in pd.Series(inv).groupby(rng.choice(campos, len(inv))):
+        df.loc[filas.to_numpy(), c] = "ZZ"
+
+    # duplicados: copias exactas de otra fila del bloque
+    dup = np.flatnonzero(rng.random(n) < tasas["duplicados"])
+    if len(dup):
+        df.iloc[dup] = df.iloc[rng.integers(0, n, len(dup))].to_numpy()
+    return df
+
+def _lineas(df: pd.DataFrame, rng: np.random.Generator, tasa: float) -> pd.Series:
+    """Líneas "|"-separadas; una fracción tasa queda partida en dos por comillas."""
+    cols = list(df.columns)
+    if pa is not None:
+        arrs = [pa.array(df[c].to_numpy(), type=pa.string()) for c in cols]
+        lineas = pd.Series(pa_pc.binary_join_element_wise(*arrs, "|").to_numpy(zero_copy_only=False))
+    else:
+        lineas = df[cols[0]].str.cat([df[c] for c in cols[1:]], sep="|")
+    partidas = np.flatnonzero(rng.random(len(df)) < tasa)
+    for i, u in zip(partidas, rng.random(len(partidas))):
+        # como en los padrones reales, el corte cae en cualquier punto de la línea
+        ln = lineas.iat[i]
+        k = 1 + int(u * (len(ln) - 1))
+        lineas.iat[i] = ln[:k] + "'\n'" + ln[k:]
+    return lineas
+
+# ─────────── Generación ───────────
+def generar(
+    path: Path | str,
+    tp: str,
+    filas: int,
+    semilla: int = 0,
+    tasas: Dict[str, float] | None = None,
+    fin_linea: str = "\r\n",
+) -> Path:
+    """Escribe en path un padrón tp de filas registros y lo devuelve."""
+    path = Path(path)
+    tasas = {**TASAS, **(tasas or {})}
+    cols = columnas(tp)
+    plan = {r.campo: r for r in validacion.plan(tp)}
+    codigos = _codigos_os()
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        for i, ini in enumerate(range(0, filas, BLOQUE)):
+            rng = np.random.default_rng([semilla, i])
+            df = _bloque(tp, cols, plan, min(BLOQUE, filas - ini), rng, tasas, codigos)
+            texto = "\n".join(_lineas(df, rng, tasas["multilinea"]).tolist()) + "\n"
+            f.write(texto.replace("\n", fin_linea).encode("latin-1"))
+    tmp.replace(path)
+    return path
+
+def obtener(directorio: Path | str, tp: str, tamano: str, semilla: int = 0) -> Path:
+    """Padrón de la suite para (tp, tamano, semilla), generado solo si no existe."""
+    p = Path(directorio) / f"{tp}_{tamano}_s{semilla}.txt"
+    return p if p.exists() else generar(p, tp, TAMANOS[tamano], semilla)
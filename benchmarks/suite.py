@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+suite.py – Benchmarks de leer_chunks, load_references, unificación,
+análisis y descarga sobre padrones sintéticos.
+Cada medición corre en un proceso propio (python -m app.benchmarks
+--interno ...) para que el pico de RSS sea el de ese paso solo. Los
+resultados se guardan en BENCH_DIR y se comparan contra la línea de base
+(BASE, versionada junto al código); --guardar-base la reemplaza.
+"""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import platform
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from app.config import CACHE_DIR, PARSE_WORKERS
+from app.benchmarks import sintetico
+
+try:
+    import resource
+except ImportError:
+    # Windows: sin getrusage no se informa el pico de RSS
+    resource = None
+
+BENCH_DIR = CACHE_DIR / "bench"
+BASE = Path(__file__).with_name("baseline.json")
+
+BENCHS = ("leer_chunks", "load_references", "unificacion", "analisis", "analisis_incremental", "descarga")
+
+UMBRAL = 0.10   # empeoramiento relativo que se marca como regresión
+
+# ─────────── Mediciones (en el proceso hijo) ───────────
+def _rss_mb() -> Dict[str, float | None]:
+    if resource is None:
+        return {"rss_pico_mb": None, "rss_hijos_mb": None}
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    esc = 1 / 1024 if sys.platform != "darwin" else 1 / 1024 ** 2
+    return {
+        "rss_pico_mb":  round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * esc, 1),
+        "rss_hijos_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * esc, 1),
+    }
+
+def _frio(src: Path) -> None:
+    """Descarta lo cacheado de src para medir desde cero."""
+    from app import parse_cache, parciales
+    parse_cache.invalidar(src)
+    parciales.invalidar(src)
+
+def _medir(bench: str, tp: str, src: Path) -> Dict:
+    """Corre bench sobre src y devuelve segundos y filas procesadas."""
+    from app.data_utils import leer_chunks, load_references
+    from app.engine import analizar, columnas
+    from app.unify import unificar
+    from app import descarga
+
+    cols = columnas(tp)
+    tmp = Path(tempfile.mkdtemp(prefix="bench_", dir=BENCH_DIR))
+    try:
+        if bench == "load_references":
+            reps = 20
+            t0 = time.perf_counter()
+            for _ in range(reps):
+                load_references.func(tp)
+            return {"segundos": (time.perf_counter() - t0) / reps, "filas": None}
+
+        _frio(src)
+        if bench in ("analisis_incremental", "descarga"):
+            # preparación sin medir: parciales en cache y resultados a comprimir
+            (tmp / "previo").mkdir()
+            summary = analizar([src], tp, tmp / "previo")
+        t0 = time.perf_counter()
+        if bench == "leer_chunks":
+            filas = sum(len(ch) for ch in leer_chunks(src, cols, workers=PARSE_WORKERS))
+        elif bench == "unificacion":
+            filas = unificar([src], cols, tmp / "unif.txt")
+            _frio(tmp / "unif.txt")
+        elif bench in ("analisis", "analisis_incremental"):
+            s = analizar([src], tp, tmp)
+            filas = s["tot_emp"] + s["tot_pami"] + s["tot_osn"]
+        elif bench == "descarga":
+            claves = [k for k in summary if k.startswith("csv_")]
+            descarga.armar_zip([(Path(summary[k]).name, Path(summary[k])) for k in claves], tmp / "r.zip")
+            filas = None
+        else:
+            raise ValueError(f"benchmark desconocido: {bench}")
+        return {"segundos": time.perf_counter() - t0, "filas": filas}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        _frio(src)
+
+def interno(bench: str, tp: str, src: str) -> None:
+    """Punto de entrada del proceso hijo: imprime el resultado como JSON."""
+    r = _medir(bench, tp, Path(src))
+    print(json.dumps({**r, **_rss_mb()}))
+
+# ─────────── Orquestación ───────────
+def correr(bench: str, tp: str, tamano: str, src: Path, repeticiones: int = 1) -> Dict:
+    """Mejor de repeticiones corridas de bench, cada una en un proceso nuevo."""
+    corridas = []
+    for _ in range(repeticiones):
+        out = subprocess.run(
+            [sys.executable, "-m", "app.benchmarks", "--interno", bench, tp, str(src)],
+            capture_output=True, text=True,
+        )
+        if out.returncode:
+            raise RuntimeError(f"falló {bench} {tp} {tamano}:\n{out.stderr}")
+        corridas.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    r = min(corridas, key=lambda c: c["segundos"])
+    seg, tam = r["segundos"], src.stat().st_size
+    return {
+        "bench": bench, "tipo": tp, "tamano": tamano,
+        "segundos": round(seg, 4),
+        "filas_por_segundo": round(r["filas"] / seg, 1) if r["filas"] and seg else None,
+        "mb_por_segundo": round(tam / 2 ** 20 / seg, 2) if bench != "load_references" and seg else None,
+        "rss_pico_mb": r["rss_pico_mb"],
+        "rss_hijos_mb": r["rss_hijos_mb"],
+    }
+
+def _clave(r: Dict) -> str:
+    return f"{r['bench']}|{r['tipo']}|{r['tamano']}"
+
+def comparar(resultados: List[Dict], base: List[Dict]) -> List[str]:
+    """Líneas de comparación contra base; marca las regresiones de más de UMBRAL."""
+    previos = {_clave(r): r for r in base}
+    lineas = []
+    for r in resultados:
+        b = previos.get(_clave(r))
+        if not b or not b["segundos"]:
+            continue
+        delta = r["segundos"] / b["segundos"] - 1
+        marca = "  ← REGRESIÓN" if delta > UMBRAL else ""
+        lineas.append(f"{_clave(r):45s} {b['segundos']:>10.3f}s → {r['segundos']:>10.3f}s ({delta:+.1%}){marca}")
+    return lineas
+
+def _tabla(resultados: List[Dict]) -> str:
+    cab = f"{'bench':22s} {'tipo':4s} {'tamaño':>6s} {'seg':>10s} {'filas/s':>12s} {'MB/s':>8s} {'RSS MB':>8s}"
+    filas = [cab, "-" * len(cab)]
+    for r in resultados:
+        fps = f"{r['filas_por_segundo']:,.0f}".replace(",", ".") if r["filas_por_segundo"] else "-"
+        filas.append(
+            f"{r['bench']:22s} {r['tipo']:4s} {r['tamano']:>6s} {r['segundos']:>10.3f} {fps:>12s} "
+            f"{r['mb_por_segundo'] or '-':>8} {r['rss_pico_mb'] or '-':>8}"
+        )
+    return "\n".join(filas)
+
+def main(argv: List[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.benchmarks", description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--tamanos", default="100k,1M", help=f"de {', '.join(sintetico.TAMANOS)}")
+    ap.add_argument("--tipos", default="EMP,OSN")
+    ap.add_argument("--bench", default=",".join(BENCHS), help=f"de {', '.join(BENCHS)}")
+    ap.add_argument("--semilla", type=int, default=0)
+    ap.add_argument("--repeticiones", type=int, default=1)
+    ap.add_argument("--guardar-base", action="store_true", help=f"reemplaza {BASE.name} con esta corrida")
+    ap.add_argument("--interno", nargs=3, metavar=("BENCH", "TIPO", "PADRON"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    BENCH_DIR.mkdir(exist_ok=True)
+    if args.interno:
+        interno(*args.interno)
+        return
+
+    resultados = []
+    for tp in args.tipos.split(","):
+        for tamano in args.tamanos.split(","):
+            src = sintetico.obtener(BENCH_DIR, tp, tamano, args.semilla)
+            for bench in args.bench.split(","):
+                resultados.append(correr(bench, tp, tamano, src, args.repeticiones))
+                print(_tabla(resultados[-1:]).splitlines()[-1], flush=True)
+
+    corrida = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "maquina": {"sistema": platform.platform(), "python": platform.python_version(),
+                    "procesador": platform.processor(), "parse_workers": PARSE_WORKERS},
+        "semilla": args.semilla,
+        "resultados": resultados,
+    }
+    salida = BENCH_DIR / f"resultados_{datetime.datetime.now():%Y%m%d_%H%M%S}.json"
+    salida.write_text(json.dumps(corrida, indent=2, ensure_ascii=False), encoding="utf-8")
+    print()
+    print(_tabla(resultados))
+    print(f"\nResultados en {salida}")
+
+    if BASE.exists():
+        lineas = comparar(resultados, json.loads(BASE.read_text(encoding="utf-8"))["resultados"])
+        if lineas:
+            print(f"\nContra la línea de base ({BASE.name}):")
+            print("\n".join(lineas))
+    if args.guardar_base:
+        BASE.write_text(json.dumps(corrida, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Línea de base guardada en {BASE}")
@@ -1,29 +1,50 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-callbacks.py – Registra en la app todos los callbacks (unificación, análisis y descarga).
+callbacks.py – Registra en la app todos los callbacks (unificación, análisis, paginado y descarga).
 """
 
-import os
 import time
-import tempfile
-import shutil
-import zipfile
-import io
-import datetime
-import re
 from pathlib import Path
-from collections import defaultdict, Counter
 
-from dash import Input, Output, State, dash_table, dcc, html
+from dash import Input, Output, State, MATCH, html, dash_table
 from dash.exceptions import PreventUpdate
 
-from app.config import PADRON_DIR, CACHE_DIR
-from app.data_utils import leer_chunks, append_csv, sample_df, load_references, thousand
-from app.layout import COLS_EMP
+from app.config import PADRON_DIR
+from app.layout import DIMENSIONES_CUBO
+from app import catalogo, descarga, sesiones
+
+# El motor (pandas, pyarrow, joblib) se importa dentro de cada callback, con
+# el primer trabajo que lo necesita: así la app abre sin cargarlo.
+
+# Etiquetas de las etapas que informan avance
+ETAPAS = {"primera_pasada": "Primera pasada", "segunda_pasada": "Segunda pasada"}
 
 def register_callbacks(app):
 
+    @app.callback(
+        Output("sesion", "data"),
+        Input("sesion",  "modified_timestamp"),
+        State("sesion",  "data"),
+    )
+    def sesion(_ts, sid):
+        # un id por pestaña: separa los archivos que genera cada usuario
+        if sid:
+            raise PreventUpdate
+        return sesiones.nueva()
+
+    @app.callback(
+        Output("archivos",      "options"),
+        Input("catalogo-tick",  "n_intervals"),
+        State("archivos",       "options"),
+    )
+    def catalogo_opciones(_n, actuales):
+        # archivos nuevos, borrados o con metadatos recién leídos
+        opts = catalogo.opciones()
+        if opts == actuales:
+            raise PreventUpdate
+        return opts
+
     @app.callback(
         Output("btn-anal", "disabled"),
         Input("st-unif", "data"),
@@ -39,47 +60,49 @@ def register_callbacks(app):
     def toggle_dl(res):
         return not bool(res)
 
-    @app.callback(
+    @app.long_callback(
         Output("st-unif",     "data"),
-        Output("archivos",    "options"),
         Output("out-resumen", "children"),
         Output("panel",       "children"),
         Input("btn-unif",     "n_clicks"),
         State("archivos",     "value"),
         State("padron",       "value"),
+        State("formato-unif", "value"),
+        State("sesion",       "data"),
+        running=[
+            (Output("btn-unif",   "disabled"), True, False),
+            (Output("btn-anal",   "disabled"), True, False),
+            (Output("btn-cancel", "disabled"), False, True),
+        ],
+        progress=[Output("prog-unif", "value"), Output("prog-unif", "max")],
+        cancel=[Input("btn-cancel", "n_clicks")],
         prevent_initial_call=True,
     )
-    def unification(n_clicks, files, tp):
-        if not files:
+    def unification(set_progress, n_clicks, files, tp, formato, sid):
+        if not files or not set(files) <= set(catalogo.listar()):
             raise PreventUpdate
+        from app.data_utils import thousand
+        from app.engine import columnas
+        from app.unify import unificar, salida
+        from app import parse_cache
 
-        if tp == "EMP":
-            cols = COLS_EMP
-        else:
-            df_ref, tablas = load_references(tp)
-            cols = df_ref["campo"].tolist()
-
-        outp = PADRON_DIR / f"unif_{int(time.time())}.txt"
-        total = 0
-
-        with open(outp, "w", encoding="latin-1") as f:
-            for fn in files:
-                src = PADRON_DIR / fn
-                for chunk in leer_chunks(src, cols):
-                    for row in chunk.itertuples(index=False):
-                        f.write("|".join(map(str, row)) + "\n")
-                    total += len(chunk)
+        # cada sesión escribe en su directorio: dos usuarios no se pisan
+        sesiones.purgar()
+        parse_cache.purgar()
+        cols = columnas(tp)
+        outp = salida(sesiones.directorio(sid or sesiones.nueva()), f"unif_{int(time.time())}", formato or "txt")
+        with sesiones.cupo(lambda _n: set_progress(("0", "1"))):
+            total = unificar(
+                [PADRON_DIR / fn for fn in files], cols, outp,
+                progreso=lambda hecho, tot: set_progress((str(hecho), str(max(tot, 1)))),
+            )
 
-        opts = [
-            {"label": fn, "value": fn}
-            for fn in sorted(os.listdir(PADRON_DIR))
-            if fn.endswith(".txt")
-        ]
         msg = html.Div(
             f"Unificación → {thousand(total)} filas en {outp.name} ✓",
             className="resumen-unificacion"
         )
-        return str(outp), opts, msg, ""
+        # al navegador va solo el nombre: analysis lo busca en el directorio de la sesión
+        return outp.name, msg, ""
 
     @app.long_callback(
         Output("out-resumen", "children", allow_duplicate=True),
@@ -92,215 +115,210 @@ def register_callbacks(app):
         State("st-unif",      "data"),
         State("archivos",     "value"),
         State("padron",       "value"),
+        State("sesion",       "data"),
         running=[
-            (Output("btn-anal", "disabled"), True, False),
-            (Output("btn-dl",   "disabled"), True, False),
+            (Output("btn-anal",   "disabled"), True, False),
+            (Output("btn-dl",     "disabled"), True, False),
+            (Output("btn-cancel", "disabled"), False, True),
         ],
+        progress=[
+            Output("prog-anal",     "value"),
+            Output("prog-anal",     "max"),
+            Output("prog-anal-txt", "children"),
+        ],
+        cancel=[Input("btn-cancel", "n_clicks")],
         prevent_initial_call=True,
     )
-    def analysis(n_clicks, unif_path, files, tp):
-        # determinar fuentes
-        if unif_path:
-            sources = [Path(unif_path)]
-        elif files:
+    def analysis(set_progress, n_clicks, unif, files, tp, sid):
+        # determinar fuentes; nombres y sesión vienen del navegador
+        if unif:
+            path = sesiones.unificado(sid, unif)
+            if path is None:
+                msg = html.Div("El archivo unificado ya no está disponible: volvé a unificar.")
+                return msg, "", None, None, None, None
+            sources = [path]
+        elif files and set(files) <= set(catalogo.listar()):
             sources = [PADRON_DIR / fn for fn in files]
         else:
             raise PreventUpdate
+        import pandas as pd
+        from app.data_utils import thousand
+        from app.engine import analizar
+        from app.paginado import tabla
+        from app.medicion import Medidor
+        from app import parciales, parse_cache, resultados
 
-        tmp_dir = tempfile.mkdtemp(prefix="anal_", dir=str(CACHE_DIR))
-
-        # archivos de salida
-        csv_emp  = Path(tmp_dir) / "Plan_Parcial.csv"
-        csv_pami = Path(tmp_dir) / "Multi-CUIT_PAMI.csv"
-        csv_osn  = Path(tmp_dir) / "Pluriempleo_OSN.csv"
-        csv_dup  = Path(tmp_dir) / "Duplicados.csv"
-        csv_err  = Path(tmp_dir) / "Errores.csv"
-
-        if tp == "EMP":
-            cols, tablas = COLS_EMP, {}
-        else:
-            df_ref, tablas = load_references(tp)
-            cols = df_ref["campo"].tolist()
-
-        reg2   = re.compile(r"^\d{1,2}$")
-        libres = {"discapacidad", "preexistente", "corporativo", "copago"}
+        # restos de análisis cancelados y entradas vencidas o de más
+        resultados.purgar()
+        parciales.purgar()
+        parse_cache.purgar()
 
-        tot_emp = tot_pami = tot_osn = 0
-        pp_emp  = m_pami   = m_osn   = 0
-        dup_emp = dup_pami = dup_osn = 0
-        err_emp = err_pami = err_osn = 0
+        def aviso(etapa, hecho, total, detalle):
+            pct = hecho * 100 // total if total else 0
+            texto = f"{ETAPAS.get(etapa, etapa)}: {pct}%" + (f" · {detalle}" if detalle else "")
+            set_progress((str(hecho), str(max(total, 1)), texto))
 
-        pluri_flag  = defaultdict(set)
-        dup_counter = Counter()
-
-        # ── Primera pasada ───────────────────
-        for src in sources:
-            for ch in leer_chunks(src, cols):
-                if tp == "EMP":
-                    tot_emp += len(ch)
-                    mask_pp = ch["tipo_plan"].str.strip() == "P"
-                    if mask_pp.any():
-                        append_csv(ch[mask_pp], csv_emp)
-                        pp_emp += int(mask_pp.sum())
-                else:
-                    is_pami = ch["codigo_os"].astype(str).str.strip() == "500807"
-                    tot_pami += int(is_pami.sum())
-                    tot_osn  += len(ch) - int(is_pami.sum())
-                    for _, row in ch.iterrows():
-                        pluri_flag[(row["cuil_beneficiario"], row["codigo_os"])].add(row["cuit_empleador"])
-
-                for key in zip(*(ch[c] for c in cols[:5])):
-                    dup_counter[key] += 1
-
-                for campo, valid in tablas.items():
-                    if campo not in ch.columns:
-                        continue
-                    col = ch[campo].astype(str).str.strip()
-                    bad = (~col.isin(valid)) if campo not in libres else (~col.str.match(reg2))
-                    if not bad.any():
-                        continue
-                    df_bad = ch[bad].assign(campo_error=campo)
-                    append_csv(df_bad, csv_err)
-                    if tp == "EMP":
-                        err_emp += int(bad.sum())
-                    else:
-                        err_pami += int((bad & is_pami).sum())
-                        err_osn  += int((bad & ~is_pami).sum())
-
-        # ── Segunda pasada ───────────────────
-        if tp != "EMP":
-            bad_pluri = {k for k, vs in pluri_flag.items() if len(vs) > 1}
-            for src in sources:
-                for ch in leer_chunks(src, cols):
-                    mask_pl = [
-                        tuple(r) in bad_pluri
-                        for r in zip(*(ch[c] for c in ("cuil_beneficiario", "codigo_os")))
-                    ]
-                    if any(mask_pl):
-                        df_pl = ch[mask_pl]
-                        is_pami = df_pl["codigo_os"].astype(str).str.strip() == "500807"
-                        append_csv(df_pl[is_pami],  csv_pami); m_pami += int(is_pami.sum())
-                        append_csv(df_pl[~is_pami], csv_osn);  m_osn  += len(df_pl) - int(is_pami.sum())
-
-                    mask_dup = [
-                        dup_counter[tuple(r)] > 1
-                        for r in zip(*(ch[c] for c in cols[:5]))
-                    ]
-                    if any(mask_dup):
-                        df_d = ch[mask_dup]
-                        append_csv(df_d, csv_dup)
-                        dup_pami += int((df_d["codigo_os"].astype(str).str.strip()=="500807").sum())
-                        dup_osn  += len(df_d) - int((df_d["codigo_os"].astype(str).str.strip()=="500807").sum())
-        else:
-            for src in sources:
-                for ch in leer_chunks(src, cols):
-                    mask_dup = [
-                        dup_counter[tuple(r)] > 1
-                        for r in zip(*(ch[c] for c in cols[:5]))
-                    ]
-                    if any(mask_dup):
-                        append_csv(ch[mask_dup], csv_dup)
-                        dup_emp += sum(mask_dup)
+        # mismos archivos, tipo y catálogos: el resultado guardado
+        clave = resultados.clave(sources, tp)
+        summary = resultados.buscar(clave)
+        if summary is None:
+            espera = lambda n: set_progress(("0", "1", f"En cola: {n} trabajos en curso"))
+            with sesiones.cupo(espera):
+                # otra sesión pudo terminar el mismo análisis mientras este esperaba
+                summary = resultados.buscar(clave)
+                if summary is None:
+                    tmp_dir = resultados.crear()
+                    summary = resultados.publicar(tmp_dir, clave, analizar(sources, tp, tmp_dir, Medidor(aviso)))
+        csv_emp, csv_pami, csv_osn, csv_dup, csv_err = (
+            Path(summary[k]) for k in ("csv_emp", "csv_pami", "csv_osn", "csv_dup", "csv_err")
+        )
+        s = summary
 
         # ── Construcción de resumen y panel ───
         pct = lambda n, t: "0,0%" if t == 0 else f"{n*100/t:.1f}%".replace(",",",")
 
+        # campos con más filas inválidas, del agregado del análisis
+        top = sorted(s["err_campos"].items(), key=lambda kv: -kv[1])[:5]
+        campos_error = html.P(
+            "Campos con más errores: " + ", ".join(f"{c} ({thousand(n)})" for c, n in top)
+        ) if top else None
+
         if tp == "EMP":
             resumen = html.Div([
                 html.H4("Resumen EMP"),
-                html.P(f"Total: {thousand(tot_emp)}"),
-                html.P(f"Plan Parcial: {thousand(pp_emp)} ({pct(pp_emp, tot_emp)})"),
-                html.P(f"Duplicados: {thousand(dup_emp)} ({pct(dup_emp, tot_emp)})"),
-                html.P(f"Errores: {thousand(err_emp)} ({pct(err_emp, tot_emp)})"),
+                html.P(f"Total: {thousand(s['tot_emp'])}"),
+                html.P(f"Plan Parcial: {thousand(s['pp_emp'])} ({pct(s['pp_emp'], s['tot_emp'])})"),
+                html.P(f"Duplicados: {thousand(s['dup_emp'])} ({pct(s['dup_emp'], s['tot_emp'])})"),
+                html.P(f"Errores: {thousand(s['err_emp'])} ({pct(s['err_emp'], s['tot_emp'])})"),
+                campos_error,
             ])
         else:
             resumen = html.Div([
                 html.H4("Resumen PAMI"),
-                html.P(f"Total: {thousand(tot_pami)}"),
-                html.P(f"Multi-CUIT: {thousand(m_pami)} ({pct(m_pami, tot_pami)})"),
-                html.P(f"Duplicados: {thousand(dup_pami)} ({pct(dup_pami, tot_pami)})"),
-                html.P(f"Errores: {thousand(err_pami)} ({pct(err_pami, tot_pami)})"),
+                html.P(f"Total: {thousand(s['tot_pami'])}"),
+                html.P(f"Multi-CUIT: {thousand(s['m_pami'])} ({pct(s['m_pami'], s['tot_pami'])})"),
+                html.P(f"Duplicados: {thousand(s['dup_pami'])} ({pct(s['dup_pami'], s['tot_pami'])})"),
+                html.P(f"Errores: {thousand(s['err_pami'])} ({pct(s['err_pami'], s['tot_pami'])})"),
                 html.Hr(),
                 html.H4("Resumen resto OSN"),
-                html.P(f"Total: {thousand(tot_osn)}"),
-                html.P(f"Pluriempleo: {thousand(m_osn)} ({pct(m_osn, tot_osn)})"),
-                html.P(f"Duplicados: {thousand(dup_osn)} ({pct(dup_osn, tot_osn)})"),
-                html.P(f"Errores: {thousand(err_osn)} ({pct(err_osn, tot_osn)})"),
+                html.P(f"Total: {thousand(s['tot_osn'])}"),
+                html.P(f"Pluriempleo: {thousand(s['m_osn'])} ({pct(s['m_osn'], s['tot_osn'])})"),
+                html.P(f"Duplicados: {thousand(s['dup_osn'])} ({pct(s['dup_osn'], s['tot_osn'])})"),
+                html.P(f"Errores: {thousand(s['err_osn'])} ({pct(s['err_osn'], s['tot_osn'])})"),
+                html.Hr(),
+                campos_error,
             ])
 
-        def make_table(path: Path):
-            df = sample_df(path)
-            return dash_table.DataTable(
-                df.to_dict("records"),
-                [{"name": c, "id": c} for c in df.columns],
-                page_size=10
-            )
+        # agregado chico (una fila por código): viaja entero y se ordena en el navegador
+        ent = pd.read_csv(summary["csv_err_ent"], sep="|", dtype={"entidad": str}, keep_default_na=False)
+        totales = dash_table.DataTable(
+            data=ent.to_dict("records"), columns=[{"name": c, "id": c} for c in ent.columns],
+            page_size=10, sort_action="native", filter_action="native",
+        )
 
         panel = html.Div([
             html.H4("Plan Parcial" if tp=="EMP" else "Multi-CUIT"),
-            make_table(csv_emp if tp=="EMP" else csv_pami), html.Br(),
+            tabla("csv_emp", csv_emp) if tp=="EMP" else tabla("csv_pami", csv_pami), html.Br(),
             html.H4("Pluriempleo") if tp!="EMP" else None,
-            make_table(csv_osn)    if tp!="EMP" else None, html.Br(),
-            html.H4("Duplicados"), make_table(csv_dup), html.Br(),
-            html.H4("Errores"),    make_table(csv_err)
+            tabla("csv_osn", csv_osn) if tp!="EMP" else None, html.Br(),
+            html.H4("Duplicados"), tabla("csv_dup", csv_dup), html.Br(),
+            html.H4("Errores"),    tabla("csv_err", csv_err), html.Br(),
+            html.H4("Totales por obra social" if tp != "EMP" else "Totales por entidad"),
+            totales,
         ])
 
-        summary = {
-            "tipo":    tp,
-            "tmp_dir": tmp_dir,
-            "csv_emp": str(csv_emp),
-            "csv_pami":str(csv_pami),
-            "csv_osn": str(csv_osn),
-            "csv_dup": str(csv_dup),
-            "csv_err": str(csv_err),
-            "tot_emp":  tot_emp,  "pp_emp":  pp_emp,  "dup_emp":  dup_emp,  "err_emp":  err_emp,
-            "tot_pami": tot_pami, "m_pami":   m_pami,  "dup_pami": dup_pami, "err_pami": err_pami,
-            "tot_osn":  tot_osn,  "m_osn":    m_osn,   "dup_osn":  dup_osn, "err_osn":  err_osn
-        }
+        # al navegador va solo la clave: las rutas se resuelven en el servidor (resultados.buscar)
+        nombres = (Path(summary[k]).name for k in ("csv_emp", "csv_dup", "csv_err"))
+        return resumen, panel, clave, *nombres
 
-        return resumen, panel, summary, summary["csv_emp"], summary["csv_dup"], summary["csv_err"]
+    @app.callback(
+        Output({"type": "tabla-res", "csv": MATCH}, "data"),
+        Output({"type": "tabla-res", "csv": MATCH}, "page_count"),
+        Input({"type": "tabla-res", "csv": MATCH}, "page_current"),
+        Input({"type": "tabla-res", "csv": MATCH}, "page_size"),
+        Input({"type": "tabla-res", "csv": MATCH}, "filter_query"),
+        Input({"type": "tabla-res", "csv": MATCH}, "sort_by"),
+        State({"type": "tabla-res", "csv": MATCH}, "id"),
+        State("st-sum", "data"),
+    )
+    def paginar(page, size, filtro, sort_by, id_, clave):
+        # al navegador solo viaja la página pedida
+        from app import resultados
+        from app.paginado import pagina
+        summary = resultados.buscar(clave)
+        csv = id_.get("csv", "")
+        if summary is None or not csv.startswith("csv_") or csv not in summary:
+            raise PreventUpdate
+        return pagina(summary[csv], page or 0, size, filtro, sort_by)
+
+    @app.callback(
+        Output("cubo",         "hidden"),
+        Output("cubo-agrupar", "options"),
+        Output("cubo-agrupar", "value"),
+        *(Output(f"cubo-f-{d}", p) for d in DIMENSIONES_CUBO for p in ("options", "value", "disabled")),
+        Input("st-sum", "data"),
+    )
+    def cubo_opciones(clave):
+        # las dimensiones y sus valores salen del cubo del análisis mostrado
+        from app import resultados
+        summary = resultados.buscar(clave)
+        if not summary or not Path(summary.get("csv_cubo", "")).is_file():
+            return True, [], [], *([], [], True) * len(DIMENSIONES_CUBO)
+        from app import cubo
+        tb = cubo.cargar(summary["csv_cubo"], summary["tipo"])
+        dims = cubo.dimensiones(summary["tipo"])
+        filtros = []
+        for d in DIMENSIONES_CUBO:
+            filtros += [[{"label": v, "value": v} for v in cubo.valores(tb, d)], [], d not in dims]
+        return False, [{"label": d, "value": d} for d in dims], dims[:1], *filtros
 
     @app.callback(
-        Output("dl", "data"),
-        Input("btn-dl","n_clicks"),
-        State("st-sum","data"),
+        Output("cubo-tabla", "data"),
+        Output("cubo-tabla", "columns"),
+        Output("cubo-total", "children"),
+        Input("cubo-agrupar", "value"),
+        *(Input(f"cubo-f-{d}", "value") for d in DIMENSIONES_CUBO),
+        State("st-sum", "data"),
+    )
+    def consultar(agrupar, *args):
+        *valores, clave = args
+        from app import resultados
+        summary = resultados.buscar(clave)
+        if not summary or not Path(summary.get("csv_cubo", "")).is_file():
+            raise PreventUpdate
+        from app import cubo
+        from app.data_utils import thousand
+        tb = cubo.cargar(summary["csv_cubo"], summary["tipo"])
+        filtros = dict(zip(DIMENSIONES_CUBO, valores))
+        total = cubo.consultar(tb, None, filtros).iloc[0]
+        out = cubo.consultar(tb, agrupar, filtros)
+        texto = " · ".join(f"{m}: {thousand(total[m])}" for m in cubo.MEDIDAS)
+        return out.to_dict("records"), [{"name": c, "id": c} for c in out.columns], html.P(texto)
+
+    @app.long_callback(
+        Output("dl-url",  "data"),
+        Output("dl-link", "children"),
+        Input("btn-dl",   "n_clicks"),
+        State("st-sum",   "data"),
+        running=[(Output("btn-dl", "disabled"), True, False)],
         prevent_initial_call=True,
     )
-    def download(n_clicks, summary):
-        if not summary:
+    def download(n_clicks, clave):
+        from app import resultados
+        summary = resultados.buscar(clave)
+        if not summary or not Path(summary["tmp_dir"]).is_dir():
             raise PreventUpdate
 
-        buf = io.BytesIO()
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
-            if summary["tipo"] == "EMP":
-                for p in (summary["csv_emp"], summary["csv_dup"], summary["csv_err"]):
-                    if Path(p).exists():
-                        z.write(p, arcname=Path(p).name)
-                z.writestr("Resumen_EMP.txt", "\n".join([
-                    f"Total: {summary['tot_emp']}",
-                    f"Plan Parcial: {summary['pp_emp']}",
-                    f"Duplicados: {summary['dup_emp']}",
-                    f"Errores: {summary['err_emp']}",
-                ]))
-            else:
-                for p in (summary["csv_pami"], summary["csv_osn"], summary["csv_dup"], summary["csv_err"]):
-                    if Path(p).exists():
-                        z.write(p, arcname=Path(p).name)
-                z.writestr("Resumen_PAMI.txt", "\n".join([
-                    f"Total: {summary['tot_pami']}",
-                    f"Multi-CUIT: {summary['m_pami']}",
-                    f"Duplicados: {summary['dup_pami']}",
-                    f"Errores: {summary['err_pami']}",
-                ]))
-                z.writestr("Resumen_Resto_OSN.txt", "\n".join([
-                    f"Total: {summary['tot_osn']}",
-                    f"Pluriempleo: {summary['m_osn']}",
-                    f"Duplicados: {summary['dup_osn']}",
-                    f"Errores: {summary['err_osn']}",
-                ]))
-        buf.seek(0)
-        shutil.rmtree(summary["tmp_dir"], ignore_errors=True)
-        return dcc.send_bytes(
-            buf.read(),
-            filename=f"analisis_{datetime.datetime.now():%Y%m%d_%H%M%S}.zip"
-        )
+        # el ZIP queda en la entrada del análisis para las próximas descargas
+        zip_path = descarga.empaquetar(summary)
+        href = descarga.url(zip_path)
+        link = html.A(f"Si la descarga no comienza, descargar {zip_path.name}", href=href)
+        return href, link
+
+    # la descarga la hace el navegador contra la ruta Flask, sin pasar por Dash
+    app.clientside_callback(
+        "function(href) { if (href) { window.location.href = href; } return ''; }",
+        Output("dl-js", "children"),
+        Input("dl-url", "data"),
+        prevent_initial_call=True,
+    )
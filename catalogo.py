@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+catalogo.py – Catálogo vivo de PADRON_DIR para el selector de archivos.
+listar() recorre el directorio en cada consulta (un scandir, sin abrir los
+archivos), así que el selector ve los padrones nuevos sin reiniciar. Un hilo
+en segundo plano completa los metadatos de cada uno (tamaño, registros, tipo
+detectado y codificación) leyéndolo una vez por bloques, y los guarda en
+CATALOGO_JSON con su tamaño y mtime: un archivo sin cambios no se vuelve a
+leer, tampoco entre reinicios. Al importarse no carga numpy ni pyarrow:
+los usa el hilo.
+"""
+
+import os
+import csv
+import json
+import time
+import codecs
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.config import PADRON_DIR, CACHE_DIR, REF_DIR, CATALOGO_INTERVALO
+from app.layout import COLS_EMP
+from app.comprimidos import PADRONES, abrir, es_comprimido
+
+CATALOGO_JSON = CACHE_DIR / "catalogo.json"
+
+BLOQUE = 4 * 1024 * 1024
+
+_lock = threading.Lock()
+_meta: Dict[str, Dict] = {}   # nombre → metadatos del archivo
+_hilo: threading.Thread | None = None
+
+# ─────────── Metadatos ───────────
+def _anchos() -> Dict[str, int]:
+    """Campos por registro de cada tipo de padrón."""
+    with open(Path(REF_DIR, "OSN.csv"), encoding="latin-1", newline="") as f:
+        osn = sum(1 for fila in csv.reader(f, delimiter=";") if fila and fila[0].strip()) - 1
+    return {"EMP": len(COLS_EMP), "OSN": osn}
+
+def _armar(cnt, j: int, exp: int, pipes: int) -> Tuple[int, int, int, int]:
+    """
+    Junta líneas desde j, acumulando pipes, hasta cerrar el registro partido
+    en curso, como data_utils._parse_bloque. Devuelve (j siguiente, pipes
+    acumulados o -1 si cerró, registros armados, líneas de exp-1 pipes usadas).
+    """
+    rapidas = 0
+    while j < len(cnt):
+        rapidas += int(cnt[j] == exp - 1)
+        pipes += int(cnt[j])
+        j += 1
+        if pipes >= exp - 1:
+            return j, -1, int(pipes == exp - 1), rapidas
+    return j, pipes, 0, rapidas
+
+def _registros(lineas: bytes, exp: int, pipes: int) -> Tuple[int, int]:
+    """
+    Registros que el parser arma con lineas (completas, con LF) y pipes del
+    registro partido que viene del bloque anterior (-1 si no hay). Una línea
+    con exp-1 pipes es un registro; una con menos abre uno partido que suma
+    las siguientes hasta llegar a exp-1 (se descarta si se pasa) y una con
+    más se descarta. Devuelve (registros, pipes pendientes).
+    """
+    import numpy as np
+
+    b = np.frombuffer(lineas, dtype=np.uint8)
+    fin = np.flatnonzero(b == 10)
+    cnt = np.diff(np.searchsorted(np.flatnonzero(b == 124), fin), prepend=0)
+    n = int(np.count_nonzero(cnt == exp - 1))
+    j = 0
+    if pipes >= 0:
+        j, pipes, armados, usadas = _armar(cnt, 0, exp, pipes)
+        n += armados - usadas
+    for i in np.flatnonzero(cnt < exp - 1):   # pocas: solo los registros partidos
+        if i < j:
+            continue
+        j, pipes, armados, usadas = _armar(cnt, int(i), exp, 0)
+        n += armados - usadas
+    return n, pipes
+
+def _normalizar(data: bytes) -> bytes:
+    # CRLF y CR como LF, igual que data_utils._normalizar
+    return data.replace(b"\r\n", b"\n").replace(b"\r", b"\n") if b"\r" in data else data
+
+def _contar(f, exp: int) -> Tuple[int, int, str]:
+    """
+    (bytes, registros, codificación) del flujo binario f. Los registros se
+    cuentan con la regla del parser (ver _registros), así que coinciden con
+    las filas que lee el análisis.
+    """
+    import numpy as np
+
+    leidos = registros = 0
+    resto, pipes = b"", -1   # línea partida entre bloques y registro partido en curso
+    dec = codecs.getincrementaldecoder("utf-8")()
+    utf8, ascii_, bom = True, True, False
+    while data := f.read(BLOQUE):
+        bom = bom or (not leidos and data.startswith(codecs.BOM_UTF8))
+        leidos += len(data)
+        if ascii_ and np.frombuffer(data, dtype=np.uint8).max(initial=0) >= 0x80:
+            ascii_ = False
+        if utf8 and not ascii_:
+            try:
+                dec.decode(data)
+            except UnicodeDecodeError:
+                utf8 = False
+        data = resto + data
+        # corte en el último fin de línea; un CR final puede ser un CRLF partido
+        corte = max(data.rfind(b"\n"), data.rfind(b"\r", 0, len(data) - 1)) + 1
+        data, resto = data[:corte], data[corte:]
+        n, pipes = _registros(_normalizar(data), exp, pipes)
+        registros += n
+    if resto:
+        n, pipes = _registros(_normalizar(resto + b"\n"), exp, pipes)
+        registros += n
+    if ascii_:
+        return leidos, registros, "ascii"
+    return leidos, registros, ("utf-8-sig" if bom else "utf-8") if utf8 else "latin-1"
+
+def metadatos(path: Path | str) -> Dict:
+    """Tamaño, registros, tipo y codificación del padrón path (lo lee entero)."""
+    path = Path(path)
+    st = path.stat()
+    anchos = _anchos()
+    leer = abrir if es_comprimido(path) else lambda p: open(p, "rb")
+    # el tipo sale de la cantidad de campos del primer registro
+    with leer(path) as f:
+        campos = f.readline().count(b"|") + 1
+    tipo = next((tp for tp, n in anchos.items() if n == campos), None)
+    with leer(path) as f:
+        leidos, registros, cod = _contar(f, anchos.get(tipo, campos))
+    return {
+        "tam": st.st_size, "mtime": st.st_mtime_ns, "bytes": leidos,
+        "registros": registros, "tipo": tipo, "codificacion": cod,
+    }
+
+def _vigente(meta: Dict | None, st: os.stat_result) -> bool:
+    return bool(meta) and meta["tam"] == st.st_size and meta["mtime"] == st.st_mtime_ns
+
+# ─────────── Cache ───────────
+def _leer() -> Dict[str, Dict]:
+    try:
+        return json.loads(CATALOGO_JSON.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _guardar() -> None:
+    tmp = CATALOGO_JSON.with_name(f"{CATALOGO_JSON.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(_meta), encoding="utf-8")
+    os.replace(tmp, CATALOGO_JSON)
+
+# ─────────── Escaneo ───────────
+def _entradas() -> List[os.DirEntry]:
+    with os.scandir(PADRON_DIR) as it:
+        return sorted(
+            (e for e in it if e.is_file() and e.name.lower().endswith(PADRONES)),
+            key=lambda e: e.name,
+        )
+
+def _pasada() -> None:
+    """Completa los metadatos que falten o estén desactualizados."""
+    # otro proceso del servidor pudo leer ya algunos archivos
+    for nombre, meta in _leer().items():
+        with _lock:
+            _meta.setdefault(nombre, meta)
+    vivos = set()
+    for e in _entradas():
+        vivos.add(e.name)
+        st = e.stat()
+        with _lock:
+            if _vigente(_meta.get(e.name), st):
+                continue
+        try:
+            meta = metadatos(e.path)
+        except Exception as exc:   # p. ej. zipfile.BadZipFile, zlib.error: el archivo queda ilegible
+            meta = {"tam": st.st_size, "mtime": st.st_mtime_ns, "error": str(exc)}
+        if not _vigente(meta, os.stat(e.path)):
+            continue   # cambió mientras se leía (p. ej. una copia en curso): la próxima pasada
+        with _lock:
+            _meta[e.name] = meta
+            _guardar()
+    with _lock:
+        if set(_meta) - vivos:
+            for nombre in set(_meta) - vivos:
+                del _meta[nombre]
+            _guardar()
+
+def _bucle() -> None:
+    while True:
+        try:
+            _pasada()
+        except Exception:
+            pass   # una pasada fallida no corta el hilo: el selector dejaría de refrescarse
+        time.sleep(CATALOGO_INTERVALO)
+
+def iniciar() -> None:
+    """Lanza (una vez por proceso) el hilo que lee los metadatos."""
+    global _hilo
+    with _lock:
+        if _hilo is None:
+            _meta.update(_leer())
+            _hilo = threading.Thread(target=_bucle, name="catalogo", daemon=True)
+            _hilo.start()
+
+# ─────────── Selector ───────────
+def _miles(n: int) -> str:
+    return f"{n:,}".replace(",", ".")
+
+def _tamano(n: int) -> str:
+    for unidad in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unidad == "GB":
+            return f"{n:.0f} {unidad}" if unidad == "B" else f"{n:.1f} {unidad}".replace(".", ",")
+        n /= 1024
+
+def _etiqueta(nombre: str, meta: Dict | None) -> str:
+    if meta is None:
+        return f"{nombre} · leyendo…"
+    if "error" in meta:
+        return f"{nombre} · {_tamano(meta['tam'])} · ilegible"
+    partes = [_tamano(meta["tam"]), f"{_miles(meta['registros'])} registros", meta["tipo"] or "tipo ?", meta["codificacion"]]
+    return " · ".join([nombre, *partes])
+
+def listar() -> List[str]:
+    """Padrones de PADRON_DIR, en orden."""
+    return [e.name for e in _entradas()]
+
+def opciones() -> List[Dict]:
+    """Opciones del selector de archivos con los metadatos ya leídos."""
+    iniciar()
+    out = []
+    for e in _entradas():
+        with _lock:
+            meta = _meta.get(e.name)
+        st = e.stat()
+        out.append({"label": _etiqueta(e.name, meta if _vigente(meta, st) else None), "value": e.name})
+    return out
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+comprimidos.py – Lectura en streaming de padrones comprimidos.
+Los padrones llegan como .gz, .zip o .zst; en lugar de extraerlos a disco,
+abrir los descomprime en un hilo aparte que trabaja hasta _ADELANTE bloques
+por delante del parser (zlib y zstd sueltan el GIL, así que descomprimir y
+parsear se solapan). El flujo entrega el contenido tal cual, con offsets
+relativos al texto descomprimido, y admite seek hacia adelante para releer
+registros. Un .zip se lee de su miembro más grande.
+"""
+
+import io
+import gzip
+import queue
+import struct
+import zipfile
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+
+from app.config import BLOCK_SIZE
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXTENSIONES = (".gz", ".zip", ".zst")
+PADRONES = (".txt", *EXTENSIONES)   # lo que ofrece el selector de archivos
+
+_ADELANTE = 4   # bloques descomprimidos en espera
+
+def es_comprimido(path: Path | str) -> bool:
+    return Path(path).suffix.lower() in EXTENSIONES
+
+@lru_cache(maxsize=1)
+def _arrow():
+    """pyarrow, importado al abrir el primer comprimido (el selector de archivos no lo necesita)."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        # Sin pyarrow: gzip de la biblioteca estándar y zstd solo con zstandard
+        return None
+    return pa
+
+# ─────────── Fuentes ───────────
+def _miembro(z: zipfile.ZipFile) -> zipfile.ZipInfo:
+    miembros = [i for i in z.infolist() if not i.is_dir()]
+    if not miembros:
+        raise ValueError(f"{z.filename}: el ZIP está vacío")
+    return max(miembros, key=lambda i: i.file_size)
+
+@contextmanager
+def _fuente(path: Path):
+    """Archivo binario con el contenido descomprimido de path (sin hilo)."""
+    ext = path.suffix.lower()
+    pa = _arrow()
+    if ext == ".zip":
+        with zipfile.ZipFile(path) as z, z.open(_miembro(z)) as f:
+            yield f
+    elif ext == ".gz" and pa is not None:
+        with pa.input_stream(str(path), compression="gzip") as f:
+            yield f
+    elif ext == ".gz":
+        with gzip.open(path, "rb") as f:
+            yield f
+    elif ext == ".zst" and pa is not None and pa.Codec.is_available("zstd"):
+        with pa.input_stream(str(path), compression="zstd") as f:
+            yield f
+    elif ext == ".zst" and zstandard is not None:
+        with open(path, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as f:
+            yield f
+    elif ext == ".zst":
+        raise RuntimeError("leer .zst requiere pyarrow con zstd o el paquete zstandard")
+    else:
+        raise ValueError(f"{path.name}: formato comprimido desconocido")
+
+# ─────────── Flujo ───────────
+class Flujo(io.RawIOBase):
+    """
+    Contenido descomprimido de un archivo, producido por un hilo de a
+    BLOCK_SIZE bytes. Solo admite seek hacia adelante (descartando).
+    """
+
+    def __init__(self, abrir_fuente: Callable):
+        super().__init__()
+        self._cola: queue.Queue = queue.Queue(_ADELANTE)
+        self._buf = memoryview(b"")
+        self._pos = 0
+        self._fin = False
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._producir, args=(abrir_fuente,), daemon=True)
+        self._hilo.start()
+
+    def _poner(self, x) -> None:
+        while not self._parar.is_set():
+            try:
+                self._cola.put(x, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _producir(self, abrir_fuente: Callable) -> None:
+        try:
+            with abrir_fuente() as src:
+                while not self._parar.is_set():
+                    data = src.read(BLOCK_SIZE)
+                    self._poner(data)
+                    if not data:
+                        return
+        except BaseException as e:
+            self._poner(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def _siguiente(self) -> bool:
+        if self._fin:
+            return False
+        x = self._cola.get()
+        if isinstance(x, BaseException):
+            self._fin = True
+            raise x
+        if not x:
+            self._fin = True
+            return False
+        self._buf = memoryview(x)
+        return True
+
+    def readinto(self, b) -> int:
+        # lecturas completas salvo al final, como un archivo
+        n = 0
+        while n < len(b) and (self._buf or self._siguiente()):
+            k = min(len(b) - n, len(self._buf))
+            b[n:n + k] = self._buf[:k]
+            self._buf = self._buf[k:]
+            n += k
+        self._pos += n
+        return n
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            pos += self._pos
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("el flujo comprimido no conoce su final")
+        if pos < self._pos:
+            raise io.UnsupportedOperation("el flujo comprimido solo avanza")
+        while self._pos < pos and self.read(min(pos - self._pos, BLOCK_SIZE)):
+            pass
+        return self._pos
+
+    def close(self) -> None:
+        self._parar.set()
+        super().close()
+
+def abrir(path: Path | str) -> Flujo:
+    """Flujo con el contenido descomprimido de path."""
+    path = Path(path)
+    return Flujo(lambda: _fuente(path))
+
+# ─────────── Tamaños ───────────
+def _tamano_zst(path: Path) -> int | None:
+    # Frame_Content_Size del encabezado del primer frame, si lo declara
+    with open(path, "rb") as f:
+        cab = f.read(18)
+    if len(cab) < 6 or struct.unpack("<I", cab[:4])[0] != 0xFD2FB528:
+        return None
+    fhd = cab[4]
+    fcs, unico, dic = fhd >> 6, (fhd >> 5) & 1, fhd & 3
+    pos = 5 + (0 if unico else 1) + (0, 1, 2, 4)[dic]
+    largo = (1 if unico else 0, 2, 4, 8)[fcs]
+    if not largo or len(cab) < pos + largo:
+        return None
+    v = int.from_bytes(cab[pos:pos + largo], "little")
+    return v + 256 if largo == 2 else v
+
+def _tamano_gz(path: Path) -> int:
+    # ISIZE es el tamaño del último miembro mod 2**32: se suman vueltas
+    # mientras quede por debajo de la mitad del comprimido, algo que no pasa
+    # con texto (los archivos chicos no dan la vuelta)
+    comp = path.stat().st_size
+    with open(path, "rb") as f:
+        f.seek(max(0, comp - 4))
+        isize = struct.unpack("<I", f.read(4).rjust(4, b"\0"))[0]
+    while comp > 2 ** 20 and isize < comp // 2:
+        isize += 2 ** 32
+    return isize
+
+def tamano(path: Path | str) -> int:
+    """
+    Bytes del contenido de path (descomprimido si es un .gz/.zip/.zst), para
+    el avance. En .gz y .zst es una estimación del encabezado o la cola.
+    """
+    path = Path(path)
+    ext = path.suffix.lower()
+    try:
+        if ext == ".zip":
+            with zipfile.ZipFile(path) as z:
+                return _miembro(z).file_size
+        if ext == ".gz":
+            return _tamano_gz(path)
+        if ext == ".zst":
+            return _tamano_zst(path) or path.stat().st_size
+    except (OSError, ValueError, zipfile.BadZipFile):
+        pass
+    return path.stat().st_size
@@ -5,6 +5,7 @@ config.py – Configuración central para la aplicación Dash de Análisis de Pa
 Contiene rutas, parámetros y el manager de long callbacks.
 """
 
+import os
 from pathlib import Path
 import diskcache as dc
 
@@ -13,15 +14,39 @@ BASE_DIR    = Path(__file__).parent.resolve()
 PADRON_DIR  = BASE_DIR / "padrones"
 REF_DIR     = BASE_DIR / "referencias"
 CACHE_DIR   = BASE_DIR / ".cache"
+PARSE_CACHE_DIR = CACHE_DIR / "parsed"
+PARCIAL_DIR = CACHE_DIR / "parciales"
+RESULT_DIR  = CACHE_DIR / "resultados"
+SESION_DIR  = CACHE_DIR / "sesiones"
 
 # Asegurarse de que existan
 PADRON_DIR.mkdir(exist_ok=True)
 REF_DIR.mkdir(exist_ok=True)
 CACHE_DIR.mkdir(exist_ok=True)
+PARSE_CACHE_DIR.mkdir(exist_ok=True)
+PARCIAL_DIR.mkdir(exist_ok=True)
+RESULT_DIR.mkdir(exist_ok=True)
+SESION_DIR.mkdir(exist_ok=True)
 
 # ─────────── PARÁMETROS DE CACHE Y BLOQUES ───────────
-CHUNK_SIZE = 50_000           # filas por chunk en la lectura por streaming
+CHUNK_SIZE = 50_000           # filas por bloque en las lecturas por índice (paginado, parciales)
+CHUNK_MEM  = 16 * 1024 * 1024 # bytes por chunk en la lectura por streaming; las filas se ajustan al layout
+BLOCK_SIZE = 16 * 1024 * 1024 # bytes leídos por bloque en el parser masivo
+PARSE_WORKERS = max(1, (os.cpu_count() or 1) - 1)  # procesos que parsean un mismo archivo
+DEDUP_MEM  = 512 * 1024 * 1024  # bytes de hashes de duplicados en memoria antes de ir a disco
+PARSE_CACHE      = True       # leer/guardar padrones parseados en PARSE_CACHE_DIR
+PARSE_CACHE_UNIF = True       # cachear el archivo unificado al generarlo
+PARSE_CACHE_TTL  = 7 * 24 * 3600  # segundos sin leerse tras los que se borra una entrada de PARSE_CACHE_DIR
+PARSE_CACHE_MAX  = 8 * 1024 ** 3  # bytes de PARSE_CACHE_DIR; se borran las entradas usadas hace más tiempo
+PARCIALES        = True       # guardar/reusar resultados parciales por archivo en PARCIAL_DIR
+PUNTO_CONTROL = 512 * 1024 * 1024  # bytes de fuente entre puntos de control de la primera pasada (0: sin puntos)
 CACHE_TTL  = 3 * 3600         # segundos de vida de la cache
+PUNTO_TTL  = 24 * 3600        # segundos que se conserva un parcial interrumpido para reanudarlo
+RESULT_CACHE_MAX = 4 * 1024 ** 3  # bytes de análisis completos guardados en RESULT_DIR
+ZIP_WORKERS = max(1, (os.cpu_count() or 1) - 1)  # miembros del ZIP de resultados comprimidos a la vez
+ZIP_NIVEL  = 6                # nivel deflate del ZIP de resultados
+TRABAJOS_SIMULTANEOS = 2     # unificaciones/análisis pesados a la vez en el servidor; el resto espera
+CATALOGO_INTERVALO = 5       # segundos entre revisiones de PADRON_DIR para el selector de archivos
 APP_TITLE  = "Análisis de Padrones"
 
 # ─────────── LONG CALLBACK MANAGER ───────────
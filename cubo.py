@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cubo.py – Cubo de agregados del análisis para consultas por dimensión.
+Durante la primera pasada cada chunk se cuenta por celda (entidad,
+provincia, plan en EMP y franja de edad) y las celdas se suman entre chunks
+y archivos; la segunda pasada agrega los duplicados y el pluriempleo de las
+filas que relee. El resultado es Cubo.csv junto a los demás CSV: unas
+miles de filas que responden agrupamientos y filtros sin volver al padrón.
+La edad es la que se cumple en el año de referencia (el año en curso, que
+forma parte de la clave de los parciales).
+"""
+
+import csv
+import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    # Sin pyarrow el año de nacimiento sale de pd.to_numeric y el CSV, de to_csv
+    pa = None
+
+from app.data_utils import texto
+
+# Dimensiones del cubo por tipo → columna del padrón de donde salen
+DIMENSIONES = {
+    "EMP": {"entidad": "codigo_emp", "id_provincia": "id_provincia", "tipo_plan": "tipo_plan", "edad": "fecha_nacimiento"},
+    "OSN": {"entidad": "codigo_os", "id_provincia": "id_provincia", "edad": "fecha_nacimiento"},
+}
+MEDIDAS = ["filas", "duplicados", "errores", "pluriempleo"]
+
+# Franjas de edad: límite inferior de cada una y su etiqueta
+FRANJAS = np.array([0, 18, 30, 45, 60, 75])
+ETIQUETAS = np.array(["0-17", "18-29", "30-44", "45-59", "60-74", "75+"], dtype=object)
+SIN_DATO = "s/d"
+EDAD_MAX = 120
+
+_COMPACTAR = 64   # tablas pendientes antes de sumarlas
+
+def anio_referencia() -> int:
+    return datetime.date.today().year
+
+def dimensiones(tp: str) -> List[str]:
+    return list(DIMENSIONES[tp])
+
+def columnas(tp: str) -> List[str]:
+    """Columnas de la tabla del cubo de tp."""
+    return [*dimensiones(tp), *MEDIDAS]
+
+# ─────────── Celdas ───────────
+def _anio(fechas: pd.Series) -> np.ndarray:
+    """Año (últimos 4 dígitos) de cada fecha DD/MM/AAAA o DDMMAAAA; -1 si no es un año."""
+    if pa is not None:
+        y = pa_pc.utf8_slice_codeunits(pa.array(texto(fechas).array), -4)
+        ok = pa_pc.and_(pa_pc.utf8_is_decimal(y), pa_pc.equal(pa_pc.utf8_length(y), 4))
+        return pa_pc.cast(pa_pc.if_else(ok, y, "-1"), pa.int64()).to_numpy(zero_copy_only=False)
+    y = texto(fechas).astype(str).str[-4:]
+    return pd.to_numeric(y.where(y.str.fullmatch(r"[0-9]{4}"), "-1")).to_numpy(dtype=np.int64)
+
+def _franja(fechas: pd.Series, anio: int) -> pd.Categorical:
+    """Franja de edad de cada fecha de nacimiento."""
+    nac = _anio(fechas)
+    edad = anio - nac
+    ok = (nac >= 0) & (edad >= 0) & (edad <= EDAD_MAX)
+    codigos = np.full(len(edad), len(ETIQUETAS), dtype=np.int8)
+    codigos[ok] = np.searchsorted(FRANJAS, edad[ok], side="right") - 1
+    return pd.Categorical.from_codes(codigos, categories=[*ETIQUETAS, SIN_DATO])
+
+def celdas(ch: pd.DataFrame, tp: str, anio: int) -> pd.DataFrame:
+    """Dimensiones de cada fila de un chunk (compacto o no) de tp."""
+    # el parser ya dejó los campos sin espacios; los categóricos se agrupan por código
+    out = {}
+    for dim, col in DIMENSIONES[tp].items():
+        out[dim] = _franja(ch[col], anio) if dim == "edad" else texto(ch[col]).array
+    return pd.DataFrame(out)
+
+# ─────────── Cubo ───────────
+class Cubo:
+    """Acumula por celda los conteos de MEDIDAS de un padrón tp."""
+
+    def __init__(self, tp: str, anio: int | None = None):
+        self.tp = tp
+        self.anio = anio or anio_referencia()
+        self.dims = dimensiones(tp)
+        self._partes: List[pd.DataFrame] = []
+
+    def agregar(self, ch: pd.DataFrame, **medidas) -> None:
+        """
+        Cuenta las filas de ch: cada medida nombrada vale 1 (o su máscara
+        booleana) por fila; las no nombradas, 0.
+        """
+        if not len(ch):
+            return
+        df = celdas(ch, self.tp, self.anio)
+        for m in MEDIDAS:
+            v = medidas.get(m, 0)
+            df[m] = np.asarray(v, dtype=np.int64) if np.ndim(v) else np.int64(v)
+        tb = df.groupby(self.dims, sort=False, observed=True, as_index=False)[MEDIDAS].sum()
+        self._partes.append(tb.astype({d: object for d in self.dims}))
+        if len(self._partes) > _COMPACTAR:
+            self._compactar()
+
+    def fusionar(self, tb: pd.DataFrame) -> None:
+        """Suma la tabla de otro cubo del mismo tipo (ver exportar)."""
+        if len(tb):
+            self._partes.append(tb[columnas(self.tp)])
+
+    def _compactar(self) -> None:
+        if len(self._partes) > 1:
+            todo = pd.concat(self._partes, ignore_index=True)
+            self._partes = [todo.groupby(self.dims, sort=False, as_index=False)[MEDIDAS].sum()]
+
+    def exportar(self) -> pd.DataFrame:
+        """Tabla dimensiones + MEDIDAS, una fila por celda."""
+        self._compactar()
+        if not self._partes:
+            return vacio(self.tp)
+        return self._partes[0].astype({m: np.int64 for m in MEDIDAS})
+
+def vacio(tp: str) -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=object if c not in MEDIDAS else np.int64) for c in columnas(tp)})
+
+# ─────────── Archivos ───────────
+def a_json(tb: pd.DataFrame) -> List[List]:
+    """Filas de tb como listas (para un punto de control)."""
+    return tb.astype({m: int for m in MEDIDAS}).to_numpy(dtype=object).tolist()
+
+def de_json(filas: List[List], tp: str) -> pd.DataFrame:
+    if not filas:
+        return vacio(tp)
+    return pd.DataFrame(filas, columns=columnas(tp)).astype({m: np.int64 for m in MEDIDAS})
+
+def guardar(tb: pd.DataFrame, path: Path | str) -> None:
+    """Escribe tb ordenada por sus dimensiones."""
+    dims = [c for c in tb.columns if c not in MEDIDAS]
+    tb = tb.sort_values(dims, kind="stable")
+    if pa is not None:
+        # el escritor de pyarrow es varias veces más rápido que to_csv con las
+        # decenas de miles de celdas de un padrón grande; mismo formato
+        try:
+            datos = pa.Table.from_pandas(tb, preserve_index=False)
+            with open(path, "wb") as f:
+                f.write(("|".join(tb.columns) + "\n").encode())
+                pa_csv.write_csv(datos, f, pa_csv.WriteOptions(
+                    delimiter="|", quoting_style="none", include_header=False))
+            return
+        except pa.ArrowInvalid:
+            pass   # un valor con "|" o comillas: to_csv lo escapa
+    tb.to_csv(path, sep="|", index=False, quoting=csv.QUOTE_NONE, escapechar="\\")
+
+def leer(path: Path | str, tp: str) -> pd.DataFrame:
+    return pd.read_csv(
+        path, sep="|", dtype={c: str for c in dimensiones(tp)}, keep_default_na=False,
+        quoting=csv.QUOTE_NONE, escapechar="\\",
+    )
+
+# ─────────── Consultas ───────────
+@lru_cache(maxsize=8)
+def _cargado(path: str, tp: str, _mtime: int) -> pd.DataFrame:
+    tb = leer(path, tp)
+    # dimensiones categóricas: los filtros y agrupamientos trabajan con códigos
+    return tb.astype({d: "category" for d in dimensiones(tp)})
+
+def cargar(path: Path | str, tp: str) -> pd.DataFrame:
+    """Cubo de path en memoria (se relee solo si el archivo cambió)."""
+    return _cargado(str(path), tp, Path(path).stat().st_mtime_ns)
+
+def valores(tb: pd.DataFrame, dim: str) -> List[str]:
+    """Valores presentes de dim, ordenados."""
+    if dim not in tb.columns:
+        return []
+    return sorted(map(str, tb[dim].unique()))
+
+def consultar(tb: pd.DataFrame, agrupar: List[str] | None, filtros: Dict[str, List[str]]) -> pd.DataFrame:
+    """
+    Suma MEDIDAS de las celdas de tb que cumplen filtros (dimensión → valores
+    admitidos; vacío = todos), agrupadas por agrupar (sin grupos: total).
+    """
+    m = np.ones(len(tb), dtype=bool)
+    for dim, vals in filtros.items():
+        if vals and dim in tb.columns:
+            m &= tb[dim].isin(vals).to_numpy()
+    sel = tb[m]
+    agrupar = [d for d in (agrupar or []) if d in tb.columns]
+    if not agrupar:
+        return sel[MEDIDAS].sum().to_frame().T.astype(np.int64)
+    out = sel.groupby(agrupar, observed=True, sort=True)[MEDIDAS].sum().reset_index()
+    return out.astype({d: str for d in agrupar})
@@ -3,10 +3,12 @@
 """
 data_utils.py – Lógica de acceso y transformación de datos para la app de Padrones.
 Contiene:
-- lectura en chunks de archivos .txt
+- lectura en chunks de archivos .txt (parser masivo por bloques), con
+  strings Arrow, chunks dimensionados por memoria y representación compacta;
+  los .gz/.zip/.zst se leen descomprimiendo en streaming (ver comprimidos)
 - conteo de filas
-- muestreo de datos
-- append a CSV con pipe-separador
+- muestreo de datos y lectura de filas por índice de offsets
+- append a CSV con pipe-separador (con índice de offsets)
 - carga y cache de referencias para validación
 """
 
@@ -19,13 +21,24 @@ import re
 import tempfile
 import shutil
 from pathlib import Path
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Iterator, List, Tuple, Set, Dict
 
+import numpy as np
 import pandas as pd
 from joblib import Memory
 
-from app.config import PADRON_DIR, REF_DIR, CACHE_DIR, CHUNK_SIZE
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.compute as pa_pc
+except ImportError:
+    # Sin pyarrow el parser masivo usa el motor C de pandas
+    pa = None
+
+from app.config import PADRON_DIR, REF_DIR, CACHE_DIR, CHUNK_SIZE, CHUNK_MEM, BLOCK_SIZE
+from app import parse_cache, comprimidos
 
 # ─────────── Cache para referencias ───────────
 _memory = Memory(str(CACHE_DIR), verbose=0)
@@ -40,84 +53,657 @@ norm = lambda s: re.sub(
 ).strip("_").lower()
 
 # ─────────── Operaciones sobre CSV ───────────
+# Cada CSV de resultados lleva un índice hermano (path + INDICE) con el
+# offset de inicio de cada registro como int64: contar filas es O(1) y
+# cualquier página se lee con un seek.
+INDICE = ".idx"
+
+def indice(path: Path | str) -> Path:
+    """Ruta del índice de offsets de path."""
+    path = Path(path)
+    return path.with_name(path.name + INDICE)
+
+def _inicios(data: bytes, cabecera: bool) -> np.ndarray:
+    """Offsets (relativos a data) de los registros escritos por append_csv."""
+    b = np.frombuffer(data, dtype=np.uint8)
+    fin = np.flatnonzero(b == 10)
+    # un \n escapado (precedido por una cantidad impar de "\\") no termina el registro
+    dudosos = fin[fin > 0]
+    dudosos = dudosos[b[dudosos - 1] == 92]
+    if len(dudosos):
+        escapados = []
+        for k in dudosos:
+            j = k - 1
+            while j >= 0 and b[j] == 92:
+                j -= 1
+            if (k - 1 - j) % 2:
+                escapados.append(k)
+        fin = np.setdiff1d(fin, escapados)
+    inicios = np.concatenate(([0], fin[:-1] + 1)).astype(np.int64)
+    return inicios[1:] if cabecera else inicios
+
 def append_csv(df: pd.DataFrame, path: Path | str) -> None:
-    """Agrega df al final de path, creando cabecera si no existe."""
+    """Agrega df al final de path, creando cabecera si no existe, y extiende su índice."""
     path = Path(path)
     if df.empty:
         return
-    df.to_csv(
-        path,
-        mode="a",
-        header=not path.exists(),
+    nuevo = not path.exists()
+    data = df.to_csv(
+        None,
+        header=nuevo,
         index=False,
         sep="|",
         quoting=csv.QUOTE_NONE,
         escapechar="\\"
-    )
+    ).encode("utf-8")
+    base = 0 if nuevo else path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(data)
+    with open(indice(path), "ab") as f:
+        (_inicios(data, nuevo) + base).tofile(f)
 
 def count_rows(path: Path | str) -> int:
     """Cuenta filas (sin cabecera) en un .txt con encoding latin-1."""
     path = Path(path)
     if not path.exists():
         return 0
+    if indice(path).exists():
+        return indice(path).stat().st_size // 8
     with open(path, encoding="latin-1") as f:
         return max(0, sum(1 for _ in f) - 1)
 
+def cabecera(path: Path | str) -> List[str]:
+    """Nombres de columna de un CSV de resultados ([] si no existe)."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, "rb") as f:
+        return f.readline().decode("utf-8").rstrip("\r\n").split("|")
+
+def _parsear_csv(data: bytes, cols: List[str], usecols: List[str] | None = None) -> pd.DataFrame:
+    """Registros de append_csv (sin cabecera) como DataFrame de strings."""
+    if os.linesep != "\n":
+        data = data.replace(os.linesep.encode(), b"\n")
+    if not data:
+        return pd.DataFrame({c: pd.Series(dtype="string") for c in (usecols or cols)})
+    return pd.read_csv(
+        io.BytesIO(data), sep="|", header=None, names=cols, usecols=usecols,
+        dtype="string", quoting=csv.QUOTE_NONE, escapechar="\\",
+        lineterminator="\n", keep_default_na=False,
+    )
+
+def leer_filas(path: Path | str, filas: np.ndarray, columnas: List[str] | None = None) -> pd.DataFrame:
+    """
+    Filas (números de registro, en ese orden) de un CSV con índice. Las
+    corridas consecutivas se leen de una sola vez.
+    """
+    path = Path(path)
+    cols = cabecera(path)
+    filas = np.asarray(filas, dtype=np.int64)
+    if not len(filas):
+        return _parsear_csv(b"", cols, columnas)
+    idx = np.memmap(indice(path), dtype=np.int64, mode="r")
+    fin_archivo = path.stat().st_size
+    cortes = np.flatnonzero(np.diff(filas) != 1) + 1
+    partes = []
+    with open(path, "rb") as f:
+        for corrida in np.split(filas, cortes):
+            a, z = int(corrida[0]), int(corrida[-1]) + 1
+            f.seek(int(idx[a]))
+            partes.append(f.read((int(idx[z]) if z < len(idx) else fin_archivo) - int(idx[a])))
+    del idx
+    return _parsear_csv(b"".join(partes), cols, columnas)
+
 def sample_df(path: Path | str, n: int = 1000) -> pd.DataFrame:
     """Lee los primeros n registros de un pipe-separated .txt en pandas."""
     path = Path(path)
     if not path.exists():
         return pd.DataFrame()
-    return pd.read_csv(path, sep="|", nrows=n, dtype="string")
+    if indice(path).exists():
+        return leer_filas(path, np.arange(min(n, count_rows(path))))
+    return pd.read_csv(path, sep="|", nrows=n, dtype="string",
+                       quoting=csv.QUOTE_NONE, escapechar="\\")
 
 # ─────────── Lectura por chunks ───────────
+# Texto de los chunks: strings Arrow (un buffer por columna, sin un objeto
+# Python por valor) o, sin pyarrow, el string de pandas
+STR = "string[pyarrow]" if pa is not None else "string"
+
 # Tipos de columna que deben forzarse a string
-DFTYPES = {k: "string" for k in (
+DFTYPES = {k: STR for k in (
     "cuil_beneficiario", "cuil_titular", "cuit_empleador",
     "codigo_emp", "codigo_os", "fecha_nacimiento"
 )}
 
+# Representación compacta (leer_chunks(..., compacto=True)): campos de pocos
+# valores distintos como categóricos y claves CUIL/CUIT como int64 cuando
+# str() del entero devuelve exactamente el texto (dígitos sin ceros a la
+# izquierda); si algún valor del chunk no cumple, la columna queda en texto.
+CATEGORICAS = ("tipo_plan", "sexo", "id_provincia", "codigo_os", "codigo_parentesco")
+CLAVES_INT  = ("cuil_beneficiario", "cuil_titular", "cuit_empleador")
+_ENTERO     = r"^[1-9][0-9]{0,17}$"
+
+_MIN_FILAS = 1_000   # piso de filas por chunk, por anchas que sean
+
+# Columnas internas con el rango de bytes de cada registro
+OFFSETS = ("_ini", "_fin")
+
+# Extensión de los unificados en formato columnar (Arrow IPC)
+COLUMNAR = ".arrow"
+
+# Caracteres que str.strip() considera espacio dentro de latin-1
+_ESPACIOS = "".join(c for c in map(chr, range(256)) if c.isspace())
+
 def _df(rows: List[List[str]], cols: List[str], vtypes: Dict[str, str]) -> pd.DataFrame:
     """Construye DataFrame de una lista de filas, ajustando tipos y ceros a la izquierda."""
-    df = pd.DataFrame(rows, columns=cols, dtype="string")
+    df = pd.DataFrame(rows, columns=cols, dtype=STR)
+    return _ajustar(df, vtypes)
+
+def _normalizar(data: bytes) -> bytes:
+    """Convierte CRLF y CR en LF, como la lectura en modo texto."""
+    if b"\r" not in data:
+        return data
+    return data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+def _ajustar(df: pd.DataFrame, vtypes: Dict[str, str]) -> pd.DataFrame:
+    """Aplica el padding de id_provincia y los tipos forzados."""
     if "id_provincia" in df.columns:
         df["id_provincia"] = df["id_provincia"].str.zfill(2).str.strip()
-    return df.astype(vtypes, errors="ignore")
+    vtypes = {c: t for c, t in vtypes.items() if df[c].dtype != t}
+    return df.astype(vtypes, errors="ignore") if vtypes else df
 
-def leer_chunks(path: Path | str, cols: List[str]) -> Iterator[pd.DataFrame]:
+def _registro(buf: List[str], exp: int) -> List[str] | None:
+    """Une las líneas de un registro partido y lo separa en exp campos."""
+    parts = "|".join(buf).split("|", exp - 1)
+    if len(parts) != exp:
+        return None
+    return [p.strip().strip("'") for p in parts]
+
+def _bloques(fh, size: int = BLOCK_SIZE, limite: int | None = None) -> Iterator[Tuple[bytes, int]]:
     """
-    Lee path en streaming, devolviendo DataFrames de hasta CHUNK_SIZE filas.
-    Maneja líneas partidas por comillas y pipe-separador.
+    Lee fh (binario) en bloques de ~size bytes cortados en fin de línea,
+    hasta limite bytes si se indica. Devuelve (bloque, offset en el archivo).
+    Un CR final queda para el bloque siguiente por si forma un CRLF partido.
+    """
+    base = fh.tell()
+    resto = b""
+    while True:
+        if limite is not None:
+            raw = fh.read(min(size, limite))
+            limite -= len(raw)
+        else:
+            raw = fh.read(size)
+        if not raw:
+            break
+        data = resto + raw
+        k = max(data.rfind(b"\n"), data.rfind(b"\r", 0, len(data) - 1)) + 1
+        if k:
+            yield data[:k], base
+            base += k
+        resto = data[k:]
+    if resto:
+        yield resto, base
+
+def _leer_rapidas(sub: str, cols: List[str], dtype: str = STR) -> pd.DataFrame:
+    """
+    Parsea en masa líneas con exactamente len(cols)-1 pipes.
+    Usa el lector CSV de pyarrow si está disponible, o el motor C de pandas.
+    Replica el strip("'") de la línea y el strip().strip("'") de cada campo.
+    """
+    if not sub:
+        return pd.DataFrame(columns=cols, dtype=dtype)
+
+    if pa is not None:
+        tb = pa_csv.read_csv(
+            io.BytesIO(sub.encode("utf-8")),
+            read_options=pa_csv.ReadOptions(column_names=cols),
+            parse_options=pa_csv.ParseOptions(
+                delimiter="|", quote_char=False, ignore_empty_lines=False
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={c: pa.string() for c in cols},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        arrs = []
+        for i, c in enumerate(cols):
+            a = tb.column(c)
+            if i == 0:
+                a = pa_pc.utf8_ltrim(a, "'")
+            if i == len(cols) - 1:
+                a = pa_pc.utf8_rtrim(a, "'")
+            arrs.append(pa_pc.utf8_trim(pa_pc.utf8_trim(a, _ESPACIOS), "'"))
+        tb = pa.table(arrs, names=cols)
+        return tb.to_pandas(types_mapper={pa.string(): pd.api.types.pandas_dtype(dtype)}.get)
+
+    df = pd.read_csv(
+        io.StringIO(sub),
+        sep="|",
+        header=None,
+        names=cols,
+        index_col=False,
+        dtype=dtype,
+        quoting=csv.QUOTE_NONE,
+        na_filter=False,
+        skip_blank_lines=False,
+        engine="c",
+    )
+    df[cols[0]] = df[cols[0]].str.lstrip("'")
+    df[cols[-1]] = df[cols[-1]].str.rstrip("'")
+    for c in cols:
+        df[c] = df[c].str.strip().str.strip("'")
+    return df
+
+def _parse_bloque(
+    raw: bytes,
+    cols: List[str],
+    pend: List,
+    dtype: str = STR,
+    base: int | None = None,
+) -> pd.DataFrame:
+    """
+    Parsea un bloque de líneas completas.
+    Las líneas con exactamente len(cols)-1 pipes se parsean en masa; solo las
+    partidas por comillas pasan por el armado línea a línea.
+    pend = [buf, pipes, inicio] conserva un registro partido entre bloques.
+    Si se indica base (offset del bloque en el archivo) agrega las columnas
+    OFFSETS con el rango de bytes [inicio, fin) de cada registro.
     """
-    path = Path(path)
     exp = len(cols)
-    buf: List[str] = []
-    rows: List[List[str]] = []
-    pipes = 0
+    data = _normalizar(raw)
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    arr = np.frombuffer(data, dtype=np.uint8)
+    fin = np.flatnonzero(arr == 10)
+    ini = np.empty_like(fin)
+    ini[0] = 0
+    ini[1:] = fin[:-1] + 1
+    pos = np.flatnonzero(arr == 124)
+    cnt = np.searchsorted(pos, fin) - np.searchsorted(pos, ini)
+
+    if base is not None:
+        # cada CRLF normalizado corre un byte las posiciones del original
+        r = np.frombuffer(raw, dtype=np.uint8)
+        crlf = np.flatnonzero((r[:-1] == 13) & (r[1:] == 10))
+        crlf -= np.arange(len(crlf))
+        o_ini = base + ini + np.searchsorted(crlf, ini)
+        o_fin = np.minimum(base + fin + 1 + np.searchsorted(crlf, fin + 1), base + len(raw))
+
+    text = data.decode("latin-1")
+    rapidas = np.ones(len(fin), dtype=bool)
+    lentas: List[Tuple[int, List[str], int]] = []
+    buf, pipes, inicio = pend
+
+    def armar(j: int) -> int:
+        # recorre desde j acumulando líneas hasta completar el registro
+        nonlocal pipes, inicio
+        if not buf and base is not None:
+            inicio = int(o_ini[j])
+        while j < len(fin):
+            buf.append(text[ini[j]:fin[j]].strip("'"))
+            pipes += int(cnt[j])
+            rapidas[j] = False
+            j += 1
+            if pipes >= exp - 1:
+                if pipes == exp - 1:
+                    row = _registro(buf, exp)
+                    if row is not None:
+                        lentas.append((j - 1, row, inicio))
+                buf.clear()
+                pipes = 0
+                break
+        return j
+
+    j = armar(0) if buf else 0
+    for i in np.flatnonzero(cnt != exp - 1):
+        if i < j:
+            continue
+        if cnt[i] > exp - 1:
+            rapidas[i] = False
+            continue
+        j = armar(i)
+    pend[1], pend[2] = pipes, inicio
+
+    ok = np.flatnonzero(rapidas)
+    if len(ok) == len(fin):
+        sub = text
+    elif len(ok):
+        cortes = np.flatnonzero(np.diff(ok) != 1)
+        a_ini = ok[np.r_[0, cortes + 1]]
+        a_fin = ok[np.r_[cortes, len(ok) - 1]]
+        sub = "".join(text[ini[a]:fin[b] + 1] for a, b in zip(a_ini, a_fin))
+    else:
+        sub = ""
+
+    df = _leer_rapidas(sub, cols, dtype)
+    if base is not None:
+        df[OFFSETS[0]] = o_ini[ok]
+        df[OFFSETS[1]] = o_fin[ok]
+    if lentas:
+        df_l = pd.DataFrame([r for _, r, _ in lentas], columns=cols, dtype=dtype)
+        if base is not None:
+            df_l[OFFSETS[0]] = np.array([p for _, _, p in lentas], dtype=np.int64)
+            df_l[OFFSETS[1]] = o_fin[[p for p, _, _ in lentas]]
+        orden = np.argsort(np.r_[ok, [p for p, _, _ in lentas]], kind="stable")
+        df = pd.concat([df, df_l], ignore_index=True).take(orden)
+        df.index = pd.RangeIndex(len(df))
+    return df
+
+def _tramo(df: pd.DataFrame, a: int, b: int) -> pd.DataFrame:
+    """Filas [a, b) de df con índice 0..n-1."""
+    if a == 0 and b == len(df):
+        return df
+    return df.iloc[a:b].reset_index(drop=True)
+
+def _filas_chunk(df: pd.DataFrame, mem: int) -> int:
+    """Filas que entran en mem bytes según el ancho medio de las filas de df."""
+    # con strings Arrow deep=True suma buffers, sin recorrer valores
+    por_fila = df.memory_usage(index=False, deep=pa is not None).sum() / len(df)
+    return max(_MIN_FILAS, int(mem / max(por_fila, 1)))
+
+def _rechunk(dfs: Iterator[pd.DataFrame], mem: int = CHUNK_MEM) -> Iterator[pd.DataFrame]:
+    """
+    Reagrupa DataFrames de tamaño variable en chunks de unos mem bytes: las
+    filas por chunk salen del ancho medio de las filas leídas, así que un
+    layout ancho da chunks más cortos con el mismo pico de memoria.
+    """
+    acum: List[pd.DataFrame] = []
+    n = 0
+    for df in dfs:
+        if df.empty:
+            continue
+        tam = _filas_chunk(df, mem)
+        acum.append(df)
+        n += len(df)
+        while n >= tam:
+            full = pd.concat(acum, ignore_index=True) if len(acum) > 1 else acum[0]
+            yield _tramo(full, 0, tam)
+            resto = _tramo(full, tam, len(full))
+            acum = [resto] if len(resto) else []
+            n = len(resto)
+    if n:
+        yield pd.concat(acum, ignore_index=True) if len(acum) > 1 else acum[0]
+
+def _sincro(fh, x: int, exp: int) -> int:
+    """
+    Primer punto >= x donde el parser arranca con el buffer vacío.
+    Una línea con exp-1 pipes o más siempre cierra (o descarta) el registro
+    en curso, así que se avanza hasta pasar la primera de ellas. Es una
+    función de los datos: el rango anterior calcula el mismo punto como fin.
+    """
+    if x <= 0:
+        return 0
+    fh.seek(x - 1)
+    fh.readline()  # completa la línea en curso
+    while True:
+        ln = fh.readline()
+        if not ln:
+            return fh.tell()
+        ln = ln.rstrip(b"\n")
+        if ln.endswith(b"\r"):
+            ln = ln[:-1]
+        if ln.rsplit(b"\r", 1)[-1].count(b"|") >= exp - 1:
+            return fh.tell()
+
+def _parse_tramo(fh, cols: List[str], limite: int) -> pd.DataFrame:
+    """Parsea limite bytes desde la posición de fh, que es un punto de sincro."""
     vtypes = {c: t for c, t in DFTYPES.items() if c in cols}
+    # Strings Arrow: se envían al proceso padre sin serializar objeto por objeto
+    pend: List = [[], 0, 0]
+    dfs = [_parse_bloque(data, cols, pend, STR, base) for data, base in _bloques(fh, limite=limite)]
+    dfs = [df for df in dfs if not df.empty]
+    if not dfs:
+        return pd.DataFrame(columns=cols, dtype=STR)
+    return _ajustar(pd.concat(dfs, ignore_index=True), vtypes)
 
-    with open(path, "r", encoding="latin-1", errors="ignore") as fh:
-        for ln in fh:
-            ln = ln.rstrip("\n").strip("'")
-            pipes += ln.count("|")
-            buf.append(ln)
+def _parse_rango(path: str, cols: List[str], a: int, b: int, desde: int = 0) -> pd.DataFrame:
+    """
+    Worker: parsea los registros que comienzan en el rango de bytes [a, b).
+    desde es el inicio de la lectura, ya un punto donde arranca un registro.
+    """
+    with open(path, "rb") as fh:
+        ini = a if a == desde else _sincro(fh, a, len(cols))
+        fin = _sincro(fh, b, len(cols))
+        fh.seek(ini)
+        return _parse_tramo(fh, cols, max(0, fin - ini))
+
+def _parse_datos(data: bytes, cols: List[str], base: int) -> pd.DataFrame:
+    """Worker: parsea data, que empieza en el punto de sincro base del flujo."""
+    df = _parse_tramo(io.BytesIO(data), cols, len(data))
+    if base and OFFSETS[0] in df.columns:
+        df[OFFSETS[0]] += base
+        df[OFFSETS[1]] += base
+    return df
 
-            if pipes < exp - 1:
+def _en_pool(tareas: Iterator[Tuple], workers: int, ordered: bool) -> Iterator[pd.DataFrame]:
+    """Corre tareas (fn, *args) en un pool con hasta workers en curso."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        en_curso: deque = deque()
+        for t in tareas:
+            en_curso.append(pool.submit(*t))
+            if len(en_curso) < workers:
                 continue
-            if pipes == exp - 1:
-                parts = "|".join(buf).split("|", exp - 1)
-                if len(parts) == exp:
-                    parts = [p.strip().strip("'") for p in parts]
-                    rows.append(parts)
-            buf.clear()
-            pipes = 0
-
-            if len(rows) >= CHUNK_SIZE:
-                yield _df(rows, cols, vtypes)
-                rows.clear()
-
-    if rows:
-        yield _df(rows, cols, vtypes)
+            if ordered:
+                fut = en_curso.popleft()
+            else:
+                fut = next(as_completed(en_curso))
+                en_curso.remove(fut)
+            yield fut.result()
+        while en_curso:
+            fut = en_curso.popleft() if ordered else next(as_completed(en_curso))
+            if not ordered:
+                en_curso.remove(fut)
+            yield fut.result()
+
+def _leer_paralelo(
+    path: Path, cols: List[str], workers: int, ordered: bool, desde: int = 0
+) -> Iterator[pd.DataFrame]:
+    """Reparte path (desde ese offset) en rangos de bytes y los parsea en un pool de procesos."""
+    size = path.stat().st_size
+    rango = 4 * BLOCK_SIZE
+    cortes = list(range(desde, size, rango)) + [size]
+    tareas = ((_parse_rango, str(path), cols, a, b, desde) for a, b in zip(cortes[:-1], cortes[1:]))
+    yield from _en_pool(tareas, workers, ordered)
+
+def _tramos_flujo(fh, cols: List[str]) -> Iterator[Tuple]:
+    """
+    Corta un flujo que no admite seek (comprimido) en tramos de ~4 bloques
+    que empiezan en puntos de sincro, como tareas de _parse_datos. La
+    posición actual de fh debe ser un punto de sincro.
+    """
+    resto, base = b"", fh.tell()
+    while True:
+        nuevo = fh.read(4 * BLOCK_SIZE)
+        if not nuevo:
+            break
+        data = resto + nuevo
+        corte = _sincro(io.BytesIO(data), max(1, len(resto)), len(cols))
+        if corte >= len(data):
+            # sin un punto de sincro completo dentro de data
+            resto = data
+            continue
+        yield _parse_datos, data[:corte], cols, base
+        resto, base = data[corte:], base + corte
+    if resto:
+        yield _parse_datos, resto, cols, base
+
+def _leer_flujo(path: Path, cols: List[str], workers: int, ordered: bool, desde: int = 0) -> Iterator[pd.DataFrame]:
+    """Parsea un comprimido en un pool: un hilo descomprime y acá se cortan los tramos."""
+    with comprimidos.abrir(path) as fh:
+        fh.seek(desde)
+        yield from _en_pool(_tramos_flujo(fh, cols), workers, ordered)
+
+def _abrir(path: Path):
+    """Archivo binario de path; los comprimidos, como flujo descomprimido."""
+    return comprimidos.abrir(path) if comprimidos.es_comprimido(path) else open(path, "rb")
+
+def texto(s: pd.Series) -> pd.Series:
+    """Columna de un chunk (compacto o no) como texto, tal como se leyó."""
+    if not pd.api.types.is_integer_dtype(s.dtype):
+        return s
+    if pa is not None:
+        return pd.Series(pd.arrays.ArrowStringArray(pa_pc.cast(pa.array(s.to_numpy()), pa.string())), index=s.index)
+    return s.astype(str).astype(STR)
+
+def compactar(df: pd.DataFrame) -> pd.DataFrame:
+    """Chunk con CATEGORICAS como categóricos y CLAVES_INT como int64 donde se pueda."""
+    cambios = {c: df[c].astype("category") for c in CATEGORICAS if c in df.columns}
+    for c in CLAVES_INT:
+        if c in df.columns and len(df) and df[c].str.fullmatch(_ENTERO).all():
+            if pa is not None:
+                cambios[c] = pa_pc.cast(pa.array(df[c].array), pa.int64()).to_numpy()
+            else:
+                cambios[c] = df[c].astype(np.int64)
+    return df.assign(**cambios) if cambios else df
+
+def _entregar(dfs: Iterator[pd.DataFrame], offsets: bool, columnas: List[str] | None, compacto: bool = False):
+    """
+    Adapta los chunks internos (con columnas OFFSETS) a lo pedido: solo
+    columnas si se indica, en representación compacta con compacto y, con
+    offsets, el par (df, off) con off de (n, 2).
+    """
+    for df in dfs:
+        out = df[columnas] if columnas is not None else df.drop(columns=list(OFFSETS))
+        if compacto:
+            out = compactar(out)
+        if offsets:
+            yield out, df[list(OFFSETS)].to_numpy(dtype=np.int64)
+        else:
+            yield out
+
+def _desde(dfs: Iterator[pd.DataFrame], desde: int) -> Iterator[pd.DataFrame]:
+    """Chunks de dfs sin los registros que empiezan antes del offset desde."""
+    for df in dfs:
+        ini = df[OFFSETS[0]].to_numpy()
+        if not len(ini) or ini[-1] < desde:
+            continue
+        yield df if ini[0] >= desde else df[ini >= desde].reset_index(drop=True)
+
+def _leer_columnar(path: Path, columnas: List[str] | None) -> Iterator[pd.DataFrame]:
+    """Chunks de un unificado columnar, con OFFSETS = números de fila."""
+    i = 0
+    for df in parse_cache.leer_ipc(path, columnas):
+        n = len(df)
+        df[OFFSETS[0]] = np.arange(i, i + n, dtype=np.int64)
+        df[OFFSETS[1]] = df[OFFSETS[0]] + 1
+        i += n
+        yield df
+
+def _leer_secuencial(path: Path, cols: List[str], desde: int = 0) -> Iterator[pd.DataFrame]:
+    """Parsea path (desde ese offset) en un solo proceso, con columnas OFFSETS."""
+    vtypes = {c: t for c, t in DFTYPES.items() if c in cols}
+    pend: List = [[], 0, 0]
+    with _abrir(path) as fh:
+        fh.seek(desde)
+        for data, base in _bloques(fh):
+            df = _parse_bloque(data, cols, pend, base=base)
+            if not df.empty:
+                yield _ajustar(df, vtypes)
+
+def leer_chunks(
+    path: Path | str,
+    cols: List[str],
+    workers: int = 1,
+    ordered: bool = True,
+    offsets: bool = False,
+    columnas: List[str] | None = None,
+    cache: bool = False,
+    compacto: bool = False,
+    desde: int = 0,
+) -> Iterator[pd.DataFrame]:
+    """
+    Lee path en streaming, devolviendo DataFrames de unos CHUNK_MEM bytes
+    con texto en strings Arrow. Maneja líneas partidas por comillas y
+    pipe-separador.
+    Con workers > 1 parsea rangos del archivo en paralelo; ordered=False
+    entrega los chunks a medida que terminan, sin respetar el orden original.
+    Con offsets=True devuelve (df, off), donde off[i] = [inicio, fin) en
+    bytes del registro i dentro del archivo (ver leer_registros).
+    columnas limita las columnas devueltas. Con cache=True se lee de la
+    cache columnar si hay una entrada vigente, o se la construye al leer.
+    Un .arrow (unificado columnar) se lee directo; sus off son números de
+    fila [i, i + 1). Con compacto=True los chunks vienen en la
+    representación compacta (ver compactar y texto).
+    Con desde > 0 la lectura empieza en ese offset, que debe ser el fin de
+    un registro (off[i, 1]) de una lectura anterior del mismo archivo: se
+    obtienen los mismos registros que siguen a ese en una lectura entera.
+    """
+    path = Path(path)
+    if path.suffix == COLUMNAR:
+        dfs = _leer_columnar(path, columnas)
+        yield from _entregar(_rechunk(_desde(dfs, desde) if desde else dfs), offsets, columnas, compacto)
+        return
+
+    cache = cache and parse_cache.disponible()
+    if cache:
+        dfs = parse_cache.leer(path, cols, columnas and [*columnas, *OFFSETS])
+        if dfs is not None:
+            yield from _entregar(_rechunk(_desde(dfs, desde) if desde else dfs), offsets, columnas, compacto)
+            return
+
+    if workers > 1 and comprimidos.es_comprimido(path) and comprimidos.tamano(path) > 4 * BLOCK_SIZE:
+        dfs = _rechunk(_leer_flujo(path, cols, workers, ordered, desde))
+    elif workers > 1 and path.stat().st_size - desde > 4 * BLOCK_SIZE:
+        dfs = _rechunk(_leer_paralelo(path, cols, workers, ordered, desde))
+    else:
+        dfs = _rechunk(_leer_secuencial(path, cols, desde))
+    # una lectura parcial no deja entrada en la cache
+    if cache and ordered and not desde:
+        dfs = parse_cache.Escritor(cols).pasar(dfs, path)
+    yield from _entregar(dfs, offsets, columnas, compacto)
+
+def parsear_lineas(data: bytes, cols: List[str], base: int = 0) -> pd.DataFrame:
+    """
+    Parsea bytes de líneas completas (p. ej. lo que se está escribiendo en
+    un unificado) tal como los leería leer_chunks, con columnas OFFSETS
+    relativas a base.
+    """
+    vtypes = {c: t for c, t in DFTYPES.items() if c in cols}
+    return _ajustar(_parse_bloque(data, cols, [[], 0, 0], base=base), vtypes)
+
+def leer_registros(path: Path | str, cols: List[str], off: np.ndarray) -> Iterator[pd.DataFrame]:
+    """
+    Relee de path solo los registros con rangos de bytes off (n, 2), en orden
+    creciente. Los rangos contiguos se leen de una vez; el resultado es
+    idéntico a las filas que leer_chunks produjo para esos registros.
+    """
+    path = Path(path)
+    vtypes = {c: t for c, t in DFTYPES.items() if c in cols}
+    if not len(off):
+        return
+    if path.suffix == COLUMNAR:
+        yield from parse_cache.tomar_ipc(path, off[:, 0], CHUNK_SIZE)
+        return
+    cortes = np.flatnonzero(off[1:, 0] != off[:-1, 1]) + 1
+    tramos = zip(off[np.r_[0, cortes], 0], off[np.r_[cortes - 1, len(off) - 1], 1])
+
+    def bloques() -> Iterator[bytes]:
+        partes: List[bytes] = []
+        tam = 0
+        with _abrir(path) as fh:
+            for a, b in tramos:
+                fh.seek(a)
+                rec = fh.read(b - a)
+                # cada tramo debe cerrar su última línea por sí mismo
+                if rec.endswith(b"\r"):
+                    rec = rec[:-1] + b"\n"
+                elif not rec.endswith(b"\n"):
+                    rec += b"\n"
+                partes.append(rec)
+                tam += len(rec)
+                if tam >= BLOCK_SIZE:
+                    yield b"".join(partes)
+                    partes, tam = [], 0
+        if partes:
+            yield b"".join(partes)
+
+    pend: List = [[], 0, 0]
+    yield from _rechunk(
+        _ajustar(df, vtypes)
+        for df in (_parse_bloque(data, cols, pend) for data in bloques())
+        if not df.empty
+    )
 
 # ─────────── Carga de referencias ───────────
 @_memory.cache
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+dedup.py – Detección de duplicados fuera de memoria.
+Cada clave (primeras 5 columnas) se reduce a dos hashes de 64 bits
+calculados en forma vectorizada. Mientras entren en DEDUP_MEM se acumulan
+en memoria; al superarlo se particionan a disco por bucket de hash y cada
+bucket se cuenta por separado. Los grupos donde el hash primario coincide
+pero el secundario no (colisión) se confirman contra la clave completa.
+"""
+
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import DEDUP_MEM
+from app.data_utils import texto
+
+# Registro por fila: hash primario, hash secundario e id de fila
+REG = np.dtype([("h1", "<u8"), ("h2", "<u8"), ("fila", "<i8")])
+
+_HASH2  = "PadronesDash-dup"   # hash_key (16 bytes) del hash secundario
+_BITS   = 6                    # 2**_BITS buckets en disco
+
+# ─────────── Hashes ───────────
+def hash_claves(df: pd.DataFrame, cols: List[str], hash_key: str | None = None) -> np.ndarray:
+    """Hash de 64 bits por fila de las columnas cols (vectorizado)."""
+    kw = {"hash_key": hash_key} if hash_key else {}
+    # las claves int64 de un chunk compacto se hashean como su texto; los
+    # categóricos ya dan el mismo hash que sus valores
+    claves = pd.DataFrame({c: texto(df[c]) for c in cols})
+    return pd.util.hash_pandas_object(claves, index=False, **kw).to_numpy()
+
+def registros(df: pd.DataFrame, cols: List[str], filas: np.ndarray) -> np.ndarray:
+    """Registros REG (h1, h2, fila) de las claves cols de df."""
+    reg = np.empty(len(df), dtype=REG)
+    reg["h1"] = hash_claves(df, cols)
+    reg["h2"] = hash_claves(df, cols, _HASH2)
+    reg["fila"] = filas
+    return reg
+
+def clave_texto(df: pd.DataFrame, cols: List[str]) -> pd.Series:
+    """Clave exacta como texto; los campos de clave nunca contienen pipes."""
+    out = df[cols[0]].astype(str)
+    for c in cols[1:]:
+        out = out + "|" + df[c].astype(str)
+    return out
+
+# ─────────── Detector ───────────
+class DetectorDuplicados:
+    """
+    Acumula (h1, h2, fila) por bloques y resuelve qué filas tienen clave
+    repetida. Los buckets en disco se guardan en dir_/dup_XX.bin.
+    """
+
+    def __init__(self, dir_: Path | str, presupuesto: int = DEDUP_MEM):
+        self.dir = Path(dir_)
+        self.presupuesto = presupuesto
+        self._mem: List[np.ndarray] = []
+        self._bytes = 0
+        self._en_disco = False
+
+    def agregar(self, reg: np.ndarray) -> None:
+        """Registra un bloque de registros REG (ver registros)."""
+        self._mem.append(reg)
+        self._bytes += reg.nbytes
+        if self._bytes > self.presupuesto:
+            self._volcar()
+
+    def _bucket(self, b: int) -> Path:
+        return self.dir / f"dup_{b:02x}.bin"
+
+    def _volcar(self) -> None:
+        """Particiona lo acumulado en memoria a los buckets en disco."""
+        if not self._mem:
+            return
+        reg = np.concatenate(self._mem)
+        self._mem, self._bytes = [], 0
+        b = (reg["h1"] >> np.uint64(64 - _BITS)).astype(np.intp)
+        orden = np.argsort(b, kind="stable")
+        reg, b = reg[orden], b[orden]
+        cortes = np.searchsorted(b, np.arange(2 ** _BITS + 1))
+        for i in range(2 ** _BITS):
+            if cortes[i] < cortes[i + 1]:
+                with open(self._bucket(i), "ab") as fh:
+                    reg[cortes[i]:cortes[i + 1]].tofile(fh)
+        self._en_disco = True
+
+    @staticmethod
+    def _contar(reg: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Filas con h1 repetido dentro de reg. Devuelve (seguras, dudosas):
+        dudosas son las de grupos donde h2 difiere, es decir, colisiones.
+        """
+        if not len(reg):
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        reg = reg[np.argsort(reg["h1"], kind="stable")]
+        h1 = reg["h1"]
+        ini = np.flatnonzero(np.r_[True, h1[1:] != h1[:-1]])
+        n = np.diff(np.r_[ini, len(h1)])
+        rep = n > 1
+        if not rep.any():
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        h2 = reg["h2"]
+        dudoso = np.minimum.reduceat(h2, ini) != np.maximum.reduceat(h2, ini)
+        grupo = np.repeat(np.arange(len(ini)), n)
+        seguras = reg["fila"][(rep & ~dudoso)[grupo]]
+        dudosas = reg["fila"][(rep & dudoso)[grupo]]
+        return seguras, dudosas
+
+    def resolver(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Devuelve (duplicadas, dudosas), ids de fila ordenados. Las dudosas
+        deben confirmarse con la clave completa (ver confirmar).
+        """
+        if not self._en_disco:
+            reg = np.concatenate(self._mem) if self._mem else np.empty(0, dtype=REG)
+            seguras, dudosas = self._contar(reg)
+        else:
+            self._volcar()
+            partes_s, partes_d = [], []
+            for i in range(2 ** _BITS):
+                p = self._bucket(i)
+                if p.exists():
+                    s, d = self._contar(np.fromfile(p, dtype=REG))
+                    partes_s.append(s)
+                    partes_d.append(d)
+            seguras = np.concatenate(partes_s) if partes_s else np.empty(0, np.int64)
+            dudosas = np.concatenate(partes_d) if partes_d else np.empty(0, np.int64)
+        return np.sort(seguras), np.sort(dudosas)
+
+    def limpiar(self) -> None:
+        """Borra los buckets en disco."""
+        self._mem, self._bytes = [], 0
+        for i in range(2 ** _BITS):
+            self._bucket(i).unlink(missing_ok=True)
+
+def confirmar(claves: pd.Series) -> np.ndarray:
+    """Máscara de claves exactas repetidas entre las filas dudosas."""
+    return claves.duplicated(keep=False).to_numpy()
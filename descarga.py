@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+descarga.py – ZIP de resultados en disco y ruta Flask que lo sirve.
+El ZIP se arma dentro de la entrada del análisis en RESULT_DIR sin pasar
+por memoria: cada miembro se comprime a un deflate crudo temporal (en
+paralelo con hilos, zlib libera el GIL) y después se ensamblan los
+encabezados, con extensiones ZIP64 cuando algún tamaño u offset no entra en
+32 bits. Queda junto a los CSV para las descargas siguientes. La ruta RUTA
+lo envía en bloques y atiende Range (descargas reanudables); la entrada la
+borra resultados.purgar.
+"""
+
+import re
+import time
+import uuid
+import datetime
+import shutil
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from flask import Response, abort, request
+
+from app.config import RESULT_DIR, ZIP_WORKERS, ZIP_NIVEL
+from app import sesiones
+
+RUTA = "/descargas"
+
+_BLOQUE  = 1024 * 1024
+_LIM32   = 0xFFFFFFFF   # desde acá el valor va en la extensión ZIP64
+_LIM16   = 0xFFFF
+_CARPETA = re.compile(r"^[0-9a-f]{32}$")
+_ARCHIVO = re.compile(r"^[\w-]+\.zip$")
+
+# Miembro: nombre en el ZIP y origen (ruta de archivo, contenido en bytes o
+# función que lo genera después de comprimir el resto, p. ej. un reporte)
+Miembro = Tuple[str, Path | bytes | Callable[[], bytes]]
+
+# ─────────── Compresión ───────────
+def _trozos(origen: Path | bytes):
+    if isinstance(origen, bytes):
+        yield origen
+        return
+    with open(origen, "rb") as f:
+        while data := f.read(_BLOQUE):
+            yield data
+
+def _comprimir(origen: Path | bytes, destino: Path) -> Tuple[int, int, int]:
+    """Deflate crudo de origen en destino; devuelve (crc, tamaño, comprimido)."""
+    co = zlib.compressobj(ZIP_NIVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc = tam = comp = 0
+    with open(destino, "wb") as out:
+        for data in _trozos(origen):
+            crc = zlib.crc32(data, crc)
+            tam += len(data)
+            z = co.compress(data)
+            out.write(z)
+            comp += len(z)
+        z = co.flush()
+        out.write(z)
+        comp += len(z)
+    return crc, tam, comp
+
+def _fecha_dos(t: float) -> Tuple[int, int]:
+    lt = time.localtime(t)
+    fecha = (max(lt.tm_year, 1980) - 1980) << 9 | lt.tm_mon << 5 | lt.tm_mday
+    hora = lt.tm_hour << 11 | lt.tm_min << 5 | lt.tm_sec // 2
+    return fecha, hora
+
+# ─────────── ZIP ───────────
+def _c32(v: int) -> int:
+    return 0xFFFFFFFF if v >= _LIM32 else v
+
+def _c16(v: int) -> int:
+    return 0xFFFF if v >= _LIM16 else v
+
+def armar_zip(miembros: List[Miembro], destino: Path | str, workers: int = ZIP_WORKERS) -> Path:
+    """
+    Escribe en destino un ZIP deflate con miembros, comprimiendo hasta
+    workers miembros a la vez. Los miembros con ruta inexistente se omiten.
+    """
+    destino = Path(destino)
+    miembros = [(n, o) for n, o in miembros if isinstance(o, bytes) or callable(o) or Path(o).exists()]
+    temps = [destino.with_name(f"{destino.name}.{i}.tmp") for i in range(len(miembros))]
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+            futuros = [None if callable(o) else ex.submit(_comprimir, o, t) for (_, o), t in zip(miembros, temps)]
+            datos = [f.result() if f else None for f in futuros]
+        datos = [d or _comprimir(o(), t) for d, (_, o), t in zip(datos, miembros, temps)]
+        fecha, hora = _fecha_dos(time.time())
+        central = []
+        with open(destino, "wb") as out:
+            for (nombre, _), tmp, (crc, tam, comp) in zip(miembros, temps, datos):
+                offset = out.tell()
+                nom = nombre.encode("utf-8")
+                z64 = tam >= _LIM32 or comp >= _LIM32
+                extra = struct.pack("<HHQQ", 1, 16, tam, comp) if z64 else b""
+                out.write(struct.pack(
+                    "<IHHHHHIIIHH", 0x04034B50, 45 if z64 else 20, 0x800, 8, hora, fecha,
+                    crc, 0xFFFFFFFF if z64 else comp, 0xFFFFFFFF if z64 else tam, len(nom), len(extra),
+                ) + nom + extra)
+                with open(tmp, "rb") as f:
+                    shutil.copyfileobj(f, out, _BLOQUE)
+                tmp.unlink()
+                central.append((nom, crc, tam, comp, offset))
+
+            inicio = out.tell()
+            for nom, crc, tam, comp, offset in central:
+                # en el directorio central van solo los campos que desbordan
+                grandes = [v for v in (tam, comp, offset) if v >= _LIM32]
+                extra = struct.pack(f"<HH{len(grandes)}Q", 1, 8 * len(grandes), *grandes) if grandes else b""
+                out.write(struct.pack(
+                    "<IHHHHHHIIIHHHHHII", 0x02014B50, 45, 45 if grandes else 20, 0x800, 8,
+                    hora, fecha, crc, _c32(comp), _c32(tam), len(nom), len(extra),
+                    0, 0, 0, 0, _c32(offset),
+                ) + nom + extra)
+            fin = out.tell()
+            n, tam_cd = len(central), fin - inicio
+            if n >= _LIM16 or inicio >= _LIM32 or tam_cd >= _LIM32:
+                out.write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, n, n, tam_cd, inicio))
+                out.write(struct.pack("<IIQI", 0x07064B50, 0, fin, 1))
+            out.write(struct.pack(
+                "<IHHHHIIH", 0x06054B50, 0, 0, _c16(n), _c16(n), _c32(tam_cd), _c32(inicio), 0,
+            ))
+    except BaseException:
+        destino.unlink(missing_ok=True)
+        raise
+    finally:
+        for t in temps:
+            t.unlink(missing_ok=True)
+    return destino
+
+def miembros(summary: Dict) -> List[Miembro]:
+    """CSV de resultados y resúmenes de texto del ZIP de un análisis."""
+    texto = lambda lineas: "\n".join(lineas).encode("utf-8")
+    if summary["tipo"] == "EMP":
+        claves = ("csv_emp", "csv_dup", "csv_err", "csv_err_campo", "csv_err_ent", "csv_cubo")
+        resumenes = [
+            ("Resumen_EMP.txt", texto([
+                f"Total: {summary['tot_emp']}",
+                f"Plan Parcial: {summary['pp_emp']}",
+                f"Duplicados: {summary['dup_emp']}",
+                f"Errores: {summary['err_emp']}",
+            ])),
+        ]
+    else:
+        claves = ("csv_pami", "csv_osn", "csv_dup", "csv_err", "csv_err_campo", "csv_err_ent", "csv_cubo")
+        resumenes = [
+            ("Resumen_PAMI.txt", texto([
+                f"Total: {summary['tot_pami']}",
+                f"Multi-CUIT: {summary['m_pami']}",
+                f"Duplicados: {summary['dup_pami']}",
+                f"Errores: {summary['err_pami']}",
+            ])),
+            ("Resumen_Resto_OSN.txt", texto([
+                f"Total: {summary['tot_osn']}",
+                f"Pluriempleo: {summary['m_osn']}",
+                f"Duplicados: {summary['dup_osn']}",
+                f"Errores: {summary['err_osn']}",
+            ])),
+        ]
+    return [(Path(summary[k]).name, Path(summary[k])) for k in claves] + resumenes
+
+def empaquetar(summary: Dict, directorio: Path | str | None = None) -> Path:
+    """
+    ZIP de resultados de summary en directorio (por defecto su tmp_dir),
+    reusando el que ya esté armado. El reporte de tiempos va último, con lo
+    que llevó armar el ZIP.
+    """
+    from app.medicion import Medidor
+
+    directorio = Path(directorio or summary["tmp_dir"])
+    previo = max(directorio.glob("analisis_*.zip"), default=None)
+    if previo is not None:
+        return previo
+    # un ZIP a la vez por entrada: dos descargas simultáneas esperan el mismo
+    reserva = f"zip:{directorio.name}"
+    while not sesiones.reservar(reserva):
+        time.sleep(sesiones.ESPERA)
+    try:
+        previo = max(directorio.glob("analisis_*.zip"), default=None)
+        if previo is not None:
+            return previo
+        med = Medidor.desde(summary.get("tiempos"))
+        destino = directorio / f"analisis_{datetime.datetime.now():%Y%m%d_%H%M%S}.zip"
+        # nombre propio para la parte y sus temporales (ver armar_zip)
+        parte = destino.with_name(f"{destino.name}.{uuid.uuid4().hex}.part")
+        with med.etapa("zip"):
+            armar_zip(miembros(summary) + [("Tiempos.json", med.json)], parte)
+        # solo un ZIP completo lleva el nombre final
+        return parte.replace(destino)
+    finally:
+        sesiones.liberar(reserva)
+
+def url(zip_path: Path | str) -> str:
+    """URL de RUTA que sirve zip_path (dentro de una entrada de RESULT_DIR)."""
+    p = Path(zip_path)
+    return f"{RUTA}/{p.parent.name}/{p.name}"
+
+# ─────────── Ruta Flask ───────────
+def _enviar(p: Path, inicio: int, fin: int):
+    """Bytes [inicio, fin) de p en bloques."""
+    with open(p, "rb") as f:
+        f.seek(inicio)
+        falta = fin - inicio
+        while falta:
+            data = f.read(min(_BLOQUE, falta))
+            if not data:
+                return
+            falta -= len(data)
+            yield data
+
+def registrar(server) -> None:
+    """Registra RUTA en el servidor Flask de la app."""
+
+    @server.route(f"{RUTA}/<carpeta>/<archivo>")
+    def descargar_zip(carpeta: str, archivo: str):
+        if not (_CARPETA.match(carpeta) and _ARCHIVO.match(archivo)):
+            abort(404)
+        p = RESULT_DIR / carpeta / archivo
+        if not p.is_file():
+            abort(404)
+        from app import resultados   # pandas: se carga con la primera descarga
+        resultados.tocar(p.parent)
+        total = p.stat().st_size
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": f'attachment; filename="{archivo}"',
+            "Cache-Control": "no-store",
+        }
+        inicio, fin, status = 0, total, 200
+        if request.range is not None:
+            r = request.range.range_for_length(total)
+            if r is None:
+                headers["Content-Range"] = f"bytes */{total}"
+                return Response(status=416, headers=headers)
+            (inicio, fin), status = r, 206
+            headers["Content-Range"] = f"bytes {inicio}-{fin - 1}/{total}"
+        headers["Content-Length"] = str(fin - inicio)
+        return Response(
+            _enviar(p, inicio, fin), status=status,
+            mimetype="application/zip", headers=headers, direct_passthrough=True,
+        )
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+engine.py – Motor de análisis de padrones en una sola pasada.
+Cada archivo se parsea una única vez. Durante la pasada se vuelca a disco
+una proyección compacta de cada fila (id, fuente, offset, hash de
+pluriempleo y marca PAMI) y los hashes de duplicados; todo eso queda como
+resultado parcial del archivo (ver parciales.py), reusable mientras el
+archivo no cambie; un parcial interrumpido se retoma desde su último punto
+de control. Los parciales se fusionan, duplicados y pluriempleo se
+resuelven sobre el conjunto y solo las filas marcadas se releen por offset
+para escribir los CSV de resultados y completar el cubo de agregados.
+"""
+
+import shutil
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import PARSE_WORKERS, PARSE_CACHE, PARCIALES, PUNTO_CONTROL
+from app.data_utils import COLUMNAR, leer_chunks, leer_registros, append_csv, load_references
+from app.dedup import REG, DetectorDuplicados, registros, clave_texto, confirmar
+from app import parse_cache, parciales, validacion
+from app.validacion import Regla, mascara, nombres, por_campo
+from app.pluriempleo import Pluriempleo, hash_claves as hash_pluri
+from app.layout import COLS_EMP
+from app.medicion import Medidor
+from app.comprimidos import tamano
+from app.cubo import Cubo
+from app import cubo, rnos
+
+PAMI = "500807"
+
+# Columna que identifica la entidad (prepaga u obra social) de cada fila
+ENTIDAD = {"EMP": "codigo_emp", "OSN": "codigo_os"}
+
+# Filas de la proyección procesadas por vez al resolver
+BLOQUE_PROY = 1_000_000
+
+# Proyección volcada por fila durante la pasada (el hash de la clave de
+# duplicados lo guarda el DetectorDuplicados)
+PROY = np.dtype([
+    ("fila",   "<i8"),   # id global de la fila
+    ("fuente", "<u2"),   # índice del archivo fuente
+    ("ini",    "<i8"),   # offset de inicio del registro
+    ("fin",    "<i8"),   # offset de fin del registro
+    ("pluri",  "<u8"),   # hash de los códigos (cuil_beneficiario, codigo_os)
+    ("pami",   "?"),     # codigo_os == PAMI
+])
+
+# ─────────── Helpers ───────────
+def _sumar_entidades(partes: List[pd.DataFrame]) -> Dict[str, List[int]]:
+    """Suma tablas entidad → (filas, errores); devuelve {entidad: [filas, errores]}."""
+    if not partes:
+        return {}
+    tb = pd.concat(partes).groupby(level=0, sort=False).sum()
+    return {str(k): [int(f), int(e)] for k, (f, e) in zip(tb.index, tb[["filas", "errores"]].to_numpy())}
+
+def _tabla_entidades(err_ent: Dict[str, List[int]]) -> pd.DataFrame:
+    """Inversa de _sumar_entidades: tabla entidad → (filas, errores)."""
+    return pd.DataFrame(list(err_ent.values()), index=list(err_ent), columns=["filas", "errores"], dtype=np.int64)
+
+def _tablas_error(tp: str, reglas: List[Regla], err_campos: np.ndarray, err_ent: Dict[str, List[int]],
+                  csv_campo: Path, csv_ent: Path) -> None:
+    """Escribe los agregados de errores por campo y por entidad."""
+    pd.DataFrame({
+        "campo":   [r.campo for r in reglas],
+        "errores": err_campos,
+    }).to_csv(csv_campo, sep="|", index=False)
+    ent = pd.DataFrame(
+        [(k, f, e) for k, (f, e) in err_ent.items()], columns=["entidad", "filas", "errores"]
+    )
+    if tp == "OSN":
+        # en OSN la entidad es el código RNOS: totales por obra social con su denominación
+        # (en EMP es codigo_emp, que no está en el registro)
+        ent = pd.concat([ent[["entidad"]], rnos.datos(ent["entidad"]), ent[["filas", "errores"]]], axis=1)
+    ent["pct_error"] = (ent["errores"] * 100 / ent["filas"].where(ent["filas"] > 0)).round(2).fillna(0)
+    ent.sort_values(["errores", "entidad"], ascending=[False, True]).to_csv(csv_ent, sep="|", index=False)
+
+def columnas(tp: str) -> List[str]:
+    """Layout del padrón según el tipo (EMP fijo, OSN del catálogo)."""
+    if tp == "EMP":
+        return COLS_EMP
+    df_ref, _ = load_references(tp)
+    return df_ref["campo"].tolist()
+
+def _marcadas(proy: np.ndarray, hashes: np.ndarray, campo: str) -> np.ndarray:
+    """Ids de fila de proy cuyo hash en campo está en hashes, por bloques."""
+    partes = [
+        np.flatnonzero(np.isin(proy[campo][i:i + BLOQUE_PROY], hashes)) + i
+        for i in range(0, len(proy), BLOQUE_PROY)
+    ]
+    return np.concatenate(partes) if partes else np.empty(0, np.int64)
+
+def _releer(proy: np.ndarray, filas: np.ndarray, sources: List[Path], cols: List[str]):
+    """Relee por offset las filas indicadas (ordenadas); devuelve (df, filas) por chunk."""
+    rec = proy[filas]
+    for idx, src in enumerate(sources):
+        sel = rec["fuente"] == idx
+        if not sel.any():
+            continue
+        off = np.column_stack([rec["ini"][sel], rec["fin"][sel]])
+        ids = filas[sel]
+        i = 0
+        for ch in leer_registros(src, cols, off):
+            yield ch, ids[i:i + len(ch)]
+            i += len(ch)
+
+# ─────────── Parciales ───────────
+def _pasada(
+    src: Path, tp: str, cols: List[str], reglas: List[Regla], dir_: Path,
+    med: Medidor, base: int = 0, total: int = 0, reanudable: bool = False,
+) -> Tuple[Dict, Pluriempleo | None, Cubo]:
+    """
+    Parsea src una única vez dejando en dir_ su proyección, sus registros de
+    duplicados y los fragmentos de Plan Parcial y Errores. Devuelve los
+    contadores del archivo (con los agregados de errores por campo y por
+    entidad), su Pluriempleo (None en EMP) y su Cubo con filas y errores. base y total ubican src en el
+    avance en bytes que se informa a med. Con reanudable, cada
+    PUNTO_CONTROL bytes de src se marca un punto de control en dir_ y la
+    pasada empieza en el último que haya (ver parciales.reanudar).
+    """
+    claves = cols[:5]
+    csv_emp = dir_ / "Plan_Parcial.csv"
+    csv_err = dir_ / "Errores.csv"
+
+    cnt = dict.fromkeys(("filas", "tot_emp", "pp_emp", "err_emp",
+                         "tot_pami", "tot_osn", "err_pami", "err_osn"), 0)
+    pluri = Pluriempleo() if tp != "EMP" else None
+    err_campos = np.zeros(len(reglas), dtype=np.int64)
+    entidades: List[pd.DataFrame] = []
+    cb = Cubo(tp)
+    desde = 0
+    tam = tamano(src)
+    # en un unificado columnar los offsets son números de fila
+    filas = parse_cache.filas_ipc(src) if src.suffix == COLUMNAR else 0
+
+    previo = parciales.reanudar(dir_) if reanudable else None
+    if previo is not None:
+        estado, tramos = previo
+        desde = estado["desde"]
+        cnt.update(estado["cnt"])
+        err_campos += np.asarray(estado["err_campos"], dtype=np.int64)
+        entidades.append(_tabla_entidades(estado["err_entidades"]))
+        cb.fusionar(cubo.de_json(estado["cubo"], tp))
+        for est, vocab in tramos:
+            pluri.fusionar(est, vocab)
+        med.saltar(Medidor.a_bytes(desde, tam, filas), cnt["filas"])
+    # con puntos de control, el pluriempleo se junta por tramo y cada punto
+    # guarda solo el del último
+    tramo = Pluriempleo() if pluri is not None and reanudable else pluri
+    punto = desde
+
+    with open(dir_ / parciales.PROY_BIN, "ab") as fs, open(dir_ / parciales.DUP_BIN, "ab") as fd:
+        chunks = leer_chunks(src, cols, workers=PARSE_WORKERS, offsets=True, cache=PARSE_CACHE,
+                             compacto=True, desde=desde)
+        for ch, off in med.chunks(chunks, tam, base, total, desde, filas):
+            n = len(ch)
+            proy = np.zeros(n, dtype=PROY)
+            proy["fila"] = np.arange(cnt["filas"], cnt["filas"] + n)
+            proy["ini"]  = off[:, 0]
+            proy["fin"]  = off[:, 1]
+            registros(ch, claves, proy["fila"]).tofile(fd)
+            cnt["filas"] += n
+
+            if tp == "EMP":
+                cnt["tot_emp"] += n
+                mask_pp = ch["tipo_plan"].str.strip() == "P"
+                if mask_pp.any():
+                    with med.etapa("append_csv"):
+                        append_csv(rnos.enriquecer(ch[mask_pp], tp), csv_emp)
+                    cnt["pp_emp"] += int(mask_pp.sum())
+            else:
+                is_pami = ch["codigo_os"].astype(str).str.strip() == PAMI
+                cnt["tot_pami"] += int(is_pami.sum())
+                cnt["tot_osn"]  += n - int(is_pami.sum())
+                tramo.agregar(ch)
+                proy["pluri"] = hash_pluri(ch)
+                proy["pami"]  = is_pami.to_numpy()
+
+            proy.tofile(fs)
+
+            # cada fila con errores se escribe una vez, con sus campos fallidos
+            err = mascara(ch, reglas)
+            bad = err != 0
+            if bad.any():
+                with med.etapa("append_csv"):
+                    append_csv(rnos.enriquecer(ch[bad], tp).assign(campos_error=nombres(err[bad], reglas)), csv_err)
+                err_campos += por_campo(err[bad], reglas)
+                if tp == "EMP":
+                    cnt["err_emp"] += int(bad.sum())
+                else:
+                    cnt["err_pami"] += int((bad & is_pami).sum())
+                    cnt["err_osn"]  += int((bad & ~is_pami).sum())
+            entidades.append(
+                pd.DataFrame({"entidad": ch[ENTIDAD[tp]].astype(str).str.strip(), "filas": 1, "errores": bad})
+                  .groupby("entidad", sort=False).sum()
+            )
+            cb.agregar(ch, filas=1, errores=bad)
+
+            if reanudable and len(off) and off[-1, 1] - punto >= PUNTO_CONTROL:
+                punto = int(off[-1, 1])
+                fs.flush()
+                fd.flush()
+                entidades = [_tabla_entidades(_sumar_entidades(entidades))]
+                exportado = tramo.exportar() if tramo is not None else None
+                parciales.marcar(dir_, {
+                    "desde": punto, "cnt": cnt, "err_campos": err_campos.tolist(),
+                    "err_entidades": _sumar_entidades(entidades), "cubo": cubo.a_json(cb.exportar()),
+                }, exportado)
+                if exportado is not None:
+                    pluri.fusionar(*exportado)
+                    tramo = Pluriempleo()
+
+    if tramo is not pluri:
+        pluri.fusionar(*tramo.exportar())
+    cnt["err_campos"] = err_campos.tolist()
+    cnt["err_entidades"] = _sumar_entidades(entidades)
+    return cnt, pluri, cb
+
+def _parcial(
+    src: Path, tp: str, cols: List[str], reglas: List[Regla], tmp_dir: Path,
+    med: Medidor, base: int = 0, total: int = 0,
+) -> parciales.Parcial:
+    """
+    Parcial de src: el de la cache si está vigente; si no, se calcula y se
+    publica en la cache (o queda en tmp_dir si PARCIALES está apagado).
+    """
+    huella = parse_cache.huella(src)
+    if PARCIALES:
+        p = parciales.cargar(src, huella, tp, cols, reglas)
+        if p is not None:
+            med.saltar(tamano(src), p.filas)
+            med.progreso("primera_pasada", base + tamano(src), total)
+            return p
+    # reanudable salvo que otro proceso esté calculando el mismo parcial
+    d = parciales.en_curso(src, huella, tp, cols, reglas) if PARCIALES and PUNTO_CONTROL else None
+    reanudable = d is not None
+    if d is None:
+        d = parciales.crear(None if PARCIALES else tmp_dir)
+    try:
+        cnt, pluri, cb = _pasada(src, tp, cols, reglas, d, med, base, total, reanudable)
+        p = parciales.guardar(d, huella, tp, cnt, pluri.exportar() if pluri is not None else None, cb.exportar())
+        if PARCIALES:
+            p = parciales.publicar(d, src, huella, tp, cols, reglas)
+    except BaseException:
+        # uno reanudable conserva su último punto de control
+        if not reanudable:
+            shutil.rmtree(d, ignore_errors=True)
+        raise
+    finally:
+        if reanudable:
+            parciales.soltar(d)
+    return p
+
+# ─────────── Análisis ───────────
+def analizar(sources: List[Path], tp: str, tmp_dir: Path | str, med: Medidor | None = None) -> Dict:
+    """
+    Analiza sources (tipo EMP u OSN) escribiendo los CSV de resultados en
+    tmp_dir. Devuelve el resumen con rutas y contadores. Cada archivo aporta
+    un resultado parcial (reusado de la cache si no cambió) y los parciales
+    se fusionan en orden, con los duplicados y el pluriempleo entre archivos
+    resueltos sobre el conjunto. med (opcional) recibe los tiempos por etapa
+    y el avance; su reporte queda en el resumen como "tiempos".
+    """
+    tmp_dir = Path(tmp_dir)
+    med = med or Medidor()
+    med.contexto.update(tipo=tp, fuentes=len(sources))
+    tamanos = [tamano(s) for s in sources]
+    total_bytes = sum(tamanos)
+    csv_emp  = tmp_dir / "Plan_Parcial.csv"
+    csv_pami = tmp_dir / "Multi-CUIT_PAMI.csv"
+    csv_osn  = tmp_dir / "Pluriempleo_OSN.csv"
+    csv_dup  = tmp_dir / "Duplicados.csv"
+    csv_err  = tmp_dir / "Errores.csv"
+    csv_err_campo = tmp_dir / "Errores_por_campo.csv"
+    csv_err_ent   = tmp_dir / "Errores_por_entidad.csv"
+    csv_cubo = tmp_dir / "Cubo.csv"
+    spill    = tmp_dir / "proyeccion.bin"
+
+    cols, reglas = columnas(tp), validacion.plan(tp)
+    claves = cols[:5]
+
+    tot = dict.fromkeys(("tot_emp", "pp_emp", "err_emp",
+                         "tot_pami", "tot_osn", "err_pami", "err_osn"), 0)
+    m_pami = m_osn = 0
+    dup_emp = dup_pami = dup_osn = 0
+    err_campos = np.zeros(len(reglas), dtype=np.int64)
+    entidades: List[pd.DataFrame] = []
+
+    pluri = Pluriempleo()
+    cb = Cubo(tp)
+    detector = DetectorDuplicados(tmp_dir)
+    fila = 0
+
+    # ── Fusión de parciales ──────────────
+    with med.etapa("primera_pasada"), open(spill, "wb") as fs:
+        for idx, src in enumerate(sources):
+            parcial = _parcial(Path(src), tp, cols, reglas, tmp_dir, med, sum(tamanos[:idx]), total_bytes)
+            for proy in parcial.bloques(parciales.PROY_BIN, PROY, BLOQUE_PROY):
+                proy["fila"]  += fila
+                proy["fuente"] = idx
+                proy.tofile(fs)
+            for reg in parcial.bloques(parciales.DUP_BIN, REG, BLOQUE_PROY):
+                reg["fila"] += fila
+                detector.agregar(reg)
+            if tp != "EMP":
+                pluri.fusionar(*parcial.pluri())
+            cb.fusionar(parcial.cubo())
+            parcial.copiar_csv("Plan_Parcial.csv", csv_emp)
+            parcial.copiar_csv("Errores.csv", csv_err)
+            for k in tot:
+                tot[k] += parcial.meta[k]
+            err_campos += np.asarray(parcial.meta["err_campos"], dtype=np.int64)
+            entidades.append(_tabla_entidades(parcial.meta["err_entidades"]))
+            fila += parcial.filas
+            if not PARCIALES:
+                parcial.borrar()
+
+    err_ent = _sumar_entidades(entidades)
+    _tablas_error(tp, reglas, err_campos, err_ent, csv_err_campo, csv_err_ent)
+
+    with med.etapa("segunda_pasada"):
+        # ── Resolución sobre la proyección ───
+        proy = np.memmap(spill, dtype=PROY, mode="r") if fila else np.empty(0, dtype=PROY)
+        dup_filas, dudosas = detector.resolver()
+        detector.limpiar()
+        if len(dudosas):
+            # colisiones de hash: se confirma contra la clave completa
+            partes = [(clave_texto(ch, claves), ids) for ch, ids in _releer(proy, dudosas, sources, cols)]
+            textos = pd.concat([t for t, _ in partes], ignore_index=True)
+            ids = np.concatenate([i for _, i in partes])
+            dup_filas = np.union1d(dup_filas, ids[confirmar(textos)])
+
+        pl_filas = np.empty(0, np.int64)
+        if tp != "EMP":
+            bad_pluri = pluri.resolver()
+            if len(bad_pluri):
+                pl_filas = _marcadas(proy, hash_pluri(pluri.textos(bad_pluri)), "pluri")
+
+        # ── Relectura de filas marcadas ──────
+        filas = np.union1d(dup_filas, pl_filas)
+        hechas = 0
+        for ch, ids in _releer(proy, filas, sources, cols):
+            hechas += len(ids)
+            med.progreso("segunda_pasada", hechas, len(filas))
+            d = np.isin(ids, dup_filas)
+            p = np.isin(ids, pl_filas)
+
+            if tp != "EMP" and p.any():
+                df_pl = ch[p]
+                # confirma la clave exacta ante colisiones del hash
+                ok = pd.MultiIndex.from_frame(pluri.claves(df_pl)).isin(bad_pluri)
+                df_pl = df_pl[ok]
+                is_pami = df_pl["codigo_os"].astype(str).str.strip() == PAMI
+                df_pl = rnos.enriquecer(df_pl, tp)
+                cb.agregar(df_pl, pluriempleo=1)
+                with med.etapa("append_csv"):
+                    append_csv(df_pl[is_pami],  csv_pami); m_pami += int(is_pami.sum())
+                    append_csv(df_pl[~is_pami], csv_osn);  m_osn  += len(df_pl) - int(is_pami.sum())
+
+            if d.any():
+                df_d = ch[d]
+                cb.agregar(df_d, duplicados=1)
+                df_d = rnos.enriquecer(df_d, tp)
+                with med.etapa("append_csv"):
+                    append_csv(df_d, csv_dup)
+                if tp == "EMP":
+                    dup_emp += len(df_d)
+                else:
+                    n_pami = int((df_d["codigo_os"].astype(str).str.strip() == PAMI).sum())
+                    dup_pami += n_pami
+                    dup_osn  += len(df_d) - n_pami
+
+    del proy
+    spill.unlink(missing_ok=True)
+    cubo.guardar(cb.exportar(), csv_cubo)
+
+    return {
+        "tipo":    tp,
+        "tmp_dir": str(tmp_dir),
+        "csv_emp": str(csv_emp),
+        "csv_pami":str(csv_pami),
+        "csv_osn": str(csv_osn),
+        "csv_dup": str(csv_dup),
+        "csv_err": str(csv_err),
+        "csv_err_campo": str(csv_err_campo),
+        "csv_err_ent":   str(csv_err_ent),
+        "csv_cubo":      str(csv_cubo),
+        "err_campos": {r.campo: int(n) for r, n in zip(reglas, err_campos) if n},
+        "tiempos": med.reporte(),
+        "tot_emp":  tot["tot_emp"],  "pp_emp":  tot["pp_emp"], "dup_emp":  dup_emp,  "err_emp":  tot["err_emp"],
+        "tot_pami": tot["tot_pami"], "m_pami":  m_pami,        "dup_pami": dup_pami, "err_pami": tot["err_pami"],
+        "tot_osn":  tot["tot_osn"],  "m_osn":   m_osn,         "dup_osn":  dup_osn,  "err_osn":  tot["err_osn"]
+    }
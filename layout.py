@@ -5,10 +5,9 @@
 layout.py – Define el layout de la aplicación y exporta COLS_EMP.
 """
 
-import os
-from pathlib import Path
-from dash import html, dcc
-from app.config import APP_TITLE, PADRON_DIR
+from importlib.util import find_spec
+from dash import html, dcc, dash_table
+from app.config import APP_TITLE, CATALOGO_INTERVALO
 
 # ────────────────────── columnas EMP ──────────────────────
 COLS_EMP = [
@@ -22,6 +21,9 @@ COLS_EMP = [
     "sin_uso_3","periodo",
 ]
 
+# Dimensiones de las consultas sobre el cubo (ver cubo.DIMENSIONES)
+DIMENSIONES_CUBO = ["entidad", "id_provincia", "tipo_plan", "edad"]
+
 layout = html.Div([
     html.H2(APP_TITLE), html.Hr(),
 
@@ -36,30 +38,62 @@ layout = html.Div([
     ),
     html.Br(),
 
+    # Las opciones las carga el catálogo (ver catalogo.py) y se refrescan solas
     dcc.Dropdown(
         id="archivos",
-        options=[
-            {"label": fn, "value": fn}
-            for fn in sorted(os.listdir(PADRON_DIR))
-            if fn.endswith(".txt")
-        ],
+        options=[],
         multi=True,
         placeholder="Seleccioná archivos"
     ),
+    dcc.Interval(id="catalogo-tick", interval=CATALOGO_INTERVALO * 1000),
+    html.Br(),
+
+    dcc.RadioItems(
+        id="formato-unif",
+        options=[
+            {"label": "Unificar a texto (|)",        "value": "txt"},
+            {"label": "Unificar a columnar (Arrow)", "value": "arrow",
+             "disabled": find_spec("pyarrow") is None},
+        ],
+        value="txt",
+        labelStyle={"display": "inline-block", "margin-right": "18px"}
+    ),
     html.Br(),
 
     html.Button("Unificar", id="btn-unif"),
     html.Button("Analizar",  id="btn-anal", disabled=True),
     html.Button("Descargar", id="btn-dl",   disabled=True),
-    dcc.Download(id="dl"),
+    html.Button("Cancelar",  id="btn-cancel", disabled=True),
+    html.Div(id="dl-link"),
+    html.Br(),
+    html.Progress(id="prog-unif", value="0", max="1"),
+    html.Br(),
+    html.Progress(id="prog-anal", value="0", max="1"),
+    html.Span(id="prog-anal-txt", style={"margin-left": "8px"}),
     html.Br(),
 
     html.Div(id="out-resumen"), html.Br(),
     html.Div(id="panel"),
 
+    # Consultas sobre el cubo de agregados (visible tras un análisis)
+    html.Div(id="cubo", hidden=True, children=[
+        html.H4("Consultas"),
+        dcc.Dropdown(id="cubo-agrupar", multi=True, placeholder="Agrupar por"),
+        html.Div([
+            dcc.Dropdown(id=f"cubo-f-{dim}", multi=True, placeholder=f"Filtrar {dim}",
+                         style={"min-width": "180px"})
+            for dim in DIMENSIONES_CUBO
+        ], style={"display": "flex", "gap": "8px", "margin": "8px 0"}),
+        html.Div(id="cubo-total"),
+        dash_table.DataTable(id="cubo-tabla", sort_action="native", page_size=20),
+    ]),
+
     # Stores para rutas y resultados
+    dcc.Store(id="sesion", storage_type="session"),
     dcc.Store(id="st-unif"),
     dcc.Store(id="st-sum"),
+    dcc.Store(id="dl-url"),
+    html.Div(id="dl-js", hidden=True),
     dcc.Store(id="csv-m1"),
     dcc.Store(id="csv-dup"),
     dcc.Store(id="csv-err"),
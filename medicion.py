@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+medicion.py – Instrumentación de las etapas del análisis.
+Un Medidor acumula el tiempo de cada etapa (primera pasada, leer_chunks,
+append_csv, segunda pasada, ZIP), los bytes y filas leídos y la latencia
+de cada chunk. Avisa el avance a un callback (la barra de progreso del long
+callback) como mucho cada INTERVALO segundos, y al final arma un reporte
+JSON que viaja en el ZIP de resultados para comparar versiones. Las etapas
+pueden anidarse; el tiempo de cada una es inclusivo y el reporte cuenta
+hasta el momento las que siguen en curso.
+"""
+
+import json
+import time
+import datetime
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+VERSION = 1
+
+INTERVALO = 0.5   # segundos mínimos entre avisos de progreso
+
+# aviso(etapa, hecho, total, detalle)
+Aviso = Callable[[str, int, int, str], None]
+
+class Medidor:
+    """Tiempos por etapa, volumen leído y latencia de chunks de un análisis."""
+
+    def __init__(self, aviso: Optional[Aviso] = None, **contexto):
+        self.aviso = aviso
+        self.contexto = contexto
+        self.etapas: Dict[str, List[float]] = {}   # nombre → [segundos, llamadas]
+        self.bytes = 0
+        self.filas = 0
+        self.latencias: List[float] = []
+        self._ultimo = 0.0
+        self._previo: Dict | None = None
+        self._abiertas: Dict[str, float] = {}   # etapas en curso → inicio
+
+    def _sumar(self, nombre: str, segundos: float) -> None:
+        e = self.etapas.setdefault(nombre, [0.0, 0])
+        e[0] += segundos
+        e[1] += 1
+
+    @contextmanager
+    def etapa(self, nombre: str):
+        t0 = time.perf_counter()
+        self._abiertas.setdefault(nombre, t0)
+        try:
+            yield self
+        finally:
+            if self._abiertas.get(nombre) == t0:
+                del self._abiertas[nombre]
+            self._sumar(nombre, time.perf_counter() - t0)
+
+    @staticmethod
+    def a_bytes(off: int, tam: int, filas: int = 0) -> int:
+        """
+        Offset de leer_chunks en bytes de un archivo de tam bytes. En una
+        fuente columnar (filas > 0) los offsets son números de fila y se
+        llevan a bytes en proporción.
+        """
+        return off * tam // filas if filas else off
+
+    def chunks(self, it: Iterator[Tuple], tam: int, base: int = 0, total: int = 0, desde: int = 0,
+               filas: int = 0) -> Iterator[Tuple]:
+        """
+        Envuelve leer_chunks(..., offsets=True) de un archivo de tam bytes:
+        mide cuánto bloquea cada chunk y avisa el avance de la primera
+        pasada (base y total en bytes del conjunto de fuentes). desde es el
+        offset donde empieza la lectura (ver saltar para lo anterior).
+        filas es el total de filas de una fuente columnar (ver a_bytes).
+        """
+        fin = self.a_bytes(desde, tam, filas)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                ch, off = next(it)
+            except StopIteration:
+                break
+            dt = time.perf_counter() - t0
+            self._sumar("leer_chunks", dt)
+            self.latencias.append(dt)
+            self.filas += len(ch)
+            if len(off):
+                hasta = self.a_bytes(int(off[-1, 1]), tam, filas)
+                self.bytes += hasta - fin
+                fin = hasta
+            self.progreso("primera_pasada", base + fin, total)
+            yield ch, off
+        self.bytes += max(tam - fin, 0)
+
+    def saltar(self, tam: int, filas: int) -> None:
+        """Cuenta un archivo (o el tramo ya hecho de uno) cuyo resultado se reusó sin leerlo."""
+        self.bytes += tam
+        self.filas += filas
+
+    def progreso(self, etapa: str, hecho: int, total: int, forzar: bool = False) -> None:
+        """Avisa el avance de etapa, salvo que el último aviso sea reciente."""
+        if self.aviso is None:
+            return
+        ahora = time.perf_counter()
+        if not forzar and ahora - self._ultimo < INTERVALO:
+            return
+        self._ultimo = ahora
+        seg = self.etapas.get("leer_chunks", [0.0])[0]
+        detalle = f"{self.filas / seg:,.0f} filas/s".replace(",", ".") if seg else ""
+        self.aviso(etapa, hecho, total, detalle)
+
+    def reporte(self) -> Dict:
+        """Reporte serializable: etapas, volumen, throughput y latencias de chunk."""
+        lat = np.asarray(self.latencias, dtype=np.float64)
+        ahora = time.perf_counter()
+        etapas = {k: list(v) for k, v in self.etapas.items()}
+        for k, t0 in self._abiertas.items():
+            # una etapa en curso cuenta hasta ahora
+            e = etapas.setdefault(k, [0.0, 0])
+            e[0] += ahora - t0
+            e[1] += 1
+        seg = etapas.get("primera_pasada", [0.0])[0]
+        return {
+            "version": VERSION,
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+            **self.contexto,
+            "bytes": self.bytes,
+            "filas": self.filas,
+            "filas_por_segundo": round(self.filas / seg, 1) if seg else None,
+            "bytes_por_segundo": round(self.bytes / seg, 1) if seg else None,
+            "etapas": {k: {"segundos": round(s, 4), "llamadas": n} for k, (s, n) in etapas.items()},
+            "chunks": {
+                "cantidad": int(len(lat)),
+                "latencia_media": round(float(lat.mean()), 4) if len(lat) else None,
+                "latencia_p95":   round(float(np.percentile(lat, 95)), 4) if len(lat) else None,
+                "latencia_max":   round(float(lat.max()), 4) if len(lat) else None,
+            },
+        }
+
+    @classmethod
+    def desde(cls, reporte: Dict | None, aviso: Optional[Aviso] = None) -> "Medidor":
+        """Medidor que continúa un reporte previo (p. ej. el del análisis en la descarga)."""
+        m = cls(aviso)
+        if not reporte:
+            return m
+        base = ("version", "fecha", "bytes", "filas", "filas_por_segundo", "bytes_por_segundo", "etapas", "chunks")
+        m.contexto = {k: v for k, v in reporte.items() if k not in base}
+        m.etapas = {k: [e["segundos"], e["llamadas"]] for k, e in reporte.get("etapas", {}).items()}
+        m.bytes, m.filas = reporte.get("bytes", 0), reporte.get("filas", 0)
+        m._previo = reporte
+        return m
+
+    def json(self) -> bytes:
+        rep = self.reporte()
+        if self._previo:
+            # fecha, datos por chunk y throughput son los del análisis original
+            rep.update({k: self._previo[k] for k in ("fecha", "chunks", "filas_por_segundo", "bytes_por_segundo")
+                        if k in self._previo})
+        return json.dumps(rep, indent=2, ensure_ascii=False).encode("utf-8")
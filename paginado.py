@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+paginado.py – Tablas de resultados paginadas del lado del servidor.
+Las DataTable del panel usan page_action, filter_action y sort_action
+"custom": el navegador recibe una sola página y este módulo la arma desde
+el CSV completo. Sin filtro ni orden la página se lee directo por el índice
+de offsets (ver data_utils.append_csv); con filtro u orden se recorre el
+archivo una vez para obtener los números de fila seleccionados, que quedan
+en cache mientras el archivo no cambie.
+"""
+
+import re
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from dash import dash_table
+
+from app.config import CHUNK_SIZE
+from app.data_utils import cabecera, count_rows, indice, leer_filas
+
+PAGE_SIZE = 10
+
+# filter_query de DataTable: cláusulas "{col} op valor" unidas por " && ".
+# Operadores en palabra (con prefijo s/i opcional) o en símbolo
+_SIMBOLOS = {">=": "ge", "<=": "le", "<": "lt", ">": "gt", "!=": "ne", "=": "eq"}
+_CITA = r"""(?:"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`)"""
+_CLAUSULA = re.compile(
+    r"^\s*(?:\{(?P<llave>[^}]*)\}|(?P<nombre>[^\s{}<>=!]+))\s*"
+    r"(?P<op>>=|<=|!=|<|>|=|[si]?(?:ge|le|lt|gt|ne|eq|contains|datestartswith)(?=\s))"
+    r"\s*(?P<valor>.*?)\s*$",
+    re.S,
+)
+_SEPARADOR = re.compile(rf"{_CITA}| && ", re.S)   # las comillas se saltean enteras
+
+# ─────────── Tabla ───────────
+def tabla(clave: str, path: Path | str) -> dash_table.DataTable:
+    """DataTable vacía sobre el CSV path; los datos los pide el callback paginar."""
+    return dash_table.DataTable(
+        id={"type": "tabla-res", "csv": clave},
+        columns=[{"name": c, "id": c} for c in cabecera(path)],
+        data=[],
+        page_current=0,
+        page_size=PAGE_SIZE,
+        page_count=max(1, math.ceil(count_rows(path) / PAGE_SIZE)),
+        page_action="custom",
+        filter_action="custom",
+        filter_query="",
+        sort_action="custom",
+        sort_mode="multi",
+        sort_by=[],
+    )
+
+# ─────────── Filtro y orden ───────────
+def _partir(parte: str) -> Tuple[str | None, str | None, str | None]:
+    """Separa "{col} op valor" en (col, op, valor); (None, None, None) si no es una cláusula."""
+    m = _CLAUSULA.match(parte)
+    if m is None:
+        return None, None, None
+    nombre = m["llave"] if m["llave"] is not None else m["nombre"]
+    op = _SIMBOLOS.get(m["op"], m["op"]).lstrip("si")   # ninguna palabra empieza con s o i
+    valor = m["valor"]
+    if len(valor) > 1 and valor[0] == valor[-1] and valor[0] in "'\"`":
+        valor = valor[1:-1].replace("\\" + valor[0], valor[0])
+    return nombre, op, valor
+
+def _clausulas(filtro: str) -> List[str]:
+    """filtro cortado en los " && " que no están dentro de un valor entre comillas."""
+    partes, ini = [], 0
+    for m in _SEPARADOR.finditer(filtro):
+        if m.group() == " && ":
+            partes.append(filtro[ini:m.start()])
+            ini = m.end()
+    return partes + [filtro[ini:]]
+
+def _condiciones(filtro: str) -> List[Tuple[str, str, str]]:
+    conds = [_partir(p) for p in _clausulas(filtro)] if filtro else []
+    return [c for c in conds if c[0]]
+
+def _cumple(s: pd.Series, op: str, valor: str) -> np.ndarray:
+    if op == "contains":
+        return s.str.contains(valor, regex=False).to_numpy(dtype=bool)
+    if op == "datestartswith":
+        return s.str.startswith(valor).to_numpy(dtype=bool)
+    if op == "eq":
+        return (s == valor).to_numpy(dtype=bool)
+    if op == "ne":
+        return (s != valor).to_numpy(dtype=bool)
+    # comparaciones: numéricas si el valor es un número, si no de texto
+    num = pd.to_numeric(pd.Series([valor]), errors="coerce")[0]
+    izq = pd.to_numeric(s, errors="coerce") if pd.notna(num) else s
+    der = num if pd.notna(num) else valor
+    res = {"ge": izq >= der, "le": izq <= der, "lt": izq < der, "gt": izq > der}[op]
+    return res.fillna(False).to_numpy(dtype=bool)
+
+def _clave_orden(s: pd.Series) -> pd.Series:
+    """Orden numérico si todos los valores no vacíos son números."""
+    num = pd.to_numeric(s, errors="coerce")
+    return num if num[s != ""].notna().all() else s
+
+@lru_cache(maxsize=32)
+def _seleccion(path: str, version: Tuple[int, int], filtro: str, orden: Tuple[Tuple[str, str], ...]) -> np.ndarray:
+    """Números de fila de path que pasan filtro, en el orden pedido."""
+    conds = _condiciones(filtro)
+    cols = cabecera(path)
+    usadas = [c for c in dict.fromkeys([c for c, _, _ in conds] + [c for c, _ in orden]) if c in cols]
+    n = count_rows(path)
+    filas, claves = [], []
+    for i in range(0, n, CHUNK_SIZE):
+        ids = np.arange(i, min(i + CHUNK_SIZE, n))
+        ch = leer_filas(path, ids, usadas)
+        ok = np.ones(len(ch), dtype=bool)
+        for c, op, valor in conds:
+            if c in ch.columns:
+                ok &= _cumple(ch[c], op, valor)
+        filas.append(ids[ok])
+        if orden:
+            claves.append(ch[ok])
+    sel = np.concatenate(filas) if filas else np.empty(0, np.int64)
+    orden = [(c, d) for c, d in orden if c in cols]
+    if orden and len(sel):
+        df = pd.concat(claves, ignore_index=True)
+        df = pd.DataFrame({c: _clave_orden(df[c]) for c, _ in orden})
+        pos = df.sort_values(
+            [c for c, _ in orden], ascending=[d == "asc" for _, d in orden], kind="stable"
+        ).index.to_numpy()
+        sel = sel[pos]
+    return sel
+
+# ─────────── Página ───────────
+def pagina(
+    path: Path | str, page: int, size: int, filtro: str = "", sort_by: List[Dict] | None = None
+) -> Tuple[List[Dict], int]:
+    """Registros de la página page de path (con filtro y orden) y cantidad de páginas."""
+    path = Path(path)
+    if not path.exists() or not indice(path).exists():
+        return [], 1
+    size = max(1, size or PAGE_SIZE)
+    orden = tuple((s["column_id"], s["direction"]) for s in sort_by or [])
+    if filtro or orden:
+        st = indice(path).stat()
+        sel = _seleccion(str(path), (st.st_size, st.st_mtime_ns), filtro or "", orden)
+        total = len(sel)
+        filas = sel[page * size:(page + 1) * size]
+    else:
+        total = count_rows(path)
+        filas = np.arange(page * size, min((page + 1) * size, total))
+    df = leer_filas(path, filas)
+    return df.to_dict("records"), max(1, math.ceil(total / size))
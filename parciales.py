@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+parciales.py – Resultados parciales por archivo para el análisis incremental.
+Un parcial guarda todo lo que el análisis obtiene de un único archivo: la
+proyección de sus filas, los registros de hash de duplicados, el estado de
+pluriempleo, los fragmentos de Plan Parcial y Errores, su cubo de
+agregados y los contadores (incluidos los agregados de errores por campo y
+por entidad). Los
+parciales se fusionan en el orden de las fuentes (ver engine.analizar), así
+que reusar los de archivos ya analizados da el mismo resultado que una
+corrida completa. Se guardan en PARCIAL_DIR con una clave que combina la
+huella del archivo, el tipo, el layout, el plan de validación, la versión
+del registro RNOS (los fragmentos llevan sus denominaciones) y el año de
+referencia de las edades del cubo.
+Mientras se calcula, el parcial de un archivo vive en <clave>.punto con
+puntos de control periódicos (ver marcar y reanudar): si el proceso muere,
+la próxima pasada sobre el mismo archivo sigue desde el último.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import PARCIAL_DIR, CHUNK_MEM, CACHE_TTL, PUNTO_TTL
+from app.data_utils import indice
+from app import parse_cache, sesiones, cubo, rnos
+from app.validacion import Regla
+
+VERSION = 5
+
+PROY_BIN  = "proy.bin"
+DUP_BIN   = "dup.bin"
+PLURI_NPY = "pluri.npy"
+META      = "meta.json"
+CUBO_CSV  = "cubo.csv"
+PUNTO     = "punto.json"
+TRAMO_NPY = "pluri_{:05d}.npy"   # pluriempleo de cada tramo entre puntos de control
+PUNTOS    = ".punto"             # sufijo del directorio de un parcial en curso
+
+# ─────────── Claves ───────────
+def _clave(huella: str, tp: str, cols: List[str], reglas: List[Regla]) -> str:
+    """Clave del parcial de un archivo con huella para tp, cols y reglas."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{VERSION}|{huella}|{tp}|{CHUNK_MEM}|{cubo.anio_referencia()}|{rnos.firma()}|{'|'.join(cols)}".encode())
+    h.update(repr(reglas).encode("utf-8", "replace"))
+    return h.hexdigest()
+
+def ruta(src: Path | str, huella: str, tp: str, cols: List[str], reglas: List[Regla]) -> Path:
+    """Directorio del parcial de src con huella (ver parse_cache.huella)."""
+    return PARCIAL_DIR / f"{parse_cache.prefijo(src)}_{_clave(huella, tp, cols, reglas)}"
+
+# ─────────── Parcial ───────────
+class Parcial:
+    """Vista sobre el directorio de un parcial ya completo."""
+
+    def __init__(self, dir_: Path | str):
+        self.dir = Path(dir_)
+        self.meta = json.loads((self.dir / META).read_text(encoding="utf-8"))
+
+    @property
+    def filas(self) -> int:
+        return self.meta["filas"]
+
+    def bloques(self, nombre: str, dtype: np.dtype, paso: int) -> Iterator[np.ndarray]:
+        """Copias en memoria de a paso registros de un binario del parcial."""
+        p = self.dir / nombre
+        if not p.stat().st_size:
+            return
+        arr = np.memmap(p, dtype=dtype, mode="r")
+        for i in range(0, len(arr), paso):
+            yield np.array(arr[i:i + paso])
+        del arr
+
+    def pluri(self) -> Tuple[np.ndarray, Dict[str, int]]:
+        """Estado exportado de Pluriempleo (ver Pluriempleo.exportar)."""
+        return np.load(self.dir / PLURI_NPY), self.meta["vocab"]
+
+    def cubo(self) -> pd.DataFrame:
+        """Tabla del cubo de agregados del archivo (ver cubo.Cubo.exportar)."""
+        return cubo.leer(self.dir / CUBO_CSV, self.meta["tipo"])
+
+    def copiar_csv(self, nombre: str, destino: Path | str) -> None:
+        """
+        Agrega el fragmento nombre al final de destino, sin repetir cabecera,
+        y su índice de offsets desplazado al de destino.
+        """
+        p, destino = self.dir / nombre, Path(destino)
+        if not p.exists():
+            return
+        base = destino.stat().st_size if destino.exists() else 0
+        with open(p, "rb") as src, open(destino, "ab") as dst:
+            salto = len(src.readline()) if base else 0
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        inicios = np.fromfile(indice(p), dtype=np.int64)
+        with open(indice(destino), "ab") as f:
+            (inicios + (base - salto)).tofile(f)
+
+    def borrar(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+# ─────────── Cache ───────────
+def cargar(src: Path | str, huella: str, tp: str, cols: List[str], reglas: List[Regla]) -> Parcial | None:
+    """Parcial vigente de src, o None si no hay."""
+    d = ruta(src, huella, tp, cols, reglas)
+    return Parcial(d) if (d / META).exists() else None
+
+def invalidar(src: Path | str) -> None:
+    """Borra todos los parciales de src."""
+    for d in PARCIAL_DIR.glob(f"{parse_cache.prefijo(src)}_*"):
+        shutil.rmtree(d, ignore_errors=True)
+
+def crear(base: Path | str | None = None) -> Path:
+    """Directorio temporal donde calcular un parcial (en base o PARCIAL_DIR)."""
+    d = Path(base or PARCIAL_DIR) / f"tmp_{uuid.uuid4().hex}"
+    d.mkdir()
+    return d
+
+def purgar(ttl: float = CACHE_TTL, ttl_puntos: float = PUNTO_TTL) -> None:
+    """
+    Borra los directorios temporales de parciales abandonados (p. ej. por
+    cancelar) y los parciales en curso que nadie retomó en ttl_puntos.
+    """
+    limite = time.time() - ttl
+    for d in PARCIAL_DIR.glob("tmp_*"):
+        try:
+            if d.stat().st_mtime < limite:
+                shutil.rmtree(d, ignore_errors=True)
+        except OSError:
+            continue
+    limite = time.time() - ttl_puntos
+    for d in PARCIAL_DIR.glob(f"*{PUNTOS}"):
+        try:
+            viejo = d.stat().st_mtime < limite
+        except OSError:
+            continue
+        if viejo and sesiones.reservar(_reserva(d)):
+            shutil.rmtree(d, ignore_errors=True)
+            sesiones.liberar(_reserva(d))
+
+# ─────────── Puntos de control ───────────
+def _reserva(d: Path) -> str:
+    return f"parcial:{d.name}"
+
+def en_curso(src: Path | str, huella: str, tp: str, cols: List[str], reglas: List[Regla]) -> Path | None:
+    """
+    Directorio de trabajo del parcial de src, reservado para este proceso
+    hasta soltar. None si otro proceso vivo lo está calculando.
+    """
+    d = ruta(src, huella, tp, cols, reglas).with_suffix(PUNTOS)
+    if not sesiones.reservar(_reserva(d)):
+        return None
+    d.mkdir(exist_ok=True)
+    return d
+
+def soltar(d: Path) -> None:
+    sesiones.liberar(_reserva(d))
+
+def _punto(d: Path) -> Dict | None:
+    try:
+        return json.loads((d / PUNTO).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def _limpiar_puntos(d: Path) -> None:
+    (d / PUNTO).unlink(missing_ok=True)
+    for p in d.glob(TRAMO_NPY.replace("{:05d}", "*")):
+        p.unlink()
+
+def _completo(d: Path, p: Dict) -> bool:
+    """True si d conserva todo lo que registra el punto p."""
+    largos = all((d / n).is_file() and (d / n).stat().st_size >= k for n, k in p["largos"].items())
+    return largos and all((d / TRAMO_NPY.format(i)).is_file() for i in range(len(p["tramos"])))
+
+def marcar(d: Path, estado: Dict, tramo: Tuple[np.ndarray, Dict[str, int]] | None) -> None:
+    """
+    Punto de control en d: guarda estado (JSON), el largo de cada archivo de
+    d y el pluriempleo exportado del tramo desde el punto anterior. Los
+    archivos abiertos para escribir deben estar volcados (flush).
+    """
+    previo = _punto(d)
+    vocabs = previo["tramos"] if previo else []
+    if tramo is not None:
+        np.save(d / TRAMO_NPY.format(len(vocabs)), tramo[0])
+        vocabs = [*vocabs, tramo[1]]
+    propios = {PUNTO, *(TRAMO_NPY.format(i) for i in range(len(vocabs)))}
+    largos = {p.name: p.stat().st_size for p in d.iterdir() if p.is_file() and p.name not in propios}
+    tmp = d / f"{PUNTO}.tmp"
+    tmp.write_text(json.dumps({"estado": estado, "largos": largos, "tramos": vocabs}), encoding="utf-8")
+    # el reemplazo atómico deja siempre un punto completo
+    os.replace(tmp, d / PUNTO)
+
+def reanudar(d: Path) -> Tuple[Dict, List[Tuple[np.ndarray, Dict[str, int]]]] | None:
+    """
+    Devuelve d a su último punto de control: recorta cada archivo al largo
+    que tenía y borra lo escrito después. Devuelve (estado, pluriempleo de
+    cada tramo en orden), o None si no hay punto, y entonces vacía d.
+    """
+    p = _punto(d)
+    if p is not None and not _completo(d, p):
+        p = None
+    propios = {PUNTO, *(TRAMO_NPY.format(i) for i in range(len(p["tramos"])))} if p else set()
+    for f in d.iterdir():
+        if f.name in propios:
+            continue
+        if p is not None and f.name in p["largos"]:
+            os.truncate(f, p["largos"][f.name])
+        elif f.is_dir():
+            shutil.rmtree(f, ignore_errors=True)
+        else:
+            f.unlink()
+    if p is None:
+        return None
+    tramos = [(np.load(d / TRAMO_NPY.format(i)), v) for i, v in enumerate(p["tramos"])]
+    return p["estado"], tramos
+
+def guardar(
+    dir_: Path, huella: str, tp: str, meta: Dict,
+    pluri: Tuple[np.ndarray, Dict[str, int]] | None, tb_cubo: pd.DataFrame,
+) -> Parcial:
+    """Cierra el parcial calculado en dir_ con sus contadores, su pluriempleo y su cubo."""
+    est, vocab = pluri if pluri is not None else (np.empty((0, 4), np.int64), {})
+    _limpiar_puntos(dir_)
+    np.save(dir_ / PLURI_NPY, est)
+    cubo.guardar(tb_cubo, dir_ / CUBO_CSV)
+    meta = {**meta, "huella": huella, "tipo": tp, "vocab": vocab}
+    # meta.json se escribe al final: marca el parcial como completo
+    (dir_ / META).write_text(json.dumps(meta), encoding="utf-8")
+    return Parcial(dir_)
+
+def publicar(
+    dir_: Path, src: Path | str, huella: str, tp: str, cols: List[str], reglas: List[Regla]
+) -> Parcial:
+    """
+    Mueve el parcial de dir_ (calculado sobre src con huella) a la cache y
+    borra los de versiones viejas de src.
+    """
+    final = ruta(src, huella, tp, cols, reglas)
+    for d in PARCIAL_DIR.glob(f"{parse_cache.prefijo(src)}_*"):
+        try:
+            vieja = json.loads((d / META).read_text(encoding="utf-8")).get("huella")
+        except (OSError, ValueError):
+            continue
+        if vieja != huella:
+            shutil.rmtree(d, ignore_errors=True)
+    try:
+        os.replace(dir_, final)
+    except OSError:
+        # otro análisis lo publicó primero
+        shutil.rmtree(dir_, ignore_errors=True)
+    return Parcial(final)
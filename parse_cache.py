@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+parse_cache.py – Cache columnar (Arrow IPC) de padrones ya parseados.
+La primera lectura de un archivo guarda sus chunks en PARSE_CACHE_DIR;
+las siguientes abren ese archivo por memory-map y leen solo las columnas
+pedidas. La clave combina ruta, tamaño, mtime, un hash de contenido
+muestreado y las columnas del layout, así que cualquier cambio en la
+fuente invalida la entrada. Cada lectura renueva el mtime de la entrada y
+purgar borra las que no se leyeron en PARSE_CACHE_TTL (fuentes borradas,
+renombradas o que no se volvieron a abrir) y después las menos usadas
+hasta que el total entre en PARSE_CACHE_MAX. Los mismos archivos sirven
+como salida columnar de la unificación (ver leer_ipc y Escritor con destino).
+"""
+
+import os
+import time
+import hashlib
+import uuid
+from pathlib import Path
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from app.config import PARSE_CACHE_DIR, PARSE_CACHE_TTL, PARSE_CACHE_MAX
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    # Sin pyarrow no hay cache de parseo
+    pa = None
+
+_MUESTRA  = 64 * 1024          # bytes por muestra del hash de contenido
+_MUESTRAS = 16                 # muestras repartidas en el archivo
+
+def disponible() -> bool:
+    """True si la cache puede usarse (requiere pyarrow)."""
+    return pa is not None
+
+# ─────────── Claves ───────────
+def huella(path: Path | str) -> str:
+    """
+    Huella de path: ruta, tamaño, mtime y un blake2b sobre el inicio, el
+    final y _MUESTRAS tramos repartidos del contenido.
+    """
+    path = Path(path).resolve()
+    st = path.stat()
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{path}|{st.st_size}|{st.st_mtime_ns}".encode())
+    with open(path, "rb") as fh:
+        pasos = max(1, st.st_size // _MUESTRAS)
+        for pos in range(0, st.st_size, pasos):
+            fh.seek(pos)
+            h.update(fh.read(_MUESTRA))
+        fh.seek(max(0, st.st_size - _MUESTRA))
+        h.update(fh.read(_MUESTRA))
+    return h.hexdigest()
+
+def prefijo(path: Path | str) -> str:
+    """Parte de la clave que depende solo de la ruta."""
+    ruta = str(Path(path).resolve()).encode()
+    return hashlib.blake2b(ruta, digest_size=8).hexdigest()
+
+def ruta(path: Path | str, cols: List[str]) -> Path:
+    """Archivo de cache para path parseado con el layout cols."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(huella(path).encode())
+    h.update("|".join(cols).encode())
+    return PARSE_CACHE_DIR / f"{prefijo(path)}_{h.hexdigest()}.arrow"
+
+def invalidar(path: Path | str, vigente: Path | None = None) -> None:
+    """Borra las entradas de path salvo vigente."""
+    for p in PARSE_CACHE_DIR.glob(f"{prefijo(path)}_*.arrow"):
+        if p != vigente:
+            p.unlink(missing_ok=True)
+
+# ─────────── Lectura ───────────
+def leer(path: Path | str, cols: List[str], columnas: List[str] | None = None) -> Iterator[pd.DataFrame] | None:
+    """
+    Chunks cacheados de path (memory-map, solo columnas si se indica), o
+    None si no hay una entrada vigente.
+    """
+    if pa is None:
+        return None
+    p = ruta(path, cols)
+    if not p.exists():
+        return None
+    try:
+        os.utime(p)   # marca la entrada como recién usada (ver purgar)
+    except OSError:
+        pass
+    return leer_ipc(p, columnas)
+
+def _pandas(tb) -> pd.DataFrame:
+    """Tabla/batch Arrow → DataFrame con strings Arrow como el parser."""
+    return tb.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+
+def leer_ipc(p: Path | str, columnas: List[str] | None = None) -> Iterator[pd.DataFrame]:
+    """Record batches de un archivo Arrow IPC (memory-map) como DataFrames."""
+    with pa.memory_map(str(p), "r") as src:
+        reader = pa_ipc.open_file(src)
+        for i in range(reader.num_record_batches):
+            rb = reader.get_batch(i)
+            if columnas is not None:
+                rb = rb.select(columnas)
+            yield _pandas(rb)
+
+def filas_ipc(p: Path | str) -> int:
+    """Filas de un archivo Arrow IPC (de los metadatos de cada batch, sin leer columnas)."""
+    with pa.memory_map(str(p), "r") as src:
+        reader = pa_ipc.open_file(src)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+def tomar_ipc(p: Path | str, filas: np.ndarray, paso: int) -> Iterator[pd.DataFrame]:
+    """Filas (números de fila) de un archivo Arrow IPC, de a paso filas."""
+    with pa.memory_map(str(p), "r") as src:
+        tb = pa_ipc.open_file(src).read_all()
+        for i in range(0, len(filas), paso):
+            yield _pandas(tb.take(pa.array(filas[i:i + paso])))
+
+# ─────────── Limpieza ───────────
+def purgar(ttl: float = PARSE_CACHE_TTL, limite: int = PARSE_CACHE_MAX) -> None:
+    """
+    Borra las entradas sin leer hace más de ttl segundos y después las
+    leídas hace más tiempo hasta que el total entre en limite bytes. Un
+    temporal de Escritor se renueva con cada chunk: solo se borra vencido.
+    """
+    vence = time.time() - ttl
+    entradas = []
+    for p in PARSE_CACHE_DIR.glob("*.arrow"):
+        try:
+            st = p.stat()
+            if st.st_mtime < vence:
+                p.unlink()
+            elif not p.name.startswith("tmp_"):
+                entradas.append((st.st_mtime, st.st_size, p))
+        except OSError:
+            # desaparecida, o abierta por otro proceso (Windows no borra un archivo mapeado)
+            continue
+
+    entradas.sort()
+    total = sum(tam for _, tam, _ in entradas)
+    for _, tam, p in entradas:
+        if total <= limite:
+            break
+        try:
+            p.unlink()
+        except OSError:
+            continue
+        total -= tam
+
+# ─────────── Escritura ───────────
+class Escritor:
+    """
+    Escribe chunks a un archivo temporal y lo publica al cerrar: como
+    entrada de cache o, si se indica destino, en esa ruta.
+    """
+
+    def __init__(self, cols: List[str], destino: Path | str | None = None):
+        self.cols = cols
+        self.destino = Path(destino) if destino is not None else None
+        base = self.destino.parent if self.destino is not None else PARSE_CACHE_DIR
+        self._tmp = base / f"tmp_{uuid.uuid4().hex}.arrow"
+        self._sink = None
+        self._writer = None
+
+    def agregar(self, df: pd.DataFrame) -> None:
+        """Agrega un chunk (con las mismas columnas en cada llamada)."""
+        tb = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._sink = pa.OSFile(str(self._tmp), "wb")
+            self._writer = pa_ipc.new_file(self._sink, tb.schema)
+        self._writer.write_table(tb)
+
+    def cerrar(self, path: Path | str | None = None) -> None:
+        """
+        Publica en destino, o como entrada para path (huella tomada ahora)
+        borrando las viejas.
+        """
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._sink.close()
+        if self.destino is not None:
+            os.replace(self._tmp, self.destino)
+            return
+        final = ruta(path, self.cols)
+        os.replace(self._tmp, final)
+        invalidar(path, final)
+
+    def descartar(self) -> None:
+        """Abandona la escritura (lectura incompleta)."""
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def pasar(self, dfs: Iterator[pd.DataFrame], path: Path | str) -> Iterator[pd.DataFrame]:
+        """Guarda cada chunk de dfs mientras lo entrega; publica solo si se consumió entero."""
+        completo = False
+        try:
+            for df in dfs:
+                self.agregar(df)
+                yield df
+            completo = True
+        finally:
+            if completo:
+                self.cerrar(path)
+            else:
+                self.descartar()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pluriempleo.py – Detección columnar de Pluriempleo / Multi-CUIT (OSN).
+cuil_beneficiario, codigo_os y cuit_empleador se codifican como enteros
+exactos (ver codificar) y cada chunk se agrega con groupby a
+(cuil, codigo_os) → (mín, máx) del empleador: hay más de un empleador
+distinto si y solo si mín != máx, y ese par se combina entre chunks con
+otro mín/máx. Los parciales se compactan a medida que crecen. El estado
+se puede exportar y fusionar con el de otra instancia (análisis
+incremental por archivo, ver parciales.py).
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.data_utils import texto
+
+COLS_PLURI = ["cuil_beneficiario", "codigo_os"]
+COL_EMPLEADOR = "cuit_empleador"
+
+_MAX_DIGITOS = 17   # 10**17 + valor entra holgado en int64
+_POTENCIAS = 10 ** np.arange(19, dtype=np.int64)
+
+class Pluriempleo:
+    """Acumula por chunk los empleadores distintos de cada (cuil, codigo_os)."""
+
+    def __init__(self):
+        self._vocab: Dict[str, int] = {}
+        self._estado = pd.DataFrame(
+            {"c": [], "o": [], "mn": [], "mx": []}, dtype=np.int64
+        ).set_index(["c", "o"])
+        self._partes: List[pd.DataFrame] = []
+        self._n_partes = 0
+
+    def codificar(self, s: pd.Series) -> np.ndarray:
+        """
+        Código int64 exacto de cada valor: las cadenas de hasta 17 dígitos
+        (o vacías) valen 10**len + valor; el resto recibe un id negativo de
+        un vocabulario propio. Dos cadenas distintas nunca comparten código.
+        """
+        if pd.api.types.is_integer_dtype(s.dtype):
+            # clave int64 de un chunk compacto (sin ceros a la izquierda): el
+            # largo del texto es la cantidad de dígitos
+            v = s.to_numpy(dtype=np.int64)
+            lens = np.searchsorted(_POTENCIAS, v, side="right")
+            if (lens <= _MAX_DIGITOS).all():
+                return _POTENCIAS[lens] + v
+            s = texto(s)
+        s = s.astype("string")
+        lens = s.str.len().to_numpy(dtype=np.int64)
+        num = ((s == "") | s.str.isdecimal()).to_numpy(dtype=bool) & (lens <= _MAX_DIGITOS)
+        out = np.empty(len(s), dtype=np.int64)
+        if num.any():
+            vals = pd.to_numeric(s[num].where(s[num] != "", "0")).to_numpy(dtype=np.int64)
+            out[num] = 10 ** lens[num] + vals
+        if not num.all():
+            otros = s[~num].to_numpy(dtype=object)
+            for v in pd.unique(otros):
+                self._vocab.setdefault(v, -(len(self._vocab) + 1))
+            out[~num] = pd.Series(otros).map(self._vocab).to_numpy(dtype=np.int64)
+        return out
+
+    def claves(self, ch: pd.DataFrame) -> pd.DataFrame:
+        """Códigos (c, o) de cada fila del chunk."""
+        return pd.DataFrame({
+            "c": self.codificar(ch[COLS_PLURI[0]]),
+            "o": self.codificar(ch[COLS_PLURI[1]]),
+        })
+
+    def agregar(self, ch: pd.DataFrame) -> pd.DataFrame:
+        """Agrega un chunk; devuelve sus claves (c, o) por fila."""
+        k = self.claves(ch)
+        parcial = (
+            k.assign(e=self.codificar(ch[COL_EMPLEADOR]))
+             .groupby(["c", "o"], sort=False)["e"]
+             .agg(mn="min", mx="max")
+        )
+        self._partes.append(parcial)
+        self._n_partes += len(parcial)
+        if self._n_partes > max(len(self._estado), 1_000_000):
+            self._compactar()
+        return k
+
+    def _compactar(self) -> None:
+        """Combina los parciales pendientes con el estado acumulado."""
+        if not self._partes:
+            return
+        todo = pd.concat([self._estado, *self._partes])
+        self._estado = todo.groupby(level=["c", "o"], sort=False).agg(mn=("mn", "min"), mx=("mx", "max"))
+        self._partes, self._n_partes = [], 0
+
+    def resolver(self) -> pd.MultiIndex:
+        """Claves (c, o) con más de un empleador distinto."""
+        self._compactar()
+        est = self._estado
+        return est.index[est["mn"].to_numpy() != est["mx"].to_numpy()]
+
+    def exportar(self) -> Tuple[np.ndarray, Dict[str, int]]:
+        """Estado acumulado como array (n, 4) de (c, o, mín, máx) y su vocabulario."""
+        self._compactar()
+        est = self._estado.reset_index()[["c", "o", "mn", "mx"]]
+        return est.to_numpy(dtype=np.int64), dict(self._vocab)
+
+    def fusionar(self, est: np.ndarray, vocab: Dict[str, int]) -> None:
+        """
+        Incorpora el estado exportado por otra instancia. Sus ids negativos
+        se traducen al vocabulario propio; la traducción puede invertir el
+        orden de (mín, máx) pero no cambia si son distintos.
+        """
+        df = pd.DataFrame(est, columns=["c", "o", "mn", "mx"])
+        if vocab:
+            mapa = {}
+            for v, i in vocab.items():
+                mapa[i] = self._vocab.setdefault(v, -(len(self._vocab) + 1))
+            for col in df.columns:
+                neg = df[col].to_numpy() < 0
+                if neg.any():
+                    df.loc[neg, col] = df.loc[neg, col].map(mapa)
+            mn, mx = df["mn"].to_numpy(), df["mx"].to_numpy()
+            df["mn"], df["mx"] = np.minimum(mn, mx), np.maximum(mn, mx)
+        self._partes.append(df.set_index(["c", "o"]))
+        self._n_partes += len(df)
+        if self._n_partes > max(len(self._estado), 1_000_000):
+            self._compactar()
+
+    def decodificar(self, codes: np.ndarray) -> pd.Series:
+        """Inversa de codificar: la cadena original de cada código."""
+        codes = np.asarray(codes, dtype=np.int64)
+        out = pd.Series(np.empty(len(codes), dtype=object))
+        num = codes > 0
+        # 10**len + valor: el texto sin el 1 inicial conserva los ceros
+        out[num] = pd.Series(codes[num]).astype(str).str[1:].to_numpy()
+        if not num.all():
+            inv = {i: v for v, i in self._vocab.items()}
+            out[~num] = [inv[c] for c in codes[~num]]
+        return out.astype("string")
+
+    def textos(self, idx: pd.MultiIndex) -> pd.DataFrame:
+        """Claves (c, o) como las columnas COLS_PLURI originales."""
+        return pd.DataFrame({
+            COLS_PLURI[0]: self.decodificar(idx.get_level_values(0).to_numpy()),
+            COLS_PLURI[1]: self.decodificar(idx.get_level_values(1).to_numpy()),
+        })
+
+def hash_claves(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash de 64 bits del texto de COLS_PLURI, para marcar candidatas. No
+    depende del vocabulario, así que vale entre instancias.
+    """
+    return pd.util.hash_pandas_object(df[COLS_PLURI].astype("string"), index=False).to_numpy()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+resultados.py – Resultados de análisis completos, direccionados por contenido.
+Cada análisis terminado queda en RESULT_DIR/<clave>, con sus CSV, el ZIP de
+descarga (una vez armado) y el resumen. La clave combina el tipo, la huella
+de cada fuente en orden y un hash de referencias/*.csv, así que repetir un
+análisis sobre los mismos archivos y catálogos devuelve el resumen guardado
+sin leer nada. El uso de una entrada (buscar, que llaman también el
+paginado, las consultas y la descarga) renueva su mtime; purgar borra las
+que no se usaron en CACHE_TTL y después las menos usadas hasta que el total
+entre en RESULT_CACHE_MAX, salvo las usadas en los últimos EN_USO segundos.
+Los tmp_* de análisis en curso están reservados por su proceso (ver
+sesiones.reservar) y purgar no los toca.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+from app.config import CACHE_DIR, RESULT_DIR, REF_DIR, CACHE_TTL, RESULT_CACHE_MAX
+from app import parse_cache, parciales, sesiones
+
+VERSION = 5
+
+RESUMEN = "resumen.json"
+
+_CLAVE = re.compile(r"^[0-9a-f]{32}$")   # hexdigest de clave()
+
+# Una entrada usada hace menos que esto la está mirando alguien: no se desaloja
+EN_USO = 10 * 60
+
+# ─────────── Claves ───────────
+def _referencias() -> str:
+    """Hash de nombre y contenido de los catálogos de REF_DIR."""
+    h = hashlib.blake2b(digest_size=16)
+    for p in sorted(Path(REF_DIR).glob("*.csv")):
+        h.update(p.name.encode())
+        h.update(p.read_bytes())
+    return h.hexdigest()
+
+def clave(sources: List[Path | str], tp: str) -> str:
+    """Clave del análisis de sources (en ese orden) para tp con los catálogos actuales."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{VERSION}|{parciales.VERSION}|{tp}|{_referencias()}".encode())
+    for s in sources:
+        h.update(parse_cache.huella(s).encode())
+    return h.hexdigest()
+
+def ruta(k: str) -> Path:
+    return RESULT_DIR / k
+
+def tocar(d: Path | str) -> None:
+    """Marca la entrada d como recién usada."""
+    try:
+        os.utime(d)
+    except OSError:
+        pass
+
+# ─────────── Lectura ───────────
+def _rebasar(summary: Dict, d: Path) -> Dict:
+    """summary con tmp_dir y las rutas de CSV apuntando a d."""
+    s = dict(summary)
+    s["tmp_dir"] = str(d)
+    for k, v in summary.items():
+        if k.startswith("csv_"):
+            s[k] = str(d / Path(v).name)
+    return s
+
+def buscar(k: str) -> Dict | None:
+    """
+    Resumen guardado para la clave k (con rutas a su entrada), o None. k
+    puede venir del navegador: solo se aceptan claves con el formato de
+    clave(), así que las rutas nunca salen de RESULT_DIR.
+    """
+    if not isinstance(k, str) or not _CLAVE.match(k):
+        return None
+    d = ruta(k)
+    try:
+        summary = json.loads((d / RESUMEN).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    tocar(d)
+    return _rebasar(summary, d)
+
+# ─────────── Escritura ───────────
+def _reserva(d: Path) -> str:
+    return f"resultado:{d.name}"
+
+def crear() -> Path:
+    """
+    Directorio temporal donde correr un análisis antes de publicarlo,
+    reservado para este proceso hasta publicar.
+    """
+    RESULT_DIR.mkdir(exist_ok=True)
+    d = RESULT_DIR / f"tmp_{uuid.uuid4().hex}"
+    # se reserva antes de crearlo: purgar nunca lo ve libre
+    sesiones.reservar(_reserva(d))
+    d.mkdir()
+    return d
+
+def publicar(dir_: Path | str, k: str, summary: Dict) -> Dict:
+    """
+    Mueve el análisis hecho en dir_ a la entrada k y devuelve su resumen con
+    las rutas finales. Si otro análisis publicó k primero se usa ese.
+    """
+    dir_ = Path(dir_)
+    # resumen.json se escribe al final: marca la entrada como completa
+    (dir_ / RESUMEN).write_text(json.dumps(summary), encoding="utf-8")
+    try:
+        os.replace(dir_, ruta(k))
+    except OSError:
+        shutil.rmtree(dir_, ignore_errors=True)
+        return buscar(k) or _rebasar(summary, dir_)
+    finally:
+        sesiones.liberar(_reserva(dir_))
+    purgar(vigente=ruta(k))
+    return _rebasar(summary, ruta(k))
+
+# ─────────── Limpieza ───────────
+def _borrar(d: Path) -> None:
+    # se renombra antes de borrar: buscar nunca ve una entrada a medias
+    if not d.name.startswith("tmp_"):
+        try:
+            d = d.rename(RESULT_DIR / f"tmp_{uuid.uuid4().hex}")
+        except OSError:
+            return
+    shutil.rmtree(d, ignore_errors=True)
+
+def _tamano(d: Path) -> int:
+    total = 0
+    for raiz, _, archivos in os.walk(d):
+        for a in archivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, a))
+            except OSError:
+                continue
+    return total
+
+def purgar(ttl: float = CACHE_TTL, limite: int = RESULT_CACHE_MAX, vigente: Path | None = None) -> None:
+    """
+    Borra los temporales abandonados (su análisis ya no corre) y las
+    entradas sin usar hace más de ttl segundos, y después las usadas hace
+    más tiempo (salvo vigente y las usadas en EN_USO) hasta que el total
+    entre en limite bytes. También borra los anal_* que dejaban las
+    versiones anteriores.
+    """
+    ahora = time.time()
+    vence = ahora - ttl
+    entradas = []
+    for d in [*RESULT_DIR.glob("*"), *CACHE_DIR.glob("anal_*")]:
+        try:
+            if not d.is_dir():
+                continue
+            uso = d.stat().st_mtime
+        except OSError:
+            continue
+        if d.parent == RESULT_DIR and d.name.startswith("tmp_"):
+            # el mtime de un análisis en curso no cambia al escribir sus CSV:
+            # lo protege la reserva de su proceso, no la edad
+            if sesiones.reservar(_reserva(d)):
+                shutil.rmtree(d, ignore_errors=True)
+                sesiones.liberar(_reserva(d))
+        elif uso < vence and d.parent == RESULT_DIR:
+            _borrar(d)
+        elif uso < vence:
+            shutil.rmtree(d, ignore_errors=True)
+        elif d.parent == RESULT_DIR:
+            entradas.append((uso, d))
+
+    # el total cuenta todas las entradas; las en uso solo no se eligen para borrar
+    entradas.sort()
+    tamanos = [_tamano(d) for _, d in entradas]
+    total = sum(tamanos)
+    for (uso, d), tam in zip(entradas, tamanos):
+        if total <= limite:
+            break
+        if d == vigente or uso >= ahora - EN_USO:
+            continue
+        _borrar(d)
+        total -= tam
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+rnos.py – Cruce con el Registro Nacional de Obras Sociales (referencias/rnos.csv).
+El registro se carga una vez con _memory en una tabla indexada por el
+código como entero (sin los ceros de relleno del padrón) y cada chunk se
+cruza en forma vectorizada: el código de la fila se convierte a entero y
+se busca en el índice (get_indexer), sin búsquedas fila por fila. Los
+códigos de columnas categóricas se buscan una vez por categoría.
+El campo con código RNOS es codigo_os en OSN y rnos en EMP: su regla de
+validación admite solo códigos del registro (ver validacion._compilar) y
+los CSV de resultados llevan la denominación y el tipo del código.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_pc
+except ImportError:
+    # Sin pyarrow los códigos se convierten con pd.to_numeric
+    pa = None
+
+from app.config import REF_DIR
+from app.data_utils import _memory, texto
+
+ARCHIVO = "rnos.csv"
+
+# Campo del padrón con el código RNOS, por tipo
+CAMPO = {"EMP": "rnos", "OSN": "codigo_os"}
+# Columnas que se agregan a los CSV de resultados
+COLUMNAS = ["denominacion_rnos", "tipo_rnos"]
+
+# En EMP el campo rnos va en cero cuando la adhesión no es por desregulación
+SIN_RNOS = "000000"
+LARGO = 6
+
+def firma() -> int:
+    """Versión del registro (mtime de rnos.csv)."""
+    return Path(REF_DIR, ARCHIVO).stat().st_mtime_ns
+
+@_memory.cache
+def _cargar(firma: int) -> pd.DataFrame:
+    """Registro indexado por código entero; firma identifica la versión del archivo."""
+    df = pd.read_csv(Path(REF_DIR, ARCHIVO), sep=";", dtype=str, encoding="utf-8-sig", keep_default_na=False)
+    df = df.apply(lambda s: s.str.strip())
+    df = df[df["rnos"].str.fullmatch(r"[0-9]{1,18}")]
+    df.index = pd.Index(df["rnos"].astype(np.int64), name="codigo")
+    return df[~df.index.duplicated()][["denominacion", "tipo"]]
+
+@lru_cache(maxsize=1)
+def _en_memoria(firma: int) -> pd.DataFrame:
+    # _memory lee el pickle del disco en cada llamada; esto se consulta por chunk
+    return _cargar(firma)
+
+def registro() -> pd.DataFrame:
+    """Tabla código → denominacion, tipo del registro vigente."""
+    return _en_memoria(firma())
+
+def codigos(tp: str) -> Tuple[str, ...]:
+    """Valores admitidos en el campo RNOS de tp: cada código con y sin ceros de relleno."""
+    cods = registro().index.astype(str)
+    validos = {*cods, *cods.str.zfill(LARGO)}
+    if tp == "EMP":
+        validos.add(SIN_RNOS)
+    return tuple(sorted(validos))
+
+# ─────────── Cruce ───────────
+def _claves(col: pd.Series) -> np.ndarray:
+    """Código de cada valor de col como entero; -1 si no es un número."""
+    if pd.api.types.is_integer_dtype(col.dtype):
+        return col.to_numpy(dtype=np.int64)
+    if pa is not None:
+        s = pa_pc.fill_null(pa.array(np.asarray(texto(col).array), type=pa.string(), from_pandas=True), "")
+        ok = pa_pc.and_(pa_pc.utf8_is_decimal(s), pa_pc.less_equal(pa_pc.utf8_length(s), 18))
+        return pa_pc.cast(pa_pc.if_else(ok, s, "-1"), pa.int64()).to_numpy(zero_copy_only=False)
+    s = col.astype(str)
+    return pd.to_numeric(s.where(s.str.fullmatch(r"[0-9]{1,18}"), "-1")).to_numpy(dtype=np.int64)
+
+def buscar(col: pd.Series) -> np.ndarray:
+    """Posición en registro() del código de cada valor de col; -1 si no figura."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # una búsqueda por categoría; el código -1 (nulo) toma el último
+        pos = buscar(pd.Series([*col.cat.categories.astype(str), ""]))
+        return pos[col.cat.codes.to_numpy()]
+    return registro().index.get_indexer(_claves(col))
+
+def datos(col: pd.Series) -> pd.DataFrame:
+    """Denominación y tipo del código de cada valor de col ("" si no figura)."""
+    reg = registro()
+    pos = buscar(col)
+    out = {}
+    for c, src in zip(COLUMNAS, ("denominacion", "tipo")):
+        vals = np.append(reg[src].to_numpy(dtype=object), "")
+        out[c] = vals[pos]   # pos -1 toma el "" agregado al final
+    return pd.DataFrame(out, index=col.index)
+
+def enriquecer(df: pd.DataFrame, tp: str) -> pd.DataFrame:
+    """df con COLUMNAS del código RNOS de cada fila."""
+    campo = CAMPO[tp]
+    if campo not in df.columns:
+        return df
+    return pd.concat([df, datos(df[campo])], axis=1)
@@ -1,16 +1,20 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-run.py – Arranque de la app en modo producción/desarrollo,
+run.py – Arranque de la app en modo desarrollo/escritorio (un proceso),
 con auto‐open del navegador.
 """
 
 import threading
 import webbrowser
 import os
+import multiprocessing
 from app.app import app
 
 if __name__ == "__main__":
+    # Necesario para el pool de parseo en el ejecutable congelado (Windows)
+    multiprocessing.freeze_support()
+
     # Solo el proceso principal abre el navegador
     if not os.environ.get("WERKZEUG_RUN_MAIN"):
         threading.Timer(1, lambda: webbrowser.open("http://127.0.0.1:8050/")).start()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sesiones.py – Aislamiento por sesión y límite de trabajos pesados.
+Cada pestaña del navegador recibe un id de sesión (dcc.Store "sesion") y
+sus archivos generados (unificados) van a SESION_DIR/<id>, así que dos
+usuarios nunca escriben la misma ruta. Las unificaciones y los análisis
+piden un cupo antes de empezar: hay TRABAJOS_SIMULTANEOS cupos en la
+diskcache de los long callbacks, compartidos por todos los procesos del
+servidor, y el resto espera su turno. Los cupos son reservas por proceso
+(ver reservar): una cuyo proceso ya no existe (p. ej. un trabajo
+cancelado) se libera sola.
+"""
+
+import os
+import re
+import time
+import uuid
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+import diskcache as dc
+import psutil
+
+from app.config import SESION_DIR, LONG_CACHE_DIR, CACHE_TTL, TRABAJOS_SIMULTANEOS
+
+_ID = re.compile(r"^[0-9a-f]{32}$")
+_UNIFICADO = re.compile(r"^unif_\d+\.(txt|arrow)$")   # nombres de unify.salida
+
+ESPERA = 1.0   # segundos entre intentos de tomar un cupo
+
+# ─────────── Sesiones ───────────
+def nueva() -> str:
+    return uuid.uuid4().hex
+
+def directorio(sid: str | None) -> Path:
+    """Directorio de archivos de la sesión sid (creado si no existe)."""
+    if not sid or not _ID.match(sid):
+        # el id viene del navegador: uno inválido no elige ruta
+        raise ValueError("id de sesión inválido")
+    d = SESION_DIR / sid
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+def purgar(ttl: float = CACHE_TTL) -> None:
+    """Borra los directorios de sesión sin tocar hace más de ttl segundos."""
+    limite = time.time() - ttl
+    for d in SESION_DIR.glob("*"):
+        try:
+            if d.is_dir() and max((p.stat().st_mtime for p in d.iterdir()), default=d.stat().st_mtime) < limite:
+                shutil.rmtree(d, ignore_errors=True)
+        except OSError:
+            continue
+
+def unificado(sid: str | None, nombre: str | None) -> Path | None:
+    """
+    Unificado nombre de la sesión sid, o None si el nombre no es el de un
+    unificado o el archivo ya no existe (p. ej. lo borró purgar). Ambos
+    vienen del navegador: la ruta nunca sale del directorio de la sesión.
+    """
+    if not sid or not _ID.match(sid) or not isinstance(nombre, str) or not _UNIFICADO.match(nombre):
+        return None
+    p = SESION_DIR / sid / nombre
+    return p if p.is_file() else None
+
+# ─────────── Reservas ───────────
+_cache: dc.Cache | None = None
+
+def _reservas() -> dc.Cache:
+    global _cache
+    if _cache is None:
+        _cache = dc.Cache(str(LONG_CACHE_DIR))
+    return _cache
+
+def reservar(clave: str) -> bool:
+    """
+    Toma clave para este proceso si está libre o si su dueño ya no existe
+    (un trabajo cancelado o caído). False si otro proceso vivo la tiene.
+    """
+    cache = _reservas()
+    with cache.transact():
+        dueno = cache.get(clave)
+        if dueno is not None and psutil.pid_exists(dueno):
+            return False
+        cache.set(clave, os.getpid())
+        return True
+
+def liberar(clave: str) -> None:
+    """Suelta clave si la tiene este proceso."""
+    cache = _reservas()
+    with cache.transact():
+        if cache.get(clave) == os.getpid():
+            cache.delete(clave)
+
+# ─────────── Cupos ───────────
+@contextmanager
+def cupo(espera: Optional[Callable[[int], None]] = None, limite: int = TRABAJOS_SIMULTANEOS):
+    """
+    Ejecuta el bloque con uno de los limite cupos de trabajo pesado. Mientras
+    no haya lugar llama a espera(ocupados) cada ESPERA segundos.
+    """
+    while True:
+        for i in range(limite):
+            k = f"cupo:{i}"
+            if reservar(k):
+                try:
+                    yield
+                finally:
+                    liberar(k)
+                return
+        if espera is not None:
+            espera(limite)
+        time.sleep(ESPERA)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+unify.py – Unificación de padrones.
+Concatena las fuentes en el orden dado escribiendo cada chunk de una sola
+vez, ya sea como texto con pipes (idéntico byte a byte a la escritura fila
+por fila) o como archivo columnar Arrow IPC que el análisis lee sin volver
+a parsear (ver data_utils.COLUMNAR).
+"""
+
+import os
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from app.config import PARSE_WORKERS, PARSE_CACHE, PARSE_CACHE_UNIF
+from app.data_utils import COLUMNAR, leer_chunks, parsear_lineas
+from app.comprimidos import tamano
+from app import parse_cache
+
+FORMATOS = {"txt": ".txt", "arrow": COLUMNAR}
+
+# ─────────── Helpers ───────────
+def texto(ch: pd.DataFrame) -> bytes:
+    """Líneas "|"-separadas del chunk, con el fin de línea de la plataforma."""
+    cols = list(ch.columns)
+    lineas = ch[cols[0]].astype("string").str.cat(
+        [ch[c].astype("string") for c in cols[1:]], sep="|", na_rep="<NA>"
+    )
+    data = ("\n".join(lineas.tolist()) + "\n").encode("latin-1")
+    return data.replace(b"\n", os.linesep.encode()) if os.linesep != "\n" else data
+
+def salida(directorio: Path, nombre: str, formato: str) -> Path:
+    """Ruta del unificado para formato (ver FORMATOS)."""
+    return Path(directorio) / f"{nombre}{FORMATOS[formato]}"
+
+# ─────────── Unificación ───────────
+def unificar(
+    sources: List[Path],
+    cols: List[str],
+    outp: Path,
+    progreso: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """
+    Unifica sources en outp (texto o columnar según su extensión) y
+    devuelve la cantidad de filas. progreso(hecho, total) recibe el avance
+    en bytes leídos de las fuentes.
+    """
+    outp = Path(outp)
+    columnar = outp.suffix == COLUMNAR
+    total_bytes = sum(tamano(s) for s in sources)
+    hecho = total = 0
+
+    if columnar:
+        escritor = parse_cache.Escritor(cols, destino=outp)
+    elif PARSE_CACHE_UNIF and parse_cache.disponible():
+        # el unificado de texto se cachea ya parseado para el análisis
+        escritor = parse_cache.Escritor(cols)
+    else:
+        escritor = None
+
+    f = None if columnar else open(outp, "wb")
+    try:
+        for src in sources:
+            for ch, off in leer_chunks(src, cols, workers=PARSE_WORKERS, offsets=True, cache=PARSE_CACHE):
+                if f is None:
+                    escritor.agregar(ch)
+                else:
+                    data = texto(ch)
+                    if escritor is not None:
+                        escritor.agregar(parsear_lineas(data, cols, f.tell()))
+                    f.write(data)
+                total += len(ch)
+                if progreso:
+                    progreso(hecho + int(off[-1, 1]), total_bytes)
+            hecho += tamano(src)
+            if progreso:
+                progreso(hecho, total_bytes)
+        if columnar and not total:
+            # unificado vacío: igual se escribe el esquema
+            escritor.agregar(pd.DataFrame({c: pd.Series(dtype="string") for c in cols}))
+    except BaseException:
+        if escritor is not None:
+            escritor.descartar()
+        raise
+    finally:
+        if f is not None:
+            f.close()
+
+    if escritor is not None:
+        escritor.cerrar(outp)
+    return total
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+validacion.py – Validación compilada desde el catálogo de referencias.
+Cada fila de referencias/{EMP,OSN}.csv se compila una sola vez en una Regla:
+Obligatorio y Longitud dan el largo mínimo y máximo, Tipo de dato una clase
+de caracteres (N dígitos, A letras) o una regex para las formas que no
+cubre (fechas D, decimales p.s) y la columna referencias el conjunto de
+códigos válidos; el campo con código RNOS (rnos.CAMPO) admite solo los
+códigos del registro. Cada regla lleva el nombre de la columna del layout
+(ALIAS corrige los que el catálogo escribe distinto) y una regla sin
+columna es un error: no se descarta en silencio. El plan se cachea con _memory (se recompila si cambia
+el catálogo o el registro) y cada campo de un chunk se valida en una sola pasada vectorizada
+con pyarrow.compute, o con los métodos str de pandas si no está disponible.
+El resultado por fila es una máscara de bits con las reglas que fallaron.
+"""
+
+from pathlib import Path
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import REF_DIR
+from app.data_utils import _memory, _ESPACIOS, STR, load_references, texto
+from app.layout import COLS_EMP
+from app import rnos
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_pc
+except ImportError:
+    # Sin pyarrow las reglas se aplican con los métodos str de pandas
+    pa = None
+
+# Campos con códigos de 1 o 2 dígitos no enumerados en el catálogo
+LIBRES = {"discapacidad", "preexistente", "corporativo", "copago"}
+
+# Campo del catálogo → columna del layout, donde los nombres difieren
+ALIAS = {"EMP": {"adhesion": "ahesion"}}
+
+class Regla(NamedTuple):
+    """Regla compilada de un campo."""
+    campo:   str
+    minimo:  int                      # largo mínimo (1 si es obligatorio)
+    maximo:  int | None               # largo máximo (Longitud)
+    clase:   str | None               # "N" solo dígitos, "A" solo letras
+    patron:  str | None               # regex anclada (fechas, decimales)
+    valores: Tuple[str, ...] | None   # códigos válidos, si es enumerado
+
+# ─────────── Compilación ───────────
+def _txt(v) -> str:
+    return "" if pd.isna(v) else str(v).strip()
+
+def _regla(campo: str, tipo: str, longitud: str, obligatorio: bool, valores) -> Regla | None:
+    """Compila una fila del catálogo; None si no impone nada."""
+    if campo in LIBRES:
+        return Regla(campo, 1, 2, "N", None, None)
+    ent, _, dec = longitud.replace(",", ".").partition(".")
+    maximo = int(ent) if ent.isdigit() and int(ent) else None
+    minimo = 1 if obligatorio else 0
+    clase = patron = None
+    tipo = tipo.upper()
+    if tipo == "N" and maximo and dec.isdigit():
+        # decimal p.s: hasta p - s enteros y s decimales
+        patron = rf"^\d{{0,{max(maximo - int(dec), 1)}}}(?:[.,]\d{{1,{dec}}})?$"
+        maximo = None
+    elif tipo in ("N", "A"):
+        clase = tipo
+    elif tipo == "D":
+        patron = r"^[\d/-]*$"
+    if not (minimo or maximo or clase or patron or valores):
+        return None
+    return Regla(campo, minimo, maximo, clase, patron, valores)
+
+@_memory.cache
+def _compilar(tipo: str, firma: Tuple[int, int]) -> List[Regla]:
+    """Plan de reglas del catálogo tipo; firma identifica la versión del catálogo y del registro RNOS."""
+    df_ref, tablas = load_references.func(tipo)
+    alias = ALIAS.get(tipo, {})
+    # EMP tiene layout fijo; el de OSN sale del mismo catálogo
+    columnas = set(COLS_EMP if tipo == "EMP" else df_ref["campo"])
+    plan = []
+    for _, row in df_ref.iterrows():
+        campo = alias.get(row["campo"], row["campo"])
+        if campo not in columnas:
+            raise ValueError(f"{tipo}.csv: el campo {row['campo']!r} no es una columna del padrón")
+        if row["campo"] == rnos.CAMPO[tipo]:
+            valores = rnos.codigos(tipo)
+        else:
+            valores = tuple(sorted(tablas[row["campo"]])) if row["campo"] in tablas else None
+        r = _regla(
+            campo,
+            _txt(row.get("tipo_de_dato")),
+            _txt(row.get("longitud")),
+            _txt(row.get("obligatorio")).upper() == "SI",
+            valores,
+        )
+        if r is not None:
+            plan.append(r)
+    return plan
+
+def plan(tipo: str) -> List[Regla]:
+    """Plan de validación compilado para el catálogo EMP u OSN."""
+    fn = "EMP.csv" if tipo == "EMP" else "OSN.csv"
+    return _compilar(tipo, (Path(REF_DIR, fn).stat().st_mtime_ns, rnos.firma()))
+
+# ─────────── Aplicación ───────────
+def _invalidas_arrow(col: pd.Series, r: Regla) -> np.ndarray:
+    # np.asarray no copia; los nulos se validan como "<NA>", igual que astype(str)
+    s = pa.array(np.asarray(col.array), type=pa.string(), from_pandas=True)
+    s = pa_pc.utf8_trim(pa_pc.fill_null(s, "<NA>"), characters=_ESPACIOS)
+    lens = pa_pc.utf8_length(s).to_numpy()
+    bad = np.zeros(len(s), dtype=bool)
+    if r.minimo:
+        bad |= lens < r.minimo
+    if r.maximo:
+        bad |= lens > r.maximo
+    if r.clase:
+        es = pa_pc.utf8_is_decimal(s) if r.clase == "N" else pa_pc.utf8_is_alpha(s)
+        bad |= ~es.to_numpy(zero_copy_only=False) & (lens > 0)
+    if r.patron:
+        bad |= ~pa_pc.match_substring_regex(s, r.patron).to_numpy(zero_copy_only=False)
+    if r.valores is not None:
+        en = pa_pc.is_in(s, value_set=pa.array(r.valores, type=pa.string()))
+        bad |= ~en.to_numpy(zero_copy_only=False)
+    return bad
+
+def _invalidas_pandas(col: pd.Series, r: Regla) -> np.ndarray:
+    s = col.astype(str).str.strip()
+    lens = s.str.len().to_numpy()
+    bad = np.zeros(len(s), dtype=bool)
+    if r.minimo:
+        bad |= lens < r.minimo
+    if r.maximo:
+        bad |= lens > r.maximo
+    if r.clase:
+        es = s.str.isdecimal() if r.clase == "N" else s.str.isalpha()
+        bad |= ~es.to_numpy(dtype=bool) & (lens > 0)
+    if r.patron:
+        bad |= ~s.str.match(r.patron).to_numpy(dtype=bool)
+    if r.valores is not None:
+        bad |= ~s.isin(r.valores).to_numpy(dtype=bool)
+    return bad
+
+def _invalidas(col: pd.Series, r: Regla) -> np.ndarray:
+    """
+    Máscara de valores de col que no cumplen r. Las clases N y A se
+    evalúan solo sobre valores no vacíos; el vacío lo decide minimo.
+    """
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # cada categoría se valida una vez; el código -1 (nulo) toma el último
+        cats = pd.Series([*col.cat.categories, None], dtype=STR)
+        return _invalidas(cats, r)[col.cat.codes.to_numpy()]
+    col = texto(col)
+    return _invalidas_arrow(col, r) if pa is not None else _invalidas_pandas(col, r)
+
+def mascara(ch: pd.DataFrame, plan: List[Regla]) -> np.ndarray:
+    """
+    Errores de cada fila de ch como bitmask uint64: el bit i indica que
+    falló plan[i]. Los campos de plan ausentes en ch no se validan.
+    """
+    if len(plan) > 64:
+        raise ValueError(f"el plan tiene {len(plan)} reglas; la máscara admite 64")
+    out = np.zeros(len(ch), dtype=np.uint64)
+    for i, r in enumerate(plan):
+        if r.campo in ch.columns:
+            out |= _invalidas(ch[r.campo], r).astype(np.uint64) << np.uint64(i)
+    return out
+
+def por_campo(masks: np.ndarray, plan: List[Regla]) -> np.ndarray:
+    """Cantidad de filas de masks con error en cada regla de plan."""
+    return np.array([
+        int(np.count_nonzero(masks & np.uint64(1 << i))) for i in range(len(plan))
+    ], dtype=np.int64)
+
+def nombres(masks: np.ndarray, plan: List[Regla]) -> np.ndarray:
+    """Lista compacta "campo;campo" de los campos con error de cada máscara."""
+    unicas, inv = np.unique(masks, return_inverse=True)
+    textos = np.array([
+        ";".join(r.campo for i, r in enumerate(plan) if int(m) >> i & 1) for m in unicas
+    ], dtype=object)
+    return textos[inv.reshape(-1)]
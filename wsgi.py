@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+wsgi.py – Punto de entrada WSGI para servir la app a varios usuarios.
+run.py levanta el servidor de desarrollo de Dash en un solo proceso; acá se
+expone el servidor Flask para un servidor WSGI con varios workers:
+
+    gunicorn -w 4 --threads 4 -t 0 -b 0.0.0.0:8050 "app.wsgi:server"
+    python -m app.wsgi            (waitress, también en Windows)
+
+Los long callbacks no corren dentro de los workers web: el manager de
+diskcache lanza cada trabajo en su propio proceso y guarda avance y
+resultado en LONG_CACHE_DIR, que comparten todos los workers, así que
+cualquiera puede atender el sondeo. sesiones.cupo limita cuántos trabajos
+pesados corren a la vez. No usar --preload: cada worker abre su propia
+conexión a la diskcache.
+"""
+
+import os
+import sys
+import multiprocessing
+
+from app.app import app
+
+server = app.server
+
+def main() -> int:
+    try:
+        from waitress import serve
+    except ImportError:
+        print("Falta waitress (pip install waitress); con gunicorn: "
+              'gunicorn -w 4 --threads 4 -t 0 -b 0.0.0.0:8050 "app.wsgi:server"', file=sys.stderr)
+        return 1
+    serve(
+        server,
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "8050")),
+        threads=int(os.environ.get("THREADS", "8")),
+    )
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())